@@ -0,0 +1,65 @@
+"""
+Benchmark the memory used by generated statements.
+
+For every size, <size> SELECT grants on tables are held in memory, first as
+the dictionaries with a formatted SQL string previously returned by
+SnowflakeGrantsGenerator and then as SnowflakeCommand records.
+
+Usage: python benchmarks/commands.py [size ...]
+"""
+import sys
+import tracemalloc
+
+from permifrost.snowflake_command import SnowflakeCommand
+from permifrost.snowflake_grants import GRANT_PRIVILEGES_TEMPLATE
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+
+
+def command_fields(i):
+    return dict(
+        privileges="select",
+        resource_type="table",
+        resource_name=f"database_1.schema_{i % 100}.table_{i}",
+        role="reporter",
+    )
+
+
+def build_dicts(size):
+    return [
+        {
+            "already_granted": True,
+            "sql": GRANT_PRIVILEGES_TEMPLATE.format(**command_fields(i)),
+        }
+        for i in range(size)
+    ]
+
+
+def build_commands(size):
+    return [
+        SnowflakeCommand(
+            GRANT_PRIVILEGES_TEMPLATE, already_granted=True, **command_fields(i)
+        )
+        for i in range(size)
+    ]
+
+
+def measured(func, size):
+    tracemalloc.start()
+    statements = func(size)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del statements
+    return current / 2**20
+
+
+def main(sizes):
+    print(f"{'statements':>10} {'dicts':>12} {'commands':>12}")
+    for size in sizes:
+        dicts = measured(build_dicts, size)
+        commands = measured(build_commands, size)
+        print(f"{size:>10} {dicts:10.1f}MB {commands:10.1f}MB")
+
+
+if __name__ == "__main__":
+    main([int(size) for size in sys.argv[1:]] or DEFAULT_SIZES)
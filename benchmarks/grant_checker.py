@@ -0,0 +1,87 @@
+"""
+Benchmark SnowflakeRoleGrantChecker.has_permission for roles holding a large
+number of grants.
+
+For every size, a role is granted SELECT on <size> tables and 1,000 of them are
+checked, first by materializing and scanning the permission list of the role on
+every check (the previous implementation of _has_permission) and then through
+the per-role permission index.
+
+Usage: python benchmarks/grant_checker.py [size ...]
+"""
+import sys
+import time
+
+from permifrost.snowflake_permission import SnowflakePermission
+from permifrost.snowflake_role_grant_checker import SnowflakeRoleGrantChecker
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000]
+
+CHECKS = 1_000
+
+# The list scan materializes every grant on each check, so it is skipped for
+# the largest sizes
+MAX_LIST_SCAN_SIZE = 10_000
+
+
+class GrantsConnector:
+    def __init__(self, size):
+        self.grants = {
+            "select": {
+                "table": {
+                    f"database_1.schema_{i % 100}.table_{i}": {"grant_option": False}
+                    for i in range(size)
+                }
+            }
+        }
+
+    def show_grants_to_role_with_grant_option(self, role):
+        return self.grants
+
+
+def checked_permissions(size):
+    step = max(size // CHECKS, 1)
+    return [
+        SnowflakePermission(
+            f"database_1.schema_{i % 100}.table_{i}", "table", ["select"], False
+        )
+        for i in range(0, size, step)
+    ]
+
+
+def list_scan(checker, permissions):
+    found = 0
+    for permission in permissions:
+        role_permissions = checker.get_permissions("reporter")
+        found += (
+            permission.as_owner() in role_permissions or permission in role_permissions
+        )
+    return found
+
+
+def index_lookup(checker, permissions):
+    return sum(checker.has_permission("reporter", p) for p in permissions)
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+def main(sizes):
+    print(f"{'grants':>10} {'list scan':>12} {'index':>12}")
+    for size in sizes:
+        checker = SnowflakeRoleGrantChecker(GrantsConnector(size))
+        permissions = checked_permissions(size)
+        list_time = (
+            f"{timed(list_scan, checker, permissions):11.3f}s"
+            if size <= MAX_LIST_SCAN_SIZE
+            else f"{'skipped':>12}"
+        )
+        index_time = timed(index_lookup, checker, permissions)
+        print(f"{size:>10} {list_time} {index_time:11.3f}s")
+
+
+if __name__ == "__main__":
+    main([int(size) for size in sys.argv[1:]] or DEFAULT_SIZES)
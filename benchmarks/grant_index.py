@@ -0,0 +1,68 @@
+"""
+Benchmark the lookups of already granted privileges for roles with a large
+number of granted tables.
+
+For every size, a role is granted SELECT on <size> tables and each of them is
+checked once, first by scanning the granted list (the previous implementation
+of SnowflakeGrantsGenerator.is_granted_privilege) and then through GrantIndex.
+The revoke statements for the same role are generated as well.
+
+Usage: python benchmarks/grant_index.py [size ...]
+"""
+import sys
+import time
+
+from permifrost.grant_index import GrantIndex
+from permifrost.snowflake_connector import SnowflakeConnector
+from permifrost.snowflake_grants import SnowflakeGrantsGenerator
+
+DEFAULT_SIZES = [1_000, 5_000, 20_000, 100_000]
+
+# The list scan is quadratic, so it is skipped for the largest sizes
+MAX_LIST_SCAN_SIZE = 20_000
+
+
+def build_grants(size):
+    tables = [f"database_1.schema_{i % 100}.table_{i}" for i in range(size)]
+    return tables, {"reporter": {"select": {"table": list(tables)}}}
+
+
+def list_scan(grants_to_role, tables):
+    granted = grants_to_role["reporter"]["select"]["table"]
+    return sum(SnowflakeConnector.snowflaky(table) in granted for table in tables)
+
+
+def index_lookup(grants_to_role, tables):
+    index = GrantIndex(grants_to_role)
+    return sum(index.is_granted("reporter", "select", "table", t) for t in tables)
+
+
+def revoke(grants_to_role, tables):
+    generator = SnowflakeGrantsGenerator(grants_to_role, {}, conn=object())
+    return generator.generate_revoke_privs(
+        "reporter", set(), {"database_1"}, tables, [], []
+    )
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+def main(sizes):
+    print(f"{'tables':>10} {'list scan':>12} {'GrantIndex':>12} {'revokes':>12}")
+    for size in sizes:
+        tables, grants_to_role = build_grants(size)
+        list_time = (
+            f"{timed(list_scan, grants_to_role, tables):11.3f}s"
+            if size <= MAX_LIST_SCAN_SIZE
+            else f"{'skipped':>12}"
+        )
+        index_time = timed(index_lookup, grants_to_role, tables)
+        revoke_time = timed(revoke, grants_to_role, tables)
+        print(f"{size:>10} {list_time} {index_time:11.3f}s {revoke_time:11.3f}s")
+
+
+if __name__ == "__main__":
+    main([int(size) for size in sys.argv[1:]] or DEFAULT_SIZES)
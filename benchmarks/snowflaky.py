@@ -0,0 +1,68 @@
+"""
+Benchmark the normalization of identifiers by SnowflakeConnector.snowflaky.
+
+<size> fully qualified table identifiers, spread over 10 databases and 1000
+schemas, are normalized one by one with the previous implementation (four
+re.match calls per name part), with the memoized snowflaky, and as a SHOW
+result column with snowflaky_all. Every identifier is normalized twice, as
+when a table is listed by SHOW TABLES and then granted.
+
+Usage: python benchmarks/snowflaky.py [size]
+"""
+import re
+import sys
+import time
+
+from permifrost.snowflake_connector import SnowflakeConnector
+
+DEFAULT_SIZE = 1_000_000
+
+
+def previous_snowflaky(name):
+    new_name_parts = []
+    for part in name.split("."):
+        if re.match('^".*"$', part) is not None:
+            new_name_parts.append(part)
+        elif re.match("<(table|view|schema)>", part, re.IGNORECASE) is not None:
+            new_name_parts.append(part.lower())
+        elif (
+            re.match("^[a-z_][0-9a-z_$]*$", part) is None
+            and re.match("^[A-Z_][0-9A-Z_$]*$", part) is None
+        ):
+            new_name_parts.append(f'"{part}"')
+        else:
+            new_name_parts.append(part.lower())
+    return ".".join(new_name_parts)
+
+
+def build_identifiers(size):
+    return [
+        f"DATABASE_{i % 10}.SCHEMA-{i % 1000}.TABLE_{i % (size // 2 or 1)}"
+        for i in range(size)
+    ]
+
+
+def timed(func, identifiers):
+    start = time.perf_counter()
+    func(identifiers)
+    return time.perf_counter() - start
+
+
+def main(size):
+    identifiers = build_identifiers(size)
+    runs = {
+        "previous": lambda names: [previous_snowflaky(name) for name in names],
+        "snowflaky": lambda names: [
+            SnowflakeConnector.snowflaky(name) for name in names
+        ],
+        "snowflaky_all": SnowflakeConnector.snowflaky_all,
+    }
+
+    print(f"{'implementation':>15} {'seconds':>9} {'identifiers/s':>15}")
+    for label, func in runs.items():
+        elapsed = timed(func, identifiers)
+        print(f"{label:>15} {elapsed:9.3f} {size / elapsed:15,.0f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_SIZE)
@@ -1,10 +1,27 @@
+import json
+import os
 import sys
 
 import click
 
 from permifrost import SpecLoadingError
+from permifrost.error import PlanLoadingError, StateLoadingError
+from permifrost.metadata_cache import SnowflakeMetadataCache, default_cache_path
+from permifrost.role_graph import RoleGraph
+from permifrost.snowflake_apply import apply_statements, generate_ahead
+from permifrost.snowflake_cassette import (
+    RecordingSnowflakeConnector,
+    ReplaySnowflakeConnector,
+)
 from permifrost.snowflake_connector import SnowflakeConnector
+from permifrost.snowflake_plan import SnowflakePlan, hash_spec
 from permifrost.snowflake_spec_loader import SnowflakeSpecLoader
+from permifrost.snowflake_state import (
+    DEFAULT_STATE_PATH,
+    SnowflakeState,
+    spec_entities,
+)
+from permifrost.spec_file_loader import load_spec
 
 from . import cli
 
@@ -37,6 +54,84 @@ def print_command(command, diff, dry=False):
     click.secho(f"{diff_prefix}{run_prefix}{command['sql']};", fg=foreground_color)
 
 
+def connection_options(func):
+    """Options controlling how the metadata of the account is fetched."""
+    options = [
+        click.option(
+            "--jobs",
+            type=click.IntRange(min=1),
+            default=1,
+            show_default=True,
+            help="Number of concurrent queries sent to Snowflake.",
+        ),
+        click.option(
+            "--use-account-usage",
+            help="Read existing grants in bulk from the SNOWFLAKE.ACCOUNT_USAGE "
+            "views. Faster on large accounts, but the views can lag behind by up "
+            "to two hours.",
+            is_flag=True,
+        ),
+        click.option(
+            "--cache-ttl",
+            type=click.IntRange(min=0),
+            default=0,
+            help="Reuse the databases, schemas, tables, views, roles and users "
+            "listed by previous runs for up to this many seconds. Disabled by "
+            "default.",
+        ),
+        click.option(
+            "--clear-cache",
+            help="Remove the metadata cached by previous runs before running.",
+            is_flag=True,
+        ),
+        click.option(
+            "--result-scan",
+            help="Filter the rows and columns of SHOW results in Snowflake, "
+            "with RESULT_SCAN, so that only the objects of the spec are "
+            "transferred.",
+            is_flag=True,
+        ),
+        click.option(
+            "--record",
+            type=click.Path(dir_okay=False, writable=True),
+            help="Record every query sent to Snowflake, with its results, to a "
+            "cassette file.",
+        ),
+        click.option(
+            "--replay",
+            type=click.Path(exists=True, dir_okay=False),
+            help="Answer the queries from a recorded cassette file instead of "
+            "Snowflake.",
+        ),
+    ]
+    for option in reversed(options):
+        func = option(func)
+    return func
+
+
+parallel_generate_option = click.option(
+    "--parallel-generate",
+    help="Generate the statements of the roles in one worker process per CPU.",
+    is_flag=True,
+)
+
+
+def generate_processes(parallel_generate):
+    """Number of processes generating the statements of the roles."""
+    return (os.cpu_count() or 1) if parallel_generate else 1
+
+
+def get_run_list(role, user):
+    """Run list of the run and plan commands, based on the given filters."""
+    if role and user:
+        return ["roles", "users"]
+    elif role:
+        return ["roles"]
+    elif user:
+        return ["users"]
+    return ["roles", "users"]
+
+
 @cli.command()  # type: ignore
 @click.argument("spec")
 @click.option("--dry", help="Do not actually run, just check.", is_flag=True)
@@ -60,19 +155,52 @@ def print_command(command, diff, dry=False):
     help="Do not handle role membership grants/revokes",
     is_flag=True,
 )
+@click.option(
+    "--stream",
+    help="Run the statements of each role and user as soon as they are "
+    "generated, while the next ones are being generated.",
+    is_flag=True,
+)
+@click.option(
+    "--changed-only",
+    help="Only process the roles and users whose spec changed since the last "
+    "successful run recorded in the state file, and the members of those roles.",
+    is_flag=True,
+)
+@click.option(
+    "--state-file",
+    type=click.Path(dir_okay=False),
+    help="State file recording the spec of the roles and users applied by "
+    f"successful runs. Defaults to {DEFAULT_STATE_PATH} with --changed-only.",
+)
+@parallel_generate_option
+@connection_options
 @click.pass_context
-def run(ctx, spec, dry, diff, role, user, ignore_memberships, print_skipped=False):
+def run(
+    ctx,
+    spec,
+    dry,
+    diff,
+    role,
+    user,
+    ignore_memberships,
+    stream,
+    changed_only,
+    state_file,
+    parallel_generate,
+    jobs,
+    use_account_usage,
+    cache_ttl,
+    clear_cache,
+    result_scan,
+    record,
+    replay,
+    print_skipped=False,
+):
     """
     Grant the permissions provided in the provided specification file for specific users and roles
     """
-    if role and user:
-        run_list = ["roles", "users"]
-    elif role:
-        run_list = ["roles"]
-    elif user:
-        run_list = ["users"]
-    else:
-        run_list = ["roles", "users"]
+    run_list = get_run_list(role, user)
     if ctx.parent.params.get("verbose", 0) >= 1:
         print_skipped = True
     permifrost_grants(
@@ -84,6 +212,17 @@ def run(ctx, spec, dry, diff, role, user, ignore_memberships, print_skipped=Fals
         run_list=run_list,
         ignore_memberships=ignore_memberships,
         print_skipped=print_skipped,
+        jobs=jobs,
+        use_account_usage=use_account_usage,
+        cache_ttl=cache_ttl,
+        clear_cache=clear_cache,
+        result_scan=result_scan,
+        record=record,
+        replay=replay,
+        stream=stream,
+        processes=generate_processes(parallel_generate),
+        changed_only=changed_only,
+        state_file=state_file,
     )
 
 
@@ -112,14 +251,90 @@ def run(ctx, spec, dry, diff, role, user, ignore_memberships, print_skipped=Fals
     default=["roles", "users"],
     help="Run grants for specific users. Usage: --user testuser --user testuser2.",
 )
-def spec_test(spec, role, user, ignore_memberships, run_list):
+@connection_options
+def spec_test(
+    spec,
+    role,
+    user,
+    ignore_memberships,
+    run_list,
+    jobs,
+    use_account_usage,
+    cache_ttl,
+    clear_cache,
+    result_scan,
+    record,
+    replay,
+):
     """
     Load SnowFlake spec based on the roles.yml provided. CLI use only for confirming specifications are valid.
     """
-    load_specs(spec, role, user, run_list, ignore_memberships)
+    with connect(cache_ttl, clear_cache, record, replay, result_scan) as conn:
+        load_specs(
+            spec,
+            role,
+            user,
+            run_list,
+            ignore_memberships,
+            conn=conn,
+            jobs=jobs,
+            use_account_usage=use_account_usage,
+        )
+
+
+def connect(
+    cache_ttl=0, clear_cache=False, record=None, replay=None, result_scan=False
+):
+    """
+    Create the connector shared by a whole run, recording or replaying its
+    queries if requested.
+    """
+    if record and replay:
+        raise click.UsageError("--record and --replay cannot be used together")
+
+    # The metadata cache is bypassed so that cassettes hold every query
+    if replay:
+        click.secho(f"Replaying queries from {replay}", fg="green")
+        return ReplaySnowflakeConnector(replay, result_scan=result_scan)
+    if record:
+        click.secho(f"Recording queries to {record}", fg="green")
+        return RecordingSnowflakeConnector(record, result_scan=result_scan)
+
+    return SnowflakeConnector(
+        cache=load_metadata_cache(cache_ttl, clear_cache), result_scan=result_scan
+    )
+
+
+def load_metadata_cache(cache_ttl, clear_cache):
+    """
+    Open the on disk metadata cache if it is enabled, clearing it first if
+    requested.
+    """
+    if not cache_ttl and not clear_cache:
+        return None
 
+    cache = SnowflakeMetadataCache(ttl=cache_ttl)
+    if clear_cache:
+        click.secho(f"Clearing metadata cache at {cache.path}", fg="green")
+        cache.clear()
 
-def load_specs(spec, role, user, run_list, ignore_memberships):
+    if not cache_ttl:
+        cache.close()
+        return None
+
+    return cache
+
+
+def load_specs(
+    spec,
+    role,
+    user,
+    run_list,
+    ignore_memberships,
+    conn=None,
+    jobs=1,
+    use_account_usage=False,
+):
     """
     Load specs separately.
     """
@@ -127,10 +342,13 @@ def load_specs(spec, role, user, run_list, ignore_memberships):
         click.secho("Confirming spec loads successfully")
         spec_loader = SnowflakeSpecLoader(
             spec,
+            conn=conn,
             roles=role,
             users=user,
             run_list=run_list,
             ignore_memberships=ignore_memberships,
+            jobs=jobs,
+            use_account_usage=use_account_usage,
         )
         click.secho("Snowflake specs successfully loaded", fg="green")
     except SpecLoadingError as exc:
@@ -142,24 +360,159 @@ def load_specs(spec, role, user, run_list, ignore_memberships):
 
 
 def permifrost_grants(
-    spec, dry, diff, roles, users, run_list, ignore_memberships, print_skipped
+    spec,
+    dry,
+    diff,
+    roles,
+    users,
+    run_list,
+    ignore_memberships,
+    print_skipped,
+    jobs=1,
+    use_account_usage=False,
+    cache_ttl=0,
+    clear_cache=False,
+    result_scan=False,
+    record=None,
+    replay=None,
+    stream=False,
+    processes=1,
+    changed_only=False,
+    state_file=None,
 ):
     """Grant the permissions provided in the provided specification file."""
-    spec_loader = load_specs(
-        spec,
-        role=roles,
-        user=users,
-        run_list=run_list,
-        ignore_memberships=ignore_memberships,
+    state = None
+    if changed_only or state_file:
+        state_file = state_file or DEFAULT_STATE_PATH
+        spec_data, state = load_state(spec, state_file)
+
+    if changed_only:
+        roles, users, run_list = filter_changed_entities(
+            spec_data, state, roles, users, run_list
+        )
+        if not run_list:
+            click.secho(
+                f"No roles or users changed since the last run ({state.applied_at})",
+                fg="green",
+            )
+            return
+
+    with connect(cache_ttl, clear_cache, record, replay, result_scan) as conn:
+        spec_loader = load_specs(
+            spec,
+            role=roles,
+            user=users,
+            run_list=run_list,
+            ignore_memberships=ignore_memberships,
+            conn=conn,
+            jobs=jobs,
+            use_account_usage=use_account_usage,
+        )
+
+        if stream:
+            # Generate the statements of the next role while running these
+            query_batches = generate_ahead(
+                spec_loader.iter_permission_queries(
+                    roles=roles,
+                    users=users,
+                    run_list=run_list,
+                    ignore_memberships=ignore_memberships,
+                    processes=processes,
+                )
+            )
+        else:
+            query_batches = [
+                spec_loader.generate_permission_queries(
+                    roles=roles,
+                    users=users,
+                    run_list=run_list,
+                    ignore_memberships=ignore_memberships,
+                    processes=processes,
+                )
+            ]
+
+        failed = execute_query_batches(
+            conn, query_batches, dry, diff, print_skipped, jobs=jobs
+        )
+
+    if state is not None and not dry and not failed:
+        state.record(
+            spec_data,
+            roles=applied_entities(spec_data, "roles", roles, run_list),
+            users=applied_entities(spec_data, "users", users, run_list),
+        )
+        state.save(state_file)
+        click.secho(f"Recorded the applied spec in {state_file}", fg="green")
+
+
+def read_spec(spec):
+    """
+    Load the spec file only, without checking it against Snowflake.
+    """
+    try:
+        return load_spec(spec)
+    except SpecLoadingError as exc:
+        for line in str(exc).splitlines():
+            click.secho(line, fg="red")
+        sys.exit(1)
+
+
+def load_state(spec, state_file):
+    """
+    Load the spec file and the state of the previous runs.
+    """
+    spec_data = read_spec(spec)
+    try:
+        return spec_data, SnowflakeState.load(state_file)
+    except StateLoadingError as exc:
+        click.secho(str(exc), fg="red")
+        sys.exit(1)
+
+
+def filter_changed_entities(spec_data, state, roles, users, run_list):
+    """
+    Restrict the role and user filters, and the run list, to the entities
+    changed since the state was recorded.
+    """
+    changed_roles, changed_users = state.changed_entities(spec_data)
+    roles = [name for name in changed_roles if not roles or name in roles]
+    users = [name for name in changed_users if not users or name in users]
+    click.secho(
+        f"Processing {len(roles)} changed role(s) and {len(users)} changed user(s)",
+        fg="green",
     )
 
-    sql_grant_queries = spec_loader.generate_permission_queries(
-        roles=roles,
-        users=users,
-        run_list=run_list,
-        ignore_memberships=ignore_memberships,
+    changed = {"roles": roles, "users": users}
+    return roles, users, [entity for entity in run_list if changed[entity]]
+
+
+def applied_entities(spec_data, entity_type, names, run_list):
+    """
+    Names of the roles or users of the spec processed by a run.
+    """
+    if entity_type not in run_list:
+        return []
+    return [
+        name
+        for name in spec_entities(spec_data, entity_type)
+        if not names or name in names
+    ]
+
+
+def execute_queries(conn, sql_grant_queries, dry, diff, print_skipped, jobs=1):
+    """Run the generated queries, or only print them if dry."""
+    return execute_query_batches(
+        conn, [sql_grant_queries], dry, diff, print_skipped, jobs=jobs
     )
 
+
+def execute_query_batches(conn, query_batches, dry, diff, print_skipped, jobs=1):
+    """
+    Run the generated queries batch after batch, or only print them if dry.
+    The statements of a batch only run once the previous batch has completed.
+
+    Return the number of statements that failed.
+    """
     click.secho()
     if diff:
         click.secho(
@@ -169,27 +522,263 @@ def permifrost_grants(
         click.secho("SQL Commands generated for given spec file:")
     click.secho()
 
-    conn = SnowflakeConnector()
-    for query in sql_grant_queries:
-        if not dry:
-            status = None
-            if not query.get("already_granted"):
-                try:
-                    conn.run_query(query.get("sql", ""))
-                    status = True
-                except Exception:
-                    status = False
-
-                ran_query = query
-                ran_query["run_status"] = status
-                print_command(ran_query, diff)
-            # If already granted, print command
-            elif print_skipped:
-                print_command(query, diff)
-        # If dry, print commands
-        else:
+    failed = 0
+    if not dry:
+
+        def report(query):
             if not query.get("already_granted") or print_skipped:
-                print_command(query, diff, dry=True)
+                print_command(query, diff)
+
+        for sql_grant_queries in query_batches:
+            apply_statements(conn, sql_grant_queries, jobs=jobs, report=report)
+            failed += sum(
+                query.get("run_status") is False for query in sql_grant_queries
+            )
+    # If dry, print commands
+    else:
+        for sql_grant_queries in query_batches:
+            for query in sql_grant_queries:
+                if not query.get("already_granted") or print_skipped:
+                    print_command(query, diff, dry=True)
+
+    # Ownership grants change the roles and objects listed by Snowflake
+    if not dry and conn.cache is not None:
+        conn.cache.clear(conn.cache_scope)
+
+    return failed
+
+
+@cli.command()  # type: ignore
+@click.argument("spec")
+@click.option(
+    "--out",
+    required=True,
+    type=click.Path(dir_okay=False, writable=True),
+    help="File the plan is written to.",
+)
+@click.option(
+    "--diff", help="Show full diff, both new and existing permissions.", is_flag=True
+)
+@click.option(
+    "--role",
+    multiple=True,
+    default=[],
+    help="Plan grants for specific roles. Usage: --role testrole --role testrole2.",
+)
+@click.option(
+    "--user",
+    multiple=True,
+    default=[],
+    help="Plan grants for specific users. Usage: --user testuser --user testuser2.",
+)
+@click.option(
+    "--ignore-memberships",
+    help="Do not handle role membership grants/revokes",
+    is_flag=True,
+)
+@parallel_generate_option
+@connection_options
+@click.pass_context
+def plan(
+    ctx,
+    spec,
+    out,
+    diff,
+    role,
+    user,
+    ignore_memberships,
+    parallel_generate,
+    jobs,
+    use_account_usage,
+    cache_ttl,
+    clear_cache,
+    result_scan,
+    record,
+    replay,
+):
+    """
+    Generate the commands for the provided specification file and save them to a plan file, to be run with apply
+    """
+    run_list = get_run_list(role, user)
+    print_skipped = ctx.parent.params.get("verbose", 0) >= 1
+    snapshot_timestamp = SnowflakePlan.now()
+
+    with connect(cache_ttl, clear_cache, record, replay, result_scan) as conn:
+        spec_loader = load_specs(
+            spec,
+            role=role,
+            user=user,
+            run_list=run_list,
+            ignore_memberships=ignore_memberships,
+            conn=conn,
+            jobs=jobs,
+            use_account_usage=use_account_usage,
+        )
+        sql_grant_queries = spec_loader.generate_permission_queries(
+            roles=role,
+            users=user,
+            run_list=run_list,
+            ignore_memberships=ignore_memberships,
+            processes=generate_processes(parallel_generate),
+        )
+        execute_queries(conn, sql_grant_queries, True, diff, print_skipped)
+
+    SnowflakePlan(
+        spec_path=spec,
+        spec_hash=hash_spec(spec),
+        snapshot_timestamp=snapshot_timestamp,
+        queries=sql_grant_queries,
+        roles=list(role),
+        users=list(user),
+        run_list=run_list,
+        ignore_memberships=ignore_memberships,
+    ).save(out)
+    click.secho()
+    click.secho(f"Plan written to {out}", fg="green")
+
+
+@cli.command()  # type: ignore
+@click.argument("plan_file", type=click.Path(exists=True, dir_okay=False))
+@click.option("--dry", help="Do not actually run, just check.", is_flag=True)
+@click.option(
+    "--diff", help="Show full diff, both new and existing permissions.", is_flag=True
+)
+@click.option(
+    "--force",
+    help="Run the plan even if its spec file changed or was removed since it "
+    "was generated.",
+    is_flag=True,
+)
+@click.option(
+    "--jobs",
+    type=click.IntRange(min=1),
+    default=1,
+    show_default=True,
+    help="Number of concurrent queries sent to Snowflake.",
+)
+@click.pass_context
+def apply(ctx, plan_file, dry, diff, force, jobs):
+    """
+    Run the commands saved in a plan file generated with plan
+    """
+    try:
+        saved_plan = SnowflakePlan.load(plan_file)
+    except PlanLoadingError as exc:
+        click.secho(str(exc), fg="red")
+        sys.exit(1)
+
+    if not os.path.exists(saved_plan.spec_path):
+        spec_error = f"Spec file {saved_plan.spec_path} of the plan no longer exists"
+    elif not saved_plan.matches_spec():
+        spec_error = (
+            f"Spec file {saved_plan.spec_path} changed since the plan was generated"
+        )
+    else:
+        spec_error = None
+
+    if spec_error:
+        click.secho(spec_error, fg="yellow" if force else "red")
+        if not force:
+            sys.exit(1)
+
+    click.secho(
+        f"Applying plan generated from {saved_plan.spec_path} with the account "
+        f"state of {saved_plan.snapshot_timestamp} "
+        f"({int(saved_plan.snapshot_age.total_seconds() // 60)} minutes ago)",
+        fg="green",
+    )
+
+    print_skipped = ctx.parent.params.get("verbose", 0) >= 1
+    # Open the metadata cache, if any, only to invalidate it after the run
+    cache = SnowflakeMetadataCache(ttl=0) if default_cache_path().exists() else None
+    with SnowflakeConnector(cache=cache) as conn:
+        execute_queries(conn, saved_plan.queries, dry, diff, print_skipped, jobs=jobs)
+
+
+@cli.command()  # type: ignore
+@click.argument("spec")
+@click.option(
+    "--role",
+    multiple=True,
+    default=[],
+    help="Only show specific roles and users. Usage: --role testrole --role testuser.",
+)
+@click.option(
+    "--from-snowflake",
+    help="Show the role memberships granted in Snowflake to the roles and users "
+    "of the spec instead of the ones defined in the spec.",
+    is_flag=True,
+)
+@click.option(
+    "--format",
+    "output_format",
+    type=click.Choice(["text", "json", "dot"]),
+    default="text",
+    show_default=True,
+    help="Output format, dot being the Graphviz format.",
+)
+@connection_options
+def graph(
+    spec,
+    role,
+    from_snowflake,
+    output_format,
+    jobs,
+    use_account_usage,
+    cache_ttl,
+    clear_cache,
+    result_scan,
+    record,
+    replay,
+):
+    """
+    Show the role hierarchy: the roles each role and user is a member of,
+    directly or inherited, and the roles that are members of each other.
+    """
+    if from_snowflake:
+        with connect(cache_ttl, clear_cache, record, replay, result_scan) as conn:
+            spec_loader = load_specs(
+                spec,
+                role=role,
+                user=role,
+                run_list=["roles", "users"],
+                ignore_memberships=False,
+                conn=conn,
+                jobs=jobs,
+                use_account_usage=use_account_usage,
+            )
+        role_graph = RoleGraph.from_grants(
+            spec_loader.grants_to_role, spec_loader.roles_granted_to_user
+        )
+    else:
+        role_graph = RoleGraph.from_spec(read_spec(spec))
+
+    entities = role_graph.to_dict()
+    if role:
+        names = {SnowflakeConnector.snowflaky_user_role(name) for name in role}
+        entities = {name: entity for name, entity in entities.items() if name in names}
+
+    if output_format == "json":
+        click.echo(json.dumps(entities, indent=2))
+    elif output_format == "dot":
+        click.echo(role_graph.to_dot())
+    else:
+        for name, entity in entities.items():
+            click.echo(name)
+            for key, label in [
+                ("member_of", "member of"),
+                ("inherits", "inherits"),
+                ("members", "members"),
+            ]:
+                click.echo(f"  {label}: {', '.join(entity[key]) or '-'}")
+
+    cycles = role_graph.cycles()
+    for cycle in cycles:
+        click.secho(
+            f"Roles {', '.join(cycle)} are members of each other", fg="red", err=True
+        )
+    if cycles:
+        sys.exit(1)
 
 
 cli.add_command(spec_test)  # type: ignore
@@ -2,6 +2,7 @@ from typing import Any, Dict, List, Set, Tuple, TypedDict
 
 from permifrost.error import SpecLoadingError
 from permifrost.logger import GLOBAL_LOGGER as logger
+from permifrost.role_graph import RoleGraph
 from permifrost.types import PermifrostSpecSchema
 
 
@@ -59,6 +60,8 @@ class EntityGenerator:
 
         self.error_messages.extend(self.ensure_valid_references(self.entities))
 
+        self.error_messages.extend(self.ensure_acyclic_memberships())
+
         if self.error_messages:
             raise SpecLoadingError("\n".join(self.error_messages))
 
@@ -265,6 +268,18 @@ class EntityGenerator:
 
         return error_messages
 
+    def ensure_acyclic_memberships(self) -> List[str]:
+        """
+        Make sure that no roles are members of each other through member_of,
+        as Snowflake rejects cyclic role grants. member_of "*" is not expanded.
+
+        Returns a list with all the errors found.
+        """
+        return [
+            f"Reference error: Roles {', '.join(cycle)} are members of each other"
+            for cycle in RoleGraph.from_spec(self.spec, expand_star=False).cycles()
+        ]
+
     def ensure_valid_spec_for_conditional_settings(
         self, entities: EntitySchema
     ) -> List[str]:
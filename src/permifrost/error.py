@@ -2,3 +2,21 @@ class SpecLoadingError(Exception):
     """Exception for when a provided Permissions Spec is invalid."""
 
     pass
+
+
+class CassetteError(Exception):
+    """Exception for when a recorded cassette can not be replayed."""
+
+    pass
+
+
+class PlanLoadingError(Exception):
+    """Exception for when a saved plan can not be loaded."""
+
+    pass
+
+
+class StateLoadingError(Exception):
+    """Exception for when a state file can not be loaded."""
+
+    pass
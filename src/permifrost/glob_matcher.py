@@ -0,0 +1,127 @@
+import re
+from typing import Dict, Iterable, List, Pattern, Tuple
+
+from permifrost.snowflake_connector import SnowflakeConnector
+
+
+def _is_pattern_part(part: str) -> bool:
+    return not part.startswith('"') and ("*" in part or "?" in part)
+
+
+def is_pattern(identifier: str) -> bool:
+    """
+    Check whether a database, schema or table identifier contains a `*` or
+    `?` wildcard outside of a quoted name part.
+    """
+    return any(_is_pattern_part(part) for part in identifier.split("."))
+
+
+def _part_regex(part: str) -> str:
+    if not _is_pattern_part(part):
+        return re.escape(SnowflakeConnector.snowflaky(part))
+
+    translated = "".join(
+        "[^.]*" if char == "*" else "[^.]" if char == "?" else re.escape(char)
+        for char in part
+    )
+    # Names that are not valid unquoted identifiers are listed quoted
+    return f'(?i:"{translated}"|{translated})'
+
+
+def pattern_regex(pattern: str) -> str:
+    """
+    Translate a glob pattern over a db.schema.table identifier into a regular
+    expression matching normalized (snowflaky) identifiers.
+
+    `*` matches any number of characters and `?` a single character within a
+    name part, at any position and at any level. Parts without wildcards
+    match the same name normalized by SnowflakeConnector.snowflaky, parts
+    with wildcards are matched case insensitively, quoted or not.
+    """
+    return r"\.".join(_part_regex(part) for part in pattern.split("."))
+
+
+def _literal_prefix(pattern: str) -> str:
+    """
+    Return the normalized name parts of a pattern before its first wildcard.
+    """
+    prefix = []
+    for part in pattern.split("."):
+        if _is_pattern_part(part):
+            break
+        prefix.append(SnowflakeConnector.snowflaky(part))
+    return ".".join(prefix)
+
+
+class GlobMatcher:
+    """
+    Matches normalized identifiers against a set of glob patterns.
+
+    All the patterns are compiled into a single regular expression, so that
+    a list of identifiers, e.g. every table of a database, is matched against
+    any number of patterns in one pass instead of once per pattern. To find
+    which patterns an identifier matches, patterns are grouped by the names
+    preceding their first wildcard (e.g. the database and schema) and only
+    the group(s) sharing the identifier's leading names are evaluated.
+    """
+
+    def __init__(self, patterns: Iterable[str]) -> None:
+        self.patterns = list(dict.fromkeys(patterns))
+        self._any = re.compile(
+            "|".join(f"(?:{pattern_regex(pattern)})" for pattern in self.patterns)
+            or "(?!)"
+        )
+
+        grouped: Dict[str, List[str]] = {}
+        for pattern in self.patterns:
+            grouped.setdefault(_literal_prefix(pattern), []).append(pattern)
+
+        # Every pattern of a group is tried as an optional lookahead, so that
+        # the groups of all the patterns matching an identifier are set by a
+        # single match
+        self._groups: Dict[str, Tuple[Pattern, List[str]]] = {
+            prefix: (
+                re.compile(
+                    "".join(
+                        f"(?:(?=({pattern_regex(pattern)})$))?"
+                        for pattern in group_patterns
+                    )
+                ),
+                group_patterns,
+            )
+            for prefix, group_patterns in grouped.items()
+        }
+
+    def matches(self, identifier: str) -> bool:
+        return self._any.fullmatch(identifier) is not None
+
+    def filter(self, identifiers: Iterable[str]) -> List[str]:
+        """
+        Return the identifiers matching any of the patterns, in order.
+        """
+        fullmatch = self._any.fullmatch
+        return [identifier for identifier in identifiers if fullmatch(identifier)]
+
+    def match_all(self, identifiers: Iterable[str]) -> Dict[str, List[str]]:
+        """
+        Return the identifiers matching each pattern, in order.
+        """
+        matched: Dict[str, List[str]] = {pattern: [] for pattern in self.patterns}
+        fullmatch = self._any.fullmatch
+
+        for identifier in identifiers:
+            if not fullmatch(identifier):
+                continue
+
+            parts = identifier.split(".")
+            for length in range(len(parts) + 1):
+                group = self._groups.get(".".join(parts[:length]))
+                if group is None:
+                    continue
+                regex, group_patterns = group
+                values = regex.match(identifier).groups()  # type: ignore
+                for value, pattern in zip(values, group_patterns):
+                    if value is not None:
+                        matched[pattern].append(identifier)
+
+        return matched
@@ -0,0 +1,51 @@
+from typing import Dict, List, Set, Tuple
+
+from permifrost.snowflake_connector import SnowflakeConnector
+
+
+class GrantIndex:
+    """
+    Index over the privileges granted to roles, as returned by
+    SnowflakeSpecLoader.grants_to_role:
+
+        {'role': {'privilege': {'entity_type': ['entity_name', ...]}}}
+
+    Membership checks are answered from a set of normalized (snowflaky) names
+    per (role, privilege, entity_type) instead of scanning the granted list,
+    which can hold hundreds of thousands of tables for a single role. Sets are
+    built on the first lookup of each key; the indexed grants are not expected
+    to change afterwards.
+    """
+
+    def __init__(self, grants_to_role: Dict) -> None:
+        self.grants_to_role = grants_to_role
+        self._names: Dict[Tuple[str, str, str], Set[str]] = {}
+
+    def granted(self, role: str, privilege: str, entity_type: str) -> List[str]:
+        """
+        Return the names of the <entity_type> entities on which <role> has
+        been granted <privilege>, in the order they were fetched.
+        """
+        return self.grants_to_role.get(role, {}).get(privilege, {}).get(entity_type, [])
+
+    def granted_set(self, role: str, privilege: str, entity_type: str) -> Set[str]:
+        """
+        Return the normalized names of the <entity_type> entities on which
+        <role> has been granted <privilege>.
+        """
+        key = (role, privilege, entity_type)
+        names = self._names.get(key)
+        if names is None:
+            names = {
+                SnowflakeConnector.snowflaky(name)
+                for name in self.granted(role, privilege, entity_type)
+            }
+            self._names[key] = names
+        return names
+
+    def is_granted(
+        self, role: str, privilege: str, entity_type: str, entity_name: str
+    ) -> bool:
+        return SnowflakeConnector.snowflaky(entity_name) in self.granted_set(
+            role, privilege, entity_type
+        )
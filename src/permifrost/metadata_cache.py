@@ -0,0 +1,121 @@
+import functools
+import inspect
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Optional, TypeVar, cast
+
+from permifrost.logger import GLOBAL_LOGGER as logger
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+DEFAULT_CACHE_TTL = 15 * 60
+
+
+def default_cache_path() -> Path:
+    """
+    Return the location of the metadata cache, honouring XDG_CACHE_HOME.
+    """
+    cache_home = os.getenv("XDG_CACHE_HOME") or os.path.join("~", ".cache")
+    return Path(cache_home).expanduser() / "permifrost" / "metadata.sqlite"
+
+
+class SnowflakeMetadataCache:
+    """
+    On disk cache for the results of the SHOW queries that list the objects
+    of a Snowflake account (databases, schemas, tables, views, roles and users).
+
+    Results are stored in a SQLite database, keyed by a scope (the account and
+    role that ran the query) and the query itself, and are considered stale
+    <ttl> seconds after they were stored.
+    """
+
+    def __init__(
+        self, path: Optional[Path] = None, ttl: int = DEFAULT_CACHE_TTL
+    ) -> None:
+        self.path = Path(path) if path is not None else default_cache_path()
+        self.ttl = ttl
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        # The connection is shared by the threads fetching metadata
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+        with self._db:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS metadata ("
+                "scope TEXT NOT NULL, "
+                "key TEXT NOT NULL, "
+                "value TEXT NOT NULL, "
+                "stored_at REAL NOT NULL, "
+                "PRIMARY KEY (scope, key))"
+            )
+
+    def get(self, scope: str, key: str) -> Optional[Any]:
+        """
+        Return the cached value for <key>, or None if it is missing or stale.
+        """
+        with self._lock:
+            row = self._db.execute(
+                "SELECT value, stored_at FROM metadata WHERE scope = ? AND key = ?",
+                (scope, key),
+            ).fetchone()
+
+        if row is None or time.time() - row[1] > self.ttl:
+            return None
+        return json.loads(row[0])
+
+    def set(self, scope: str, key: str, value: Any) -> None:
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO metadata (scope, key, value, stored_at) "
+                "VALUES (?, ?, ?, ?)",
+                (scope, key, json.dumps(value), time.time()),
+            )
+
+    def clear(self, scope: Optional[str] = None) -> None:
+        """
+        Remove the cached results of <scope>, or of every scope if not given.
+        """
+        with self._lock, self._db:
+            if scope is None:
+                self._db.execute("DELETE FROM metadata")
+            else:
+                self._db.execute("DELETE FROM metadata WHERE scope = ?", (scope,))
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+def cached_metadata(func: F) -> F:
+    """
+    Serve the results of a SnowflakeConnector SHOW method from the connector's
+    metadata cache, if it has one.
+    """
+
+    signature = inspect.signature(func)
+
+    @functools.wraps(func)
+    def wrapper(self, *args, **kwargs):
+        cache = getattr(self, "cache", None)
+        if cache is None:
+            return func(self, *args, **kwargs)
+
+        # Bind the arguments so that a call is cached under the same key
+        # whether its arguments are passed by position, by name or defaulted
+        bound = signature.bind(self, *args, **kwargs)
+        bound.apply_defaults()
+        arguments = dict(list(bound.arguments.items())[1:])
+        key = json.dumps([func.__name__, arguments], sort_keys=True)
+        value = cache.get(self.cache_scope, key)
+        if value is None:
+            value = func(self, *args, **kwargs)
+            cache.set(self.cache_scope, key, value)
+        else:
+            logger.debug(f"Using cached metadata for {func.__name__}{args or ''}")
+        return value
+
+    return cast(F, wrapper)
@@ -0,0 +1,63 @@
+from typing import Callable, Iterable, List, Optional, Set
+
+from permifrost.snowflake_command import SnowflakeCommand
+
+QueryProcessor = Callable[[List[SnowflakeCommand]], List[SnowflakeCommand]]
+
+
+def duplicate_key(command: SnowflakeCommand) -> Optional[str]:
+    """
+    Return the key identifying the commands that supersede each other, i.e.
+    the GRANT OWNERSHIP commands on the same object and identical REVOKE ALL
+    commands, or None for commands that are never removed.
+    """
+    sql = command["sql"]
+    if sql.startswith("GRANT OWNERSHIP ON"):
+        return sql.split("TO ROLE", 1)[0]
+    if sql.startswith("REVOKE ALL"):
+        return sql
+    return None
+
+
+def remove_duplicate_queries(
+    sql_commands: List[SnowflakeCommand],
+) -> List[SnowflakeCommand]:
+    """
+    Only keep the last of the commands sharing a duplicate_key, e.g. the last
+    GRANT OWNERSHIP on a DB/SCHEMA/TABLE, in a single pass over the commands.
+    """
+    seen: Set[str] = set()
+    kept = []
+
+    for command in reversed(sql_commands):
+        key = duplicate_key(command)
+        if key is not None:
+            if key in seen:
+                continue
+            seen.add(key)
+        kept.append(command)
+
+    kept.reverse()
+    return kept
+
+
+class QueryPipeline:
+    """
+    Ordered processors applied to all the commands generated for a spec
+    before they are printed or run. Every processor receives the list
+    returned by the previous one and returns the commands to keep, e.g. with
+    duplicates removed, merged or reordered.
+    """
+
+    def __init__(self, processors: Optional[Iterable[QueryProcessor]] = None) -> None:
+        self.processors: List[QueryProcessor] = (
+            list(processors) if processors is not None else [remove_duplicate_queries]
+        )
+
+    def append(self, processor: QueryProcessor) -> None:
+        self.processors.append(processor)
+
+    def __call__(self, sql_commands: List[SnowflakeCommand]) -> List[SnowflakeCommand]:
+        for processor in self.processors:
+            sql_commands = processor(sql_commands)
+        return sql_commands
@@ -0,0 +1,298 @@
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Set
+
+from permifrost.snowflake_connector import SnowflakeConnector
+
+# Memberships between these roles are never granted by Permifrost
+SNOWFLAKE_DEFAULT_ROLES = frozenset(
+    ["accountadmin", "sysadmin", "securityadmin", "useradmin", "public"]
+)
+
+
+def _name(name: str) -> str:
+    return SnowflakeConnector.snowflaky_user_role(name)
+
+
+class RoleGraph:
+    """
+    Directed graph of the role hierarchy: an edge goes from a role or user to
+    each role granted to it, i.e. each role it is a member of.
+
+    The transitive closure in both directions (the roles inherited by an
+    entity and the entities inheriting a role) is computed once, the first
+    time it is needed after the graph changed, so that later lookups are
+    constant time. Roles that are members of each other are grouped into
+    cycles, which Snowflake rejects.
+    """
+
+    def __init__(self) -> None:
+        self.users: Set[str] = set()
+        self._roles_of: Dict[str, Set[str]] = {}
+        self._members_of: Dict[str, Set[str]] = {}
+        self._inherited: Optional[Dict[str, FrozenSet[str]]] = None
+        self._inheritors: Optional[Dict[str, FrozenSet[str]]] = None
+        self._cycles: Optional[List[List[str]]] = None
+
+    @classmethod
+    def from_spec(cls, spec: Dict, expand_star: bool = True) -> "RoleGraph":
+        """
+        Build the graph of the memberships declared by the member_of of the
+        roles and users of a spec. A member_of "*" makes the role a member of
+        every other role of the spec that is not excluded, or of none if
+        <expand_star> is False. As when generating grants, memberships between
+        Snowflake default roles are skipped.
+        """
+        graph = cls()
+        all_roles = (
+            [_name(role) for role_dict in spec.get("roles") or [] for role in role_dict]
+            if expand_star
+            else []
+        )
+
+        for entity_type in ["roles", "users"]:
+            for entity_dict in spec.get(entity_type) or []:
+                for name, config in entity_dict.items():
+                    name = _name(name)
+                    graph.add_entity(name, is_user=entity_type == "users")
+                    for role in graph._member_of_list(config, all_roles):
+                        if role == name or (
+                            name in SNOWFLAKE_DEFAULT_ROLES
+                            and role in SNOWFLAKE_DEFAULT_ROLES
+                        ):
+                            continue
+                        graph.add_membership(name, role)
+
+        return graph
+
+    @classmethod
+    def from_grants(
+        cls,
+        grants_to_role: Dict,
+        roles_granted_to_user: Optional[Dict[str, List[str]]] = None,
+    ) -> "RoleGraph":
+        """
+        Build the graph of the memberships granted in Snowflake, from the
+        usage privileges on roles of SnowflakeSpecLoader.grants_to_role and
+        from SnowflakeSpecLoader.roles_granted_to_user.
+        """
+        graph = cls()
+        for role, grants in grants_to_role.items():
+            graph.add_entity(_name(role))
+            for granted_role in grants.get("usage", {}).get("role", []):
+                graph.add_membership(_name(role), _name(granted_role))
+        for user, granted_roles in (roles_granted_to_user or {}).items():
+            graph.add_entity(_name(user), is_user=True)
+            for granted_role in granted_roles:
+                graph.add_membership(_name(user), _name(granted_role))
+        return graph
+
+    @staticmethod
+    def _member_of_list(config: Any, all_roles: List[str]) -> List[str]:
+        member_of = (config or {}).get("member_of", [])
+        exclude: List[str] = []
+        if isinstance(member_of, dict):
+            exclude = [_name(role) for role in member_of.get("exclude", [])]
+            member_of = member_of.get("include", [])
+
+        include = [_name(role) for role in member_of]
+        if _name("*") in include:
+            include = all_roles
+
+        return [role for role in include if role not in exclude]
+
+    def add_entity(self, name: str, is_user: bool = False) -> None:
+        self._roles_of.setdefault(name, set())
+        self._members_of.setdefault(name, set())
+        if is_user:
+            self.users.add(name)
+        self._invalidate()
+
+    def add_membership(self, member: str, role: str) -> None:
+        """
+        Record that <member> (a role or a user) is granted <role>.
+        """
+        self.add_entity(member)
+        self.add_entity(role)
+        self._roles_of[member].add(role)
+        self._members_of[role].add(member)
+
+    def merge(self, other: "RoleGraph") -> None:
+        """
+        Add the entities and memberships of <other> to this graph.
+        """
+        for name, roles in other._roles_of.items():
+            self.add_entity(name, is_user=name in other.users)
+            for role in roles:
+                self.add_membership(name, role)
+
+    def _invalidate(self) -> None:
+        self._inherited = None
+        self._inheritors = None
+        self._cycles = None
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._roles_of
+
+    def __len__(self) -> int:
+        return len(self._roles_of)
+
+    @property
+    def roles(self) -> List[str]:
+        return sorted(name for name in self._roles_of if name not in self.users)
+
+    def roles_of(self, name: str) -> FrozenSet[str]:
+        """
+        Return the roles directly granted to a role or user.
+        """
+        return frozenset(self._roles_of.get(name, ()))
+
+    def members_of(self, role: str) -> FrozenSet[str]:
+        """
+        Return the roles and users directly granted <role>.
+        """
+        return frozenset(self._members_of.get(role, ()))
+
+    def inherited_roles(self, name: str) -> FrozenSet[str]:
+        """
+        Return every role a role or user inherits the privileges of, directly
+        or through other roles.
+        """
+        if self._inherited is None:
+            self._inherited = self._closure(self._roles_of)
+        return self._inherited.get(name, frozenset())
+
+    def inheritors(self, role: str) -> FrozenSet[str]:
+        """
+        Return every role and user inheriting the privileges of <role>,
+        directly or through other roles.
+        """
+        if self._inheritors is None:
+            self._inheritors = self._closure(self._members_of)
+        return self._inheritors.get(role, frozenset())
+
+    def dependents(self, roles: Iterable[str]) -> Set[str]:
+        """
+        Return the roles and users inheriting any of <roles>.
+        """
+        dependents: Set[str] = set()
+        for role in roles:
+            dependents |= self.inheritors(role)
+        return dependents
+
+    def cycles(self) -> List[List[str]]:
+        """
+        Return the groups of roles that are members of each other, directly
+        or through other roles, each sorted by name.
+        """
+        if self._cycles is None:
+            self._cycles = sorted(
+                sorted(component)
+                for component in self._components(self._roles_of)
+                if len(component) > 1 or component[0] in self._roles_of[component[0]]
+            )
+        return self._cycles
+
+    @staticmethod
+    def _components(edges: Dict[str, Set[str]]) -> List[List[str]]:
+        """
+        Return the strongly connected components of a graph, with Tarjan's
+        algorithm, in reverse topological order: every component is listed
+        after the components it has edges to.
+        """
+        index: Dict[str, int] = {}
+        lowlink: Dict[str, int] = {}
+        stack: List[str] = []
+        on_stack: Set[str] = set()
+        components: List[List[str]] = []
+
+        for root in sorted(edges):
+            if root in index:
+                continue
+
+            # Iterative depth-first search, as role hierarchies can be deeper
+            # than the recursion limit
+            work = [(root, iter(sorted(edges[root])))]
+            index[root] = lowlink[root] = len(index)
+            stack.append(root)
+            on_stack.add(root)
+
+            while work:
+                node, successors = work[-1]
+                for successor in successors:
+                    if successor not in index:
+                        index[successor] = lowlink[successor] = len(index)
+                        stack.append(successor)
+                        on_stack.add(successor)
+                        work.append((successor, iter(sorted(edges[successor]))))
+                        break
+                    if successor in on_stack:
+                        lowlink[node] = min(lowlink[node], index[successor])
+                else:
+                    work.pop()
+                    if work:
+                        parent = work[-1][0]
+                        lowlink[parent] = min(lowlink[parent], lowlink[node])
+                    if lowlink[node] == index[node]:
+                        component = []
+                        while True:
+                            member = stack.pop()
+                            on_stack.discard(member)
+                            component.append(member)
+                            if member == node:
+                                break
+                        components.append(component)
+
+        return components
+
+    def _closure(self, edges: Dict[str, Set[str]]) -> Dict[str, FrozenSet[str]]:
+        """
+        Return the nodes reachable from every node of a graph. Nodes of a
+        cycle reach each other, including themselves.
+        """
+        closure: Dict[str, FrozenSet[str]] = {}
+        for component in self._components(edges):
+            members = set(component)
+            reachable: Set[str] = set()
+            for node in component:
+                for successor in edges[node]:
+                    reachable.add(successor)
+                    if successor not in members:
+                        reachable |= closure[successor]
+            if len(component) == 1 and component[0] not in edges[component[0]]:
+                reachable.discard(component[0])
+
+            frozen = frozenset(reachable)
+            for node in component:
+                closure[node] = frozen
+
+        return closure
+
+    def to_dict(self) -> Dict[str, Dict[str, List[str]]]:
+        """
+        Return the direct and inherited roles of every role and user.
+        """
+        return {
+            name: {
+                "member_of": sorted(self._roles_of[name]),
+                "inherits": sorted(self.inherited_roles(name)),
+                "members": sorted(self._members_of[name]),
+            }
+            for name in sorted(self._roles_of)
+        }
+
+    def to_dot(self) -> str:
+        """
+        Return the graph in the Graphviz DOT language.
+        """
+
+        def quote(name: str) -> str:
+            return '"{}"'.format(name.replace('"', '\\"'))
+
+        lines = ["digraph roles {"]
+        for name in sorted(self._roles_of):
+            shape = "ellipse" if name in self.users else "box"
+            lines.append(f"  {quote(name)} [shape={shape}];")
+        for name in sorted(self._roles_of):
+            for role in sorted(self._roles_of[name]):
+                lines.append(f"  {quote(name)} -> {quote(role)};")
+        lines.append("}")
+        return "\n".join(lines)
@@ -0,0 +1,94 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Generic, Hashable, Optional, Tuple, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+DEFAULT_MAX_ROLES = 1024
+
+
+class RolePermissionCache(Generic[K, V]):
+    """
+    Bounded in memory cache for the grants of roles, used by
+    SnowflakeRoleGrantChecker.
+
+    At most <maxsize> roles are kept, the least recently used one being
+    evicted first, and entries expire <ttl> seconds after they were stored so
+    that long lived processes eventually see grants changed in Snowflake.
+    Either limit can be disabled with None. Lookups are counted as hits or
+    misses, and the cache can be shared by threads.
+    """
+
+    def __init__(
+        self,
+        maxsize: Optional[int] = DEFAULT_MAX_ROLES,
+        ttl: Optional[float] = None,
+        timer: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if maxsize is not None and maxsize < 1:
+            raise ValueError("maxsize must be at least 1")
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.timer = timer
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[K, Tuple[float, V]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: K) -> Optional[V]:
+        """
+        Return the cached value for <key>, or None if it is missing or expired.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._expired(entry[0]):
+                del self._entries[key]
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: K, value: V) -> None:
+        with self._lock:
+            self._entries[key] = (self.timer(), value)
+            self._entries.move_to_end(key)
+            while self.maxsize is not None and len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key: Optional[K] = None) -> None:
+        """
+        Remove the cached value for <key>, or every cached value if not given.
+        """
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def _expired(self, stored_at: float) -> bool:
+        return self.ttl is not None and self.timer() - stored_at > self.ttl
+
+    def __contains__(self, key: object) -> bool:
+        with self._lock:
+            entry = self._entries.get(key)  # type: ignore
+            return entry is not None and not self._expired(entry[0])
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": len(self._entries),
+        }
@@ -0,0 +1,157 @@
+import queue
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, TypeVar
+
+from permifrost.logger import GLOBAL_LOGGER as logger
+from permifrost.snowflake_connector import SnowflakeConnector
+
+# A possibly quoted identifier, e.g. db."My Schema".table
+IDENTIFIER = r'(?:"[^"]*"|[^\s"])+'
+
+# Patterns extracting the object that a statement acts upon, tried in order
+OBJECT_PATTERNS = [
+    re.compile(rf"^(?:GRANT|REVOKE)\s+ROLE\s+(?P<object>{IDENTIFIER})\s", re.I),
+    re.compile(rf"^ALTER\s+USER\s+(?P<object>{IDENTIFIER})\s", re.I),
+    re.compile(
+        rf"\sIN\s+(?:DATABASE|SCHEMA)\s+(?P<object>{IDENTIFIER})\s+(?:TO|FROM)\s+ROLE\s",
+        re.I,
+    ),
+    re.compile(
+        rf"\sON\s+(?:\w+\s+)*?(?P<object>{IDENTIFIER})\s+(?:TO|FROM)\s+ROLE\s", re.I
+    ),
+]
+
+
+T = TypeVar("T")
+
+
+def statement_object(sql: str) -> str:
+    """
+    Return the object (role, user, database, schema, table...) that a GRANT,
+    REVOKE or ALTER USER statement acts upon.
+
+    Statements that can not be parsed share an empty object, so that they are
+    run one after the other.
+    """
+    for pattern in OBJECT_PATTERNS:
+        match = pattern.search(sql)
+        if match:
+            return match.group("object").lower()
+    return ""
+
+
+def is_ownership_statement(sql: str) -> bool:
+    return re.match(r"^GRANT\s+OWNERSHIP\s", sql, re.I) is not None
+
+
+def apply_statements(
+    conn: SnowflakeConnector,
+    statements: List[Dict],
+    jobs: int = 1,
+    report: Optional[Callable[[Dict], None]] = None,
+) -> None:
+    """
+    Run the statements generated for a spec that are not already granted,
+    setting the run_status of each one and passing it to <report>.
+
+    With a single job the statements run in the order they were generated.
+    Otherwise they are run in two phases, ownership transfers first, and
+    within each phase the statements acting upon the same object run in the
+    order they were generated while statements on different objects run
+    concurrently on up to <jobs> connections.
+    """
+    report_lock = threading.Lock()
+
+    def run_statement(statement: Dict) -> None:
+        try:
+            conn.run_query(statement.get("sql", ""))
+            statement["run_status"] = True
+        except Exception as exc:
+            logger.debug(f"Failed to run {statement.get('sql')}: {exc}")
+            statement["run_status"] = False
+
+        if report:
+            with report_lock:
+                report(statement)
+
+    if jobs <= 1:
+        for statement in statements:
+            if not statement.get("already_granted"):
+                run_statement(statement)
+            elif report:
+                report(statement)
+        return
+
+    pending = []
+    for statement in statements:
+        if not statement.get("already_granted"):
+            pending.append(statement)
+        elif report:
+            report(statement)
+
+    ownership = [stmt for stmt in pending if is_ownership_statement(stmt["sql"])]
+    others = [stmt for stmt in pending if not is_ownership_statement(stmt["sql"])]
+
+    def run_lane(lane: List[Dict]) -> None:
+        for statement in lane:
+            run_statement(statement)
+
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        for phase in [ownership, others]:
+            lanes: Dict[str, List[Dict]] = {}
+            for statement in phase:
+                lanes.setdefault(statement_object(statement["sql"]), []).append(
+                    statement
+                )
+
+            # Wait for the whole phase before starting the next one
+            for _ in executor.map(run_lane, lanes.values()):
+                pass
+
+
+def generate_ahead(items: Iterable[T], size: int = 1) -> Iterator[T]:
+    """
+    Iterate over <items> from a background thread, staying up to <size> items
+    ahead of the caller, so that the statements of a role can run while the
+    statements of the next roles are being generated.
+
+    Exceptions raised while producing the items are raised to the caller.
+    """
+    buffer: queue.Queue = queue.Queue(maxsize=max(size, 1))
+    stopped = threading.Event()
+
+    def put(item) -> bool:
+        while not stopped.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    # Entries are (done, item, error) tuples
+    def produce() -> None:
+        try:
+            for item in items:
+                if not put((False, item, None)):
+                    return
+        except BaseException as exc:
+            put((True, None, exc))
+        else:
+            put((True, None, None))
+
+    producer = threading.Thread(target=produce, daemon=True)
+    producer.start()
+    try:
+        while True:
+            done, item, error = buffer.get()
+            if error is not None:
+                raise error
+            if done:
+                break
+            yield item
+    finally:
+        stopped.set()
+        producer.join()
@@ -0,0 +1,112 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Iterable, List, Optional, TypeVar
+
+from permifrost.snowflake_connector import SnowflakeConnector
+
+R = TypeVar("R")
+
+DEFAULT_MAX_WORKERS = 8
+
+
+def _in_thread(name: str) -> Callable[..., Any]:
+    """
+    Return an awaitable method running SnowflakeConnector.<name> in a worker
+    thread.
+    """
+
+    async def method(self: "AsyncSnowflakeConnector", *args, **kwargs) -> Any:
+        return await self.run_in_thread(getattr(self.conn, name), *args, **kwargs)
+
+    method.__name__ = method.__qualname__ = name
+    method.__doc__ = f"Awaitable SnowflakeConnector.{name}."
+    return method
+
+
+class AsyncSnowflakeConnector:
+    """
+    Awaitable interface to a SnowflakeConnector, for use from an event loop.
+
+    Every query runs the blocking SnowflakeConnector method in a pool of up to
+    <max_workers> threads, so that the event loop is never blocked and up to
+    <max_workers> queries run at the same time. The connector keeps one
+    Snowflake connection per worker thread.
+
+    The wrapped connector is closed with the AsyncSnowflakeConnector only if
+    it was created by it, i.e. when no <conn> is given.
+    """
+
+    def __init__(
+        self,
+        conn: Optional[SnowflakeConnector] = None,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        **kwargs,
+    ) -> None:
+        self._owns_conn = conn is None
+        self.conn = conn if conn is not None else SnowflakeConnector(**kwargs)
+        self.max_workers = max(max_workers, 1)
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="permifrost"
+        )
+
+    async def run_in_thread(self, func: Callable[..., R], *args, **kwargs) -> R:
+        """
+        Run a blocking function in a worker thread and return its result.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, functools.partial(func, *args, **kwargs)
+        )
+
+    async def map(self, func: Callable[..., R], items: Iterable[Any]) -> List[R]:
+        """
+        Apply a blocking function to every item in the worker threads,
+        returning the results in the same order as <items>.
+        """
+        return list(
+            await asyncio.gather(*(self.run_in_thread(func, item) for item in items))
+        )
+
+    async def run_query(self, query: str) -> List[Any]:
+        """
+        Run a query in a worker thread and return all of its rows, as the
+        rows of a result can not be fetched from the event loop thread.
+        """
+        return await self.run_in_thread(lambda: self.conn.run_query(query).fetchall())
+
+    show_databases = _in_thread("show_databases")
+    show_warehouses = _in_thread("show_warehouses")
+    show_integrations = _in_thread("show_integrations")
+    show_users = _in_thread("show_users")
+    show_roles = _in_thread("show_roles")
+    show_schemas = _in_thread("show_schemas")
+    show_tables = _in_thread("show_tables")
+    show_views = _in_thread("show_views")
+    show_future_grants = _in_thread("show_future_grants")
+    show_grants_to_role = _in_thread("show_grants_to_role")
+    show_grants_to_roles = _in_thread("show_grants_to_roles")
+    show_grants_to_role_with_grant_option = _in_thread(
+        "show_grants_to_role_with_grant_option"
+    )
+    show_roles_granted_to_user = _in_thread("show_roles_granted_to_user")
+    show_roles_granted_to_users = _in_thread("show_roles_granted_to_users")
+    get_current_user = _in_thread("get_current_user")
+    get_current_role = _in_thread("get_current_role")
+    full_schema_list = _in_thread("full_schema_list")
+
+    async def close(self) -> None:
+        """
+        Stop the worker threads, waiting for running queries to complete,
+        and close the connector if it was created by this instance.
+        """
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self._executor.shutdown)
+        if self._owns_conn:
+            await loop.run_in_executor(None, self.conn.close)
+
+    async def __aenter__(self) -> "AsyncSnowflakeConnector":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
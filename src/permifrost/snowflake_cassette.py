@@ -0,0 +1,153 @@
+import json
+import threading
+from typing import Any, Dict, Iterator, List, Optional
+
+from permifrost.error import CassetteError
+from permifrost.logger import GLOBAL_LOGGER as logger
+from permifrost.snowflake_connector import SnowflakeConnector
+
+CASSETTE_VERSION = 1
+
+Row = Dict[str, Any]
+
+
+class CassetteResult:
+    """
+    Stand-in for the SQLAlchemy result returned by SnowflakeConnector.run_query,
+    serving rows from memory. Rows are dictionaries, accessed by lower case
+    column name like the rows returned by Snowflake.
+    """
+
+    def __init__(self, rows: List[Row]) -> None:
+        self.rows = rows
+        self._position = 0
+
+    def __iter__(self) -> Iterator[Row]:
+        while self._position < len(self.rows):
+            row = self.rows[self._position]
+            self._position += 1
+            yield row
+
+    def fetchone(self) -> Optional[Row]:
+        if self._position >= len(self.rows):
+            return None
+        row = self.rows[self._position]
+        self._position += 1
+        return row
+
+    def fetchall(self) -> List[Row]:
+        rows = self.rows[self._position :]
+        self._position = len(self.rows)
+        return rows
+
+
+class SnowflakeCassette:
+    """
+    The statements sent to Snowflake during a run, with the rows returned for
+    each of them, stored as a JSON file.
+
+    When a statement is recorded more than once, its results are replayed in
+    the order they were recorded, repeating the last one afterwards.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.queries: Dict[str, List[List[Row]]] = {}
+        self._replayed: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path: str) -> "SnowflakeCassette":
+        cassette = cls(path)
+        with open(path, "r") as cassette_file:
+            content = json.load(cassette_file)
+
+        if content.get("version") != CASSETTE_VERSION:
+            raise CassetteError(
+                f"Unsupported cassette version {content.get('version')} in {path}"
+            )
+
+        for entry in content["queries"]:
+            cassette.queries.setdefault(entry["query"], []).append(entry["rows"])
+        return cassette
+
+    def save(self) -> None:
+        content = {
+            "version": CASSETTE_VERSION,
+            "queries": [
+                {"query": query, "rows": rows}
+                for query, results in self.queries.items()
+                for rows in results
+            ],
+        }
+        with open(self.path, "w") as cassette_file:
+            # Values such as timestamps are stored as strings
+            json.dump(content, cassette_file, indent=2, default=str)
+
+    def record(self, query: str, rows: List[Row]) -> None:
+        with self._lock:
+            self.queries.setdefault(query, []).append(rows)
+
+    def play(self, query: str) -> List[Row]:
+        with self._lock:
+            if query not in self.queries:
+                raise CassetteError(f"Query not found in cassette {self.path}: {query}")
+
+            results = self.queries[query]
+            position = self._replayed.get(query, 0)
+            self._replayed[query] = position + 1
+            return results[min(position, len(results) - 1)]
+
+
+class RecordingSnowflakeConnector(SnowflakeConnector):
+    """
+    SnowflakeConnector that records every statement it runs, with the rows
+    returned by Snowflake, to a cassette that is saved when it is closed.
+    """
+
+    def __init__(
+        self,
+        cassette_path: str,
+        config: Optional[Dict] = None,
+        result_scan: bool = False,
+    ) -> None:
+        super().__init__(config, result_scan=result_scan)
+        self.cassette = SnowflakeCassette(cassette_path)
+
+    def run_query(self, query: str):
+        result = super().run_query(query)
+        rows = (
+            [dict(getattr(row, "_mapping", row)) for row in result.fetchall()]
+            if result.returns_rows
+            else []
+        )
+        self.cassette.record(query, rows)
+        return CassetteResult(rows)
+
+    def close(self) -> None:
+        super().close()
+        logger.info(f"Saving recorded queries to {self.cassette.path}")
+        self.cassette.save()
+
+
+class ReplaySnowflakeConnector(SnowflakeConnector):
+    """
+    SnowflakeConnector that answers every statement from a cassette recorded by
+    RecordingSnowflakeConnector, without connecting to Snowflake.
+    """
+
+    def __init__(self, cassette_path: str, result_scan: bool = False) -> None:
+        self.cassette = SnowflakeCassette.load(cassette_path)
+        # Must match the recording, for the same queries to be replayed
+        self.result_scan = result_scan
+        self._init_connection_state()
+
+    def run_query(self, query: str):
+        logger.debug(f"Replaying query: {query}")
+        self.stats["queries"] += 1
+        return CassetteResult(self.cassette.play(query))
+
+    def close(self) -> None:
+        logger.info(
+            f"Replayed {self.stats['queries']} queries from {self.cassette.path}"
+        )
@@ -0,0 +1,142 @@
+from collections.abc import Mapping
+from string import Formatter
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+_TEMPLATE_FIELDS: Dict[str, Tuple[str, ...]] = {}
+
+
+def template_fields(template: str) -> Tuple[str, ...]:
+    """
+    Return the names of the replacement fields of a SQL template, in order.
+    """
+    fields = _TEMPLATE_FIELDS.get(template)
+    if fields is None:
+        fields = tuple(field for _, field, _, _ in Formatter().parse(template) if field)
+        _TEMPLATE_FIELDS[template] = fields
+    return fields
+
+
+class SnowflakeCommand(Mapping):
+    """
+    A generated GRANT, REVOKE or ALTER USER statement.
+
+    Only the template and the values of its fields are stored; the SQL is
+    rendered the first time it is accessed, e.g. when the statement is
+    deduplicated, printed or run, and kept from then on. Commands can still be used like the dictionaries they replace:
+    command["sql"], command["already_granted"], command.get("run_status") and
+    command["run_status"] = True all work, and a command is equal to the
+    dictionary with the same keys and values.
+    """
+
+    __slots__ = (
+        "template",
+        "field_values",
+        "already_granted",
+        "run_status",
+        "_sql",
+    )
+
+    def __init__(
+        self, template: str, already_granted: bool = False, **values: str
+    ) -> None:
+        self.template = template
+        self.field_values = tuple(values[field] for field in template_fields(template))
+        self.already_granted = already_granted
+        self.run_status: Optional[bool] = None
+        self._sql: Optional[str] = None
+
+    @property
+    def sql(self) -> str:
+        if self._sql is None:
+            self._sql = self.template.format(
+                **dict(zip(template_fields(self.template), self.field_values))
+            )
+        return self._sql
+
+    def _value(self, field: str) -> Optional[str]:
+        fields = template_fields(self.template)
+        return self.field_values[fields.index(field)] if field in fields else None
+
+    @property
+    def action(self) -> str:
+        """grant, revoke or alter"""
+        return self.template.split(" ", 1)[0].lower()
+
+    @property
+    def is_ownership(self) -> bool:
+        return self.template.startswith("GRANT OWNERSHIP")
+
+    @property
+    def privileges(self) -> Optional[str]:
+        if self.is_ownership:
+            return "ownership"
+        if self._value("entity_name") is not None:
+            return "usage"
+        return self._value("privileges")
+
+    @property
+    def object_type(self) -> Optional[str]:
+        if self._value("entity_name") is not None:
+            return "role"
+        if self._value("user_name") is not None:
+            return "user"
+        return self._value("resource_type")
+
+    @property
+    def object_name(self) -> Optional[str]:
+        for field in [
+            "resource_name",
+            "grouping_name",
+            "user_name",
+        ]:
+            value = self._value(field)
+            if value is not None:
+                return value
+        return self._value("role_name")
+
+    @property
+    def grantee(self) -> Optional[str]:
+        if self.is_ownership:
+            return self._value("role_name")
+        return self._value("entity_name") or self._value("role")
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Return the structured fields of the command along with its SQL.
+        """
+        command = {
+            "already_granted": self.already_granted,
+            "sql": self.sql,
+            "action": self.action,
+            "privileges": self.privileges,
+            "object_type": self.object_type,
+            "object_name": self.object_name,
+            "grantee": self.grantee,
+        }
+        if self.run_status is not None:
+            command["run_status"] = self.run_status
+        return command
+
+    def _keys(self) -> Tuple[str, ...]:
+        if self.run_status is None:
+            return ("already_granted", "sql")
+        return ("already_granted", "sql", "run_status")
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self._keys():
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        if key not in ("already_granted", "run_status"):
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._keys())
+
+    def __len__(self) -> int:
+        return len(self._keys())
+
+    def __repr__(self) -> str:
+        return f"SnowflakeCommand({dict(self)!r})"
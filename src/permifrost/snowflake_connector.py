@@ -1,8 +1,10 @@
 import logging
 import os
 import re
+import threading
 import warnings
-from typing import Any, Dict, List, Union
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Union
 from urllib.parse import quote_plus
 
 import sqlalchemy
@@ -13,6 +15,17 @@ from cryptography.hazmat.primitives import serialization
 from snowflake.sqlalchemy import URL
 
 from permifrost.logger import GLOBAL_LOGGER as logger
+from permifrost.metadata_cache import SnowflakeMetadataCache, cached_metadata
+
+# Number of distinct names whose normalized identifier is kept by snowflaky
+# and snowflaky_user_role
+SNOWFLAKY_CACHE_SIZE = 2**17
+
+QUOTED_IDENTIFIER = re.compile('^".*"$')
+FUTURE_OBJECT = re.compile("<(table|view|schema)>", re.IGNORECASE)
+UNQUOTED_IDENTIFIER = re.compile("^(?:[a-z_][0-9a-z_$]*|[A-Z_][0-9A-Z_$]*)$")
+UPPER_UNQUOTED_IDENTIFIER = re.compile("^[A-Z_][0-9A-Z_$]*$")
+USER_ROLE_IDENTIFIER = re.compile("^[0-9a-zA-Z_]*$")
 
 # Don't show all the info log messages from Snowflake
 for logger_name in ["snowflake.connector", "bot", "boto3"]:
@@ -21,7 +34,20 @@ for logger_name in ["snowflake.connector", "bot", "boto3"]:
 
 
 class SnowflakeConnector:
-    def __init__(self, config: Dict = None) -> None:
+    # Optional on disk cache for the results of the SHOW queries listing the
+    # objects of the account
+    cache: Optional[SnowflakeMetadataCache] = None
+    cache_scope: str = ""
+    # Filter the rows and columns of SHOW results in Snowflake with RESULT_SCAN
+    # instead of transferring the whole results
+    result_scan: bool = False
+
+    def __init__(
+        self,
+        config: Optional[Dict] = None,
+        cache: Optional[SnowflakeMetadataCache] = None,
+        result_scan: bool = False,
+    ) -> None:
         if not config:
             config = {
                 "user": os.getenv("PERMISSION_BOT_USER"),
@@ -90,6 +116,85 @@ class SnowflakeConnector:
                 )
             )
 
+        self._init_connection_state()
+
+        self.result_scan = result_scan
+        self.cache = cache
+        # Cached metadata depends on what the connecting role is allowed to see
+        self.cache_scope = "{}/{}".format(
+            config.get("account"), config.get("role") or config.get("user")
+        ).lower()
+
+    def _init_connection_state(self) -> None:
+        # Every thread keeps a single connection open for the whole run instead
+        # of checking one out of the engine for each query.
+        self._local = threading.local()
+        self._connections: List[Any] = []
+        self._connections_lock = threading.Lock()
+        self.stats: Dict[str, int] = {
+            "queries": 0,
+            "connections_opened": 0,
+            "connections_reused": 0,
+        }
+
+    def __enter__(self) -> "SnowflakeConnector":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _get_connection(self):
+        """
+        Return the connection owned by the current thread, opening a new one
+        if none exists yet or if the previous one was closed or invalidated.
+        """
+        if not hasattr(self, "_local"):
+            self._init_connection_state()
+
+        connection = getattr(self._local, "connection", None)
+        with self._connections_lock:
+            self.stats["queries"] += 1
+            if connection is not None and not (
+                connection.closed or connection.invalidated
+            ):
+                self.stats["connections_reused"] += 1
+                return connection
+
+            connection = self.engine.connect()
+            self._connections.append(connection)
+            self.stats["connections_opened"] += 1
+
+        self._local.connection = connection
+        return connection
+
+    def close(self) -> None:
+        """
+        Close every connection opened by this connector and release the
+        connections pooled by the engine.
+        """
+        if not hasattr(self, "_local"):
+            return
+
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+
+        for connection in connections:
+            try:
+                connection.close()
+            except Exception as exc:
+                logger.debug(f"Failed to close Snowflake connection: {exc}")
+
+        self._local = threading.local()
+        self.engine.dispose()
+        if self.cache is not None:
+            self.cache.close()
+
+        logger.info(
+            "Snowflake connection stats: {queries} queries, "
+            "{connections_opened} sessions opened, "
+            "{connections_reused} connection reuses".format(**self.stats)
+        )
+
     def generate_private_key(
         self, key_path: str, key_passphrase: Union[str, None]
     ) -> bytes:
@@ -117,12 +222,13 @@ class SnowflakeConnector:
             # lowercase the entity if alphanumeric plus _ else leave as is
             names.append(
                 result["name"].lower()
-                if bool(re.match("^[a-zA-Z0-9_]*$", result["name"]))
+                if USER_ROLE_IDENTIFIER.match(result["name"])
                 else result["name"]
             )
 
         return names
 
+    @cached_metadata
     def show_databases(self) -> List[str]:
         return self.show_query("DATABASES")
 
@@ -132,12 +238,12 @@ class SnowflakeConnector:
     def show_integrations(self) -> List[str]:
         return self.show_query("INTEGRATIONS")
 
+    @cached_metadata
     def show_users(self) -> List[str]:
         return self.show_query("USERS")
 
+    @cached_metadata
     def show_schemas(self, database: str = None) -> List[str]:
-        names = []
-
         if database:
             query = f"SHOW TERSE SCHEMAS IN DATABASE {database}"
         else:
@@ -145,55 +251,71 @@ class SnowflakeConnector:
 
         results = self.run_query(query).fetchall()
 
-        for result in results:
-            schema_identifier = f"{result['database_name']}.{result['name']}"
-            names.append(SnowflakeConnector.snowflaky(schema_identifier))
-
-        return names
-
-    def show_tables(self, database: str = None, schema: str = None) -> List[str]:
-        names = []
-
-        if schema:
-            query = f"SHOW TERSE TABLES IN SCHEMA {schema}"
-        elif database:
-            query = f"SHOW TERSE TABLES IN DATABASE {database}"
-        else:
-            query = "SHOW TERSE TABLES IN ACCOUNT"
-
-        results = self.run_query(query).fetchall()
-
-        for result in results:
-            table_identifier = (
-                f"{result['database_name']}.{result['schema_name']}.{result['name']}"
-            )
-            names.append(SnowflakeConnector.snowflaky(table_identifier))
-
-        return names
-
-    def show_views(self, database: str = None, schema: str = None) -> List[str]:
-        names = []
+        return SnowflakeConnector.snowflaky_all(
+            f"{result['database_name']}.{result['name']}" for result in results
+        )
 
+    @cached_metadata
+    def show_tables(
+        self,
+        database: str = None,
+        schema: str = None,
+        in_databases: Optional[List[str]] = None,
+    ) -> List[str]:
+        """
+        List the tables in <schema>, in <database> or in the whole account,
+        keeping only the ones in <in_databases> if given.
+        """
+        return self._show_objects("TABLES", database, schema, in_databases)
+
+    @cached_metadata
+    def show_views(
+        self,
+        database: str = None,
+        schema: str = None,
+        in_databases: Optional[List[str]] = None,
+    ) -> List[str]:
+        """
+        List the views in <schema>, in <database> or in the whole account,
+        keeping only the ones in <in_databases> if given.
+        """
+        return self._show_objects("VIEWS", database, schema, in_databases)
+
+    def _show_objects(
+        self,
+        object_type: str,
+        database: Optional[str],
+        schema: Optional[str],
+        in_databases: Optional[List[str]],
+    ) -> List[str]:
         if schema:
-            query = f"SHOW TERSE VIEWS IN SCHEMA {schema}"
+            query = f"SHOW TERSE {object_type} IN SCHEMA {schema}"
         elif database:
-            query = f"SHOW TERSE VIEWS IN DATABASE {database}"
+            query = f"SHOW TERSE {object_type} IN DATABASE {database}"
         else:
-            query = "SHOW TERSE VIEWS IN ACCOUNT"
-
-        results = self.run_query(query).fetchall()
+            query = f"SHOW TERSE {object_type} IN ACCOUNT"
 
-        for result in results:
-            view_identifier = (
-                f"{result['database_name']}.{result['schema_name']}.{result['name']}"
-            )
-            names.append(SnowflakeConnector.snowflaky(view_identifier))
+        results = self.show(
+            query,
+            columns=["database_name", "schema_name", "name"],
+            filters={"database_name": in_databases},
+        )
 
-        return names
+        return SnowflakeConnector.snowflaky_all(
+            f"{result['database_name']}.{result['schema_name']}.{result['name']}"
+            for result in results
+        )
 
     def show_future_grants(
-        self, database: str = None, schema: str = None
+        self,
+        database: str = None,
+        schema: str = None,
+        roles: Optional[List[str]] = None,
     ) -> Dict[str, Dict[str, Dict[str, List[str]]]]:
+        """
+        List the future grants to roles in <schema> or <database>, keeping
+        only the grants to <roles> if given.
+        """
         future_grants: Dict[str, Any] = {}
 
         if schema:
@@ -203,20 +325,20 @@ class SnowflakeConnector:
         else:
             pass
 
-        results = self.run_query(query).fetchall()
+        results = self.show(
+            query,
+            columns=["privilege", "grant_on", "name", "grant_to", "grantee_name"],
+            filters={"grant_to": ["ROLE"], "grantee_name": roles},
+        )
 
         for result in results:
-            if result["grant_to"] == "ROLE":
-                role = result["grantee_name"].lower()
-                privilege = result["privilege"].lower()
-                granted_on = result["grant_on"].lower()
-
-                future_grants.setdefault(role, {}).setdefault(privilege, {}).setdefault(
-                    granted_on, []
-                ).append(SnowflakeConnector.snowflaky(result["name"]))
+            role = result["grantee_name"].lower()
+            privilege = result["privilege"].lower()
+            granted_on = result["grant_on"].lower()
 
-            else:
-                continue
+            future_grants.setdefault(role, {}).setdefault(privilege, {}).setdefault(
+                granted_on, []
+            ).append(SnowflakeConnector.snowflaky(result["name"]))
 
         return future_grants
 
@@ -239,6 +361,64 @@ class SnowflakeConnector:
 
         return grants
 
+    def show_grants_to_roles(self) -> Dict[str, Dict[str, Dict[str, List[str]]]]:
+        """
+        Return the grants of every role in the account with a single query
+        against SNOWFLAKE.ACCOUNT_USAGE.GRANTS_TO_ROLES.
+
+        The result is keyed by role and has the same shape as the one returned
+        by show_grants_to_role. ACCOUNT_USAGE views can lag behind the account
+        by up to two hours, so recent grants may be missing.
+        """
+        grants: Dict[str, Any] = {}
+
+        query = (
+            "SELECT grantee_name, privilege, granted_on, "
+            "table_catalog, table_schema, name "
+            "FROM SNOWFLAKE.ACCOUNT_USAGE.GRANTS_TO_ROLES "
+            "WHERE granted_to = 'ROLE' AND deleted_on IS NULL"
+        )
+
+        # The results are streamed instead of fetched all at once, as the view
+        # returns every grant in the account
+        for result in self.run_query(query):
+            role = result["grantee_name"].lower()
+            privilege = result["privilege"].lower()
+            granted_on = result["granted_on"].lower().replace(" ", "_")
+
+            grants.setdefault(role, {}).setdefault(privilege, {}).setdefault(
+                granted_on, []
+            ).append(SnowflakeConnector._account_usage_identifier(result))
+
+        return grants
+
+    @staticmethod
+    def _account_usage_identifier(result) -> str:
+        """
+        Build the fully qualified identifier of an object listed in an
+        ACCOUNT_USAGE view, quoted the same way SHOW GRANTS quotes it.
+
+        ACCOUNT_USAGE views return unquoted names, so any part that is not
+        stored as an upper case identifier has to be quoted.
+        """
+        granted_on = result["granted_on"].upper()
+        if granted_on == "DATABASE" or not result["table_catalog"]:
+            name_parts = [result["name"]]
+        elif granted_on == "SCHEMA" or not result["table_schema"]:
+            name_parts = [result["table_catalog"], result["name"]]
+        else:
+            name_parts = [
+                result["table_catalog"],
+                result["table_schema"],
+                result["name"],
+            ]
+
+        quoted_parts = [
+            part if UPPER_UNQUOTED_IDENTIFIER.match(part) else f'"{part}"'
+            for part in name_parts
+        ]
+        return SnowflakeConnector.snowflaky(".".join(quoted_parts))
+
     def show_grants_to_role_with_grant_option(self, role) -> Dict[str, Any]:
         grants: Dict[str, Any] = {}
 
@@ -268,6 +448,30 @@ class SnowflakeConnector:
 
         return roles
 
+    def show_roles_granted_to_users(self) -> Dict[str, List[str]]:
+        """
+        Return the roles granted to every user in the account with a single
+        query against SNOWFLAKE.ACCOUNT_USAGE.GRANTS_TO_USERS.
+
+        The result is keyed by user, with the same role lists that
+        show_roles_granted_to_user returns. ACCOUNT_USAGE views can lag behind
+        the account by up to two hours, so recent grants may be missing.
+        """
+        roles: Dict[str, List[str]] = {}
+
+        query = (
+            "SELECT grantee_name, role "
+            "FROM SNOWFLAKE.ACCOUNT_USAGE.GRANTS_TO_USERS "
+            "WHERE deleted_on IS NULL"
+        )
+
+        for result in self.run_query(query):
+            roles.setdefault(result["grantee_name"].lower(), []).append(
+                result["role"].lower()
+            )
+
+        return roles
+
     def get_current_user(self) -> str:
         query = "SELECT CURRENT_USER() AS USER"
         result = self.run_query(query).fetchone()
@@ -278,6 +482,7 @@ class SnowflakeConnector:
         result = self.run_query(query).fetchone()
         return result["role"].lower()
 
+    @cached_metadata
     def show_roles(self) -> Dict[str, str]:
         roles = {}
 
@@ -289,66 +494,68 @@ class SnowflakeConnector:
         return roles
 
     def run_query(self, query: str):
+        connection = self._get_connection()
+        logger.debug(f"Running query: {query}")
+        return connection.execute(query)
+
+    def show(
+        self,
+        query: str,
+        columns: List[str],
+        filters: Optional[Dict[str, Optional[List[str]]]] = None,
+    ) -> List[Any]:
+        """
+        Run a SHOW query and return its rows whose <filters> columns hold one
+        of the given names, compared case insensitively. Filters set to None
+        keep every row.
 
-        with self.engine.connect() as connection:
-            logger.debug(f"Running query: {query}")
-            result = connection.execute(query)
-
-        return result
+        With result_scan, the rows are filtered in Snowflake by a query on the
+        result of the SHOW query, which only returns <columns>. Otherwise every
+        row is fetched and filtered here.
+        """
+        values = {
+            column: {_show_filter_value(name) for name in names}
+            for column, names in (filters or {}).items()
+            if names is not None
+        }
+        if any(not names for names in values.values()):
+            return []
+
+        if not self.result_scan:
+            return [
+                result
+                for result in self.run_query(query).fetchall()
+                if all(result[column].lower() in values[column] for column in values)
+            ]
+
+        # The connection of the thread is only used by this thread, so that
+        # LAST_QUERY_ID is always the SHOW query
+        self.run_query(query)
+        scan_query = "SELECT {} FROM TABLE(RESULT_SCAN(LAST_QUERY_ID()))".format(
+            ", ".join(f'"{column}"' for column in columns)
+        )
+        if values:
+            scan_query += " WHERE " + " AND ".join(
+                'LOWER("{}") IN ({})'.format(
+                    column, ", ".join(_sql_string(name) for name in sorted(names))
+                )
+                for column, names in values.items()
+            )
+        return self.run_query(scan_query).fetchall()
 
     def full_schema_list(self, schema: str) -> List[str]:
         """
         For a given schema name, get all schemas it may be referencing.
 
-        For example, if <db>.* is given then all schemas in the database
-        will be returned. If <db>.<schema_partial>_* is given, then all
-        schemas that match the schema partial pattern will be returned.
-        If a full schema name is given, it will return that single schema
-        as a list.
-
-        This function can be enhanced in the future to handle more
-        complicated schema names if necessary.
+        See SnowflakeMetadataSnapshot.full_schema_list, which should be
+        preferred as it does not list the schemas of a database more than once.
 
         Returns a list of schema names.
         """
-        # Generate the information_schema identifier for that database
-        # in order to be able to filter it out
-        name_parts = schema.split(".")
-
-        info_schema = f"{name_parts[0]}.information_schema"
-
-        fetched_schemas = []
-
-        # All Schemas
-        if name_parts[1] == "*":
-            db_schemas = self.show_schemas(name_parts[0])
-            for db_schema in db_schemas:
-                if db_schema != info_schema:
-                    fetched_schemas.append(db_schema)
-
-        # Prefix and suffix schema matches
-        elif "*" in name_parts[1]:
-            db_schemas = self.show_schemas(name_parts[0])
-            for db_schema in db_schemas:
-                schema_name = db_schema.split(".", 1)[1].lower()
-                if name_parts[1].endswith("*") and schema_name.startswith(
-                    name_parts[1].split("*", 1)[0]
-                ):
-                    if db_schema != info_schema:
-                        fetched_schemas.append(db_schema)
-                elif name_parts[1].startswith("*") and schema_name.endswith(
-                    name_parts[1].split("*", 1)[1]
-                ):
-                    if db_schema != info_schema:
-                        fetched_schemas.append(db_schema)
-
-        # TODO Handle more complicated matches
-
-        else:
-            # If no * in name, then return provided schema name
-            fetched_schemas = [schema]
+        # Imported here to avoid a circular import
+        from permifrost.snowflake_metadata import SnowflakeMetadataSnapshot
 
-        return fetched_schemas
+        return SnowflakeMetadataSnapshot(self).full_schema_list(schema)
 
     @staticmethod
     def snowflaky(name: str) -> str:
@@ -363,40 +570,23 @@ class SnowflakeConnector:
         Pronounced /snəʊfleɪkɪ/ like saying very fast snowflak[e and clarif]y
         Permission granted to use snowflaky as a verb.
         """
-        name_parts = name.split(".")
-
         # We do not currently support identifiers that include periods (i.e. db_1.schema_1."table.with.period")
-        if len(name_parts) > 3:
+        if name.count(".") > 2:
             warnings.warn(
                 f"Unsupported object identifier: {name} contains additional periods within identifier.",
                 SyntaxWarning,
             )
 
-        new_name_parts = []
-
-        for part in name_parts:
-
-            # If already quoted, return as-is
-            if re.match('^".*"$', part) is not None:
-                new_name_parts.append(part)
+        return _snowflaky(name)
 
-            # If a future object, return in lower case - no need to quote
-            elif re.match("<(table|view|schema)>", part, re.IGNORECASE) is not None:
-                new_name_parts.append(part.lower())
-
-            # If does not meet requirements for unquoted object identifiers, add double-quotes
-            # See https://docs.snowflake.com/en/sql-reference/identifiers-syntax.html for what those requirements are
-            elif (
-                re.match("^[a-z_][0-9a-z_$]*$", part) is None
-                and re.match("^[A-Z_][0-9A-Z_$]*$", part) is None
-            ):
-                new_name_parts.append(f'"{part}"')
-
-            # Otherwise assume valid unquoted, case-insensitive object identifier and return in lowercase
-            else:
-                new_name_parts.append(part.lower())
-
-        return ".".join(new_name_parts)
+    @staticmethod
+    def snowflaky_all(names: Iterable[str]) -> List[str]:
+        """
+        Convert a whole column of entity names, e.g. the identifiers of the
+        rows of a SHOW result, with SnowflakeConnector.snowflaky.
+        """
+        snowflaky = SnowflakeConnector.snowflaky
+        return [snowflaky(name) for name in names]
 
     @staticmethod
     def snowflaky_user_role(name: str) -> str:
@@ -410,10 +600,50 @@ class SnowflakeConnector:
         Pronounced /snəʊfleɪkɪ/ like saying very fast snowflak[e and clarif]y
         Permission granted to use snowflaky as a verb.
         """
-        if (
-            re.match("^[0-9a-zA-Z_]*$", name) is None  # Proper formatting
-            and re.match('^".*"$', name) is None  # Already quoted
-        ):
-            name = f'"{name}"'
+        return _snowflaky_user_role(name)
+
+
+def _show_filter_value(name: str) -> str:
+    # SHOW results hold names without their quotes
+    if QUOTED_IDENTIFIER.match(name) is not None:
+        name = name[1:-1].replace('""', '"')
+    return name.lower()
+
+
+def _sql_string(value: str) -> str:
+    return "'{}'".format(value.replace("\\", "\\\\").replace("'", "\\'"))
+
+
+@lru_cache(maxsize=SNOWFLAKY_CACHE_SIZE)
+def _snowflaky_part(part: str) -> str:
+    # If already quoted, return as-is
+    if QUOTED_IDENTIFIER.match(part) is not None:
+        return part
+
+    # If a future object, return in lower case - no need to quote
+    if FUTURE_OBJECT.match(part) is not None:
+        return part.lower()
+
+    # If does not meet requirements for unquoted object identifiers, add double-quotes
+    # See https://docs.snowflake.com/en/sql-reference/identifiers-syntax.html for what those requirements are
+    if UNQUOTED_IDENTIFIER.match(part) is None:
+        return f'"{part}"'
+
+    # Otherwise assume valid unquoted, case-insensitive object identifier and return in lowercase
+    return part.lower()
+
+
+@lru_cache(maxsize=SNOWFLAKY_CACHE_SIZE)
+def _snowflaky(name: str) -> str:
+    return ".".join([_snowflaky_part(part) for part in name.split(".")])
+
+
+@lru_cache(maxsize=SNOWFLAKY_CACHE_SIZE)
+def _snowflaky_user_role(name: str) -> str:
+    if (
+        USER_ROLE_IDENTIFIER.match(name) is None  # Proper formatting
+        and QUOTED_IDENTIFIER.match(name) is None  # Already quoted
+    ):
+        name = f'"{name}"'
 
-        return name
+    return name
@@ -1,7 +1,11 @@
-from typing import Any, Dict, List, Optional, Set, Tuple
+from typing import Any, Collection, Dict, List, Optional, Set, Tuple, Union
 
+from permifrost.glob_matcher import is_pattern
+from permifrost.grant_index import GrantIndex
 from permifrost.logger import GLOBAL_LOGGER as logger
+from permifrost.snowflake_command import SnowflakeCommand
 from permifrost.snowflake_connector import SnowflakeConnector
+from permifrost.snowflake_metadata import SnowflakeMetadataSnapshot
 
 GRANT_ROLE_TEMPLATE = "GRANT ROLE {role_name} TO {type} {entity_name}"
 
@@ -29,9 +33,11 @@ GRANT_OWNERSHIP_TEMPLATE = "GRANT OWNERSHIP ON {resource_type} {resource_name} T
 class SnowflakeGrantsGenerator:
     def __init__(
         self,
-        grants_to_role: Dict,
+        grants_to_role: Union[Dict, GrantIndex],
         roles_granted_to_user: Dict[str, List[str]],
         ignore_memberships: Optional[bool] = False,
+        conn: Optional[SnowflakeConnector] = None,
+        metadata: Optional[SnowflakeMetadataSnapshot] = None,
     ) -> None:
         """
         Initializes a grants generator, used to generate SQL for generating grants
@@ -39,17 +45,34 @@ class SnowflakeGrantsGenerator:
         grants_to_role: a dict, mapping role to grants where role is a string
             and grants is a dictionary of privileges to entities.
             e.g. {'functional_role': {'create schema': {'database': ['database_1', 'database_2']}, ...}}
+            A GrantIndex over such a dict can be given instead.
 
         roles_granted_to_user: a dict, mapping the user to a list of roles.,
             e.g. {'user_name': ['role_1', 'role_2']
 
         ignore_memberships: bool, whether to skip role grant/revoke of memberships
 
+        conn: the SnowflakeConnector shared with the rest of the run. Defaults
+            to the connector of <metadata>, and a new connector is only
+            created when neither is given.
+
+        metadata: the SnowflakeMetadataSnapshot used to look up schemas, tables
+            and views. Defaults to a new snapshot backed by <conn>.
         """
-        self.grants_to_role = grants_to_role
+        self.grant_index = (
+            grants_to_role
+            if isinstance(grants_to_role, GrantIndex)
+            else GrantIndex(grants_to_role)
+        )
+        self.grants_to_role = self.grant_index.grants_to_role
         self.roles_granted_to_user = roles_granted_to_user
         self.ignore_memberships = ignore_memberships
-        self.conn = SnowflakeConnector()
+        if conn is None:
+            conn = metadata.conn if metadata is not None else SnowflakeConnector()
+        self.conn = conn
+        self.metadata = (
+            metadata if metadata is not None else SnowflakeMetadataSnapshot(self.conn)
+        )
 
     def is_granted_privilege(
         self, role: str, privilege: str, entity_type: str, entity_name: str
@@ -64,14 +87,7 @@ class SnowflakeGrantsGenerator:
         Database ANALYTICS on the Snowflake server.
         """
 
-        grants = (
-            self.grants_to_role.get(role, {}).get(privilege, {}).get(entity_type, [])
-        )
-
-        if SnowflakeConnector.snowflaky(entity_name) in grants:
-            return True
-
-        return False
+        return self.grant_index.is_granted(role, privilege, entity_type, entity_name)
 
     def _generate_member_lists(self, config: Dict) -> Tuple[List[str], List[str]]:
         """
@@ -106,25 +122,28 @@ class SnowflakeGrantsGenerator:
 
         return (member_include_list, member_exclude_list)
 
-    def _generate_member_star_lists(self, all_entities: List, entity: str) -> List[str]:
+    def _generate_member_star_lists(
+        self, all_entities: Collection[str], entity: str
+    ) -> List[str]:
         """
         Generates the member include list when a * privilege is granted
 
-        all_entities: a List of all entities defined in the spec
+        all_entities: all entities defined in the spec, preferably as a
+            frozenset shared by every call
         entity: the entity to generate the list for
 
         Returns: a list of all roles to include for the entity
         """
-        conn = SnowflakeConnector()
-        show_roles = conn.show_roles()
         member_include_list = [
-            role for role in show_roles if role in all_entities and role != entity
+            role
+            for role in self.metadata.existing_roles(all_entities)
+            if role != entity
         ]
         return member_include_list
 
     def _generate_sql_commands_for_member_of_list(
         self, member_of_list: List[str], entity: str, entity_type: str
-    ) -> List[Dict]:
+    ) -> List[SnowflakeCommand]:
         """For a given member_of list and entity, generate the SQL commands
         to grant the entity privileges for every member_role in the member_of list
 
@@ -169,20 +188,19 @@ class SnowflakeGrantsGenerator:
             ):
                 continue
             sql_commands.append(
-                {
-                    "already_granted": already_granted,
-                    "sql": GRANT_ROLE_TEMPLATE.format(
-                        role_name=SnowflakeConnector.snowflaky_user_role(member_role),
-                        type=grant_type,
-                        entity_name=SnowflakeConnector.snowflaky_user_role(entity),
-                    ),
-                }
+                SnowflakeCommand(
+                    GRANT_ROLE_TEMPLATE,
+                    already_granted=already_granted,
+                    role_name=SnowflakeConnector.snowflaky_user_role(member_role),
+                    type=grant_type,
+                    entity_name=SnowflakeConnector.snowflaky_user_role(entity),
+                )
             )
         return sql_commands
 
     def _generate_revoke_sql_commands_for_user(
         self, username: str, member_of_list: List[str]
-    ) -> List[Dict]:
+    ) -> List[SnowflakeCommand]:
         """For a given user, generate the SQL commands to revoke privileges
         to any roles not defined in the member of list
         """
@@ -190,27 +208,20 @@ class SnowflakeGrantsGenerator:
         for granted_role in self.roles_granted_to_user[username]:
             if granted_role not in member_of_list:
                 sql_commands.append(
-                    {
-                        "already_granted": False,
-                        "sql": REVOKE_ROLE_TEMPLATE.format(
-                            role_name=SnowflakeConnector.snowflaky_user_role(
-                                granted_role
-                            ),
-                            type="user",
-                            entity_name=SnowflakeConnector.snowflaky_user_role(
-                                username
-                            ),
-                        ),
-                    }
+                    SnowflakeCommand(
+                        REVOKE_ROLE_TEMPLATE,
+                        already_granted=False,
+                        role_name=SnowflakeConnector.snowflaky_user_role(granted_role),
+                        type="user",
+                        entity_name=SnowflakeConnector.snowflaky_user_role(username),
+                    )
                 )
 
         return sql_commands
 
     def _generate_revoke_sql_commands_for_role(self, rolename, member_of_list):
         sql_commands = []
-        for granted_role in (
-            self.grants_to_role.get(rolename, {}).get("usage", {}).get("role", [])
-        ):
+        for granted_role in self.grant_index.granted(rolename, "usage", "role"):
             if granted_role not in member_of_list:
                 snowflake_default_roles = [
                     "accountadmin",
@@ -225,18 +236,13 @@ class SnowflakeGrantsGenerator:
                 ):
                     continue
                 sql_commands.append(
-                    {
-                        "already_granted": False,
-                        "sql": REVOKE_ROLE_TEMPLATE.format(
-                            role_name=SnowflakeConnector.snowflaky_user_role(
-                                granted_role
-                            ),
-                            type="role",
-                            entity_name=SnowflakeConnector.snowflaky_user_role(
-                                rolename
-                            ),
-                        ),
-                    }
+                    SnowflakeCommand(
+                        REVOKE_ROLE_TEMPLATE,
+                        already_granted=False,
+                        role_name=SnowflakeConnector.snowflaky_user_role(granted_role),
+                        type="role",
+                        entity_name=SnowflakeConnector.snowflaky_user_role(rolename),
+                    )
                 )
         return sql_commands
 
@@ -245,8 +251,8 @@ class SnowflakeGrantsGenerator:
         entity_type: str,
         entity: str,
         config: Dict[str, Any],
-        all_entities: Optional[List] = None,
-    ) -> List[Dict]:
+        all_entities: Optional[Collection[str]] = None,
+    ) -> List[SnowflakeCommand]:
         """
         Generate the GRANT statements for both roles and users.
 
@@ -257,7 +263,7 @@ class SnowflakeGrantsGenerator:
 
         Returns the SQL commands generated as a list
         """
-        sql_commands: List[Dict] = []
+        sql_commands: List[SnowflakeCommand] = []
 
         if self.ignore_memberships:
             return sql_commands
@@ -368,7 +374,7 @@ class SnowflakeGrantsGenerator:
 
     def generate_grant_privileges_to_role(
         self, role: str, config: Dict[str, Any], shared_dbs: Set, spec_dbs: Set
-    ) -> List[Dict]:
+    ) -> List[SnowflakeCommand]:
         """
         Generate all the privilege granting and revocation
         statements for a role so Snowflake matches the spec.
@@ -387,7 +393,7 @@ class SnowflakeGrantsGenerator:
 
         Returns the SQL commands generated as a list
         """
-        sql_commands: List[Dict] = []
+        sql_commands: List[SnowflakeCommand] = []
 
         try:
             warehouses = config["warehouses"]
@@ -434,7 +440,7 @@ class SnowflakeGrantsGenerator:
 
     def generate_warehouse_grants(
         self, role: str, warehouses: list
-    ) -> List[Dict[str, Any]]:
+    ) -> List[SnowflakeCommand]:
         """
         Generate the GRANT statements for Warehouse usage and operation.
 
@@ -443,7 +449,7 @@ class SnowflakeGrantsGenerator:
 
         Returns the SQL command generated
         """
-        sql_commands: List[Dict] = []
+        sql_commands: List[SnowflakeCommand] = []
 
         for warehouse in warehouses:
             for priv in ["usage", "operate", "monitor"]:
@@ -452,40 +458,36 @@ class SnowflakeGrantsGenerator:
                 )
 
                 sql_commands.append(
-                    {
-                        "already_granted": already_granted,
-                        "sql": GRANT_PRIVILEGES_TEMPLATE.format(
-                            privileges=priv,
-                            resource_type="warehouse",
-                            resource_name=SnowflakeConnector.snowflaky(warehouse),
-                            role=SnowflakeConnector.snowflaky_user_role(role),
-                        ),
-                    }
+                    SnowflakeCommand(
+                        GRANT_PRIVILEGES_TEMPLATE,
+                        already_granted=already_granted,
+                        privileges=priv,
+                        resource_type="warehouse",
+                        resource_name=SnowflakeConnector.snowflaky(warehouse),
+                        role=SnowflakeConnector.snowflaky_user_role(role),
+                    )
                 )
         for priv in ["usage", "operate", "monitor"]:
-            for granted_warehouse in (
-                self.grants_to_role.get(role, {}).get(priv, {}).get("warehouse", [])
-            ):
+            for granted_warehouse in self.grant_index.granted(role, priv, "warehouse"):
                 if granted_warehouse not in warehouses:
                     sql_commands.append(
-                        {
-                            "already_granted": False,
-                            "sql": REVOKE_PRIVILEGES_TEMPLATE.format(
-                                privileges=priv,
-                                resource_type="warehouse",
-                                resource_name=SnowflakeConnector.snowflaky(
-                                    granted_warehouse
-                                ),
-                                role=SnowflakeConnector.snowflaky_user_role(role),
+                        SnowflakeCommand(
+                            REVOKE_PRIVILEGES_TEMPLATE,
+                            already_granted=False,
+                            privileges=priv,
+                            resource_type="warehouse",
+                            resource_name=SnowflakeConnector.snowflaky(
+                                granted_warehouse
                             ),
-                        }
+                            role=SnowflakeConnector.snowflaky_user_role(role),
+                        )
                     )
 
         return sql_commands
 
     def generate_integration_grants(
         self, role: str, integrations: list
-    ) -> List[Dict[str, Any]]:
+    ) -> List[SnowflakeCommand]:
         """
         Generate the GRANT statements for Integrations usage.
 
@@ -494,7 +496,7 @@ class SnowflakeGrantsGenerator:
 
         Returns the SQL command generated
         """
-        sql_commands: List[Dict] = []
+        sql_commands: List[SnowflakeCommand] = []
 
         for integration in integrations:
 
@@ -503,69 +505,63 @@ class SnowflakeGrantsGenerator:
             )
 
             sql_commands.append(
-                {
-                    "already_granted": already_granted,
-                    "sql": GRANT_PRIVILEGES_TEMPLATE.format(
-                        privileges="usage",
-                        resource_type="integration",
-                        resource_name=SnowflakeConnector.snowflaky(integration),
-                        role=SnowflakeConnector.snowflaky_user_role(role),
-                    ),
-                }
+                SnowflakeCommand(
+                    GRANT_PRIVILEGES_TEMPLATE,
+                    already_granted=already_granted,
+                    privileges="usage",
+                    resource_type="integration",
+                    resource_name=SnowflakeConnector.snowflaky(integration),
+                    role=SnowflakeConnector.snowflaky_user_role(role),
+                )
             )
-        print(self.grants_to_role.get(role, {}).get("usage", {}).get("integration", []))
-        for granted_integration in (
-            self.grants_to_role.get(role, {}).get("usage", {}).get("integration", [])
+        print(self.grant_index.granted(role, "usage", "integration"))
+        for granted_integration in self.grant_index.granted(
+            role, "usage", "integration"
         ):
             if granted_integration not in integrations:
                 sql_commands.append(
-                    {
-                        "already_granted": False,
-                        "sql": REVOKE_PRIVILEGES_TEMPLATE.format(
-                            privileges="usage",
-                            resource_type="integration",
-                            resource_name=SnowflakeConnector.snowflaky(
-                                granted_integration
-                            ),
-                            role=SnowflakeConnector.snowflaky_user_role(role),
-                        ),
-                    }
+                    SnowflakeCommand(
+                        REVOKE_PRIVILEGES_TEMPLATE,
+                        already_granted=False,
+                        privileges="usage",
+                        resource_type="integration",
+                        resource_name=SnowflakeConnector.snowflaky(granted_integration),
+                        role=SnowflakeConnector.snowflaky_user_role(role),
+                    )
                 )
 
         return sql_commands
 
     def _generate_database_read_privs(
         self, database: str, role: str, shared_dbs: Set[str], read_privileges: str
-    ) -> Dict:
+    ) -> SnowflakeCommand:
         already_granted = self.is_granted_privilege(role, "usage", "database", database)
 
         # If this is a shared database, we have to grant the "imported privileges"
         # privilege to the user and skip granting the specific permissions as
         # "Granting individual privileges on imported databases is not allowed."
         if database in shared_dbs:
-            return {
-                "already_granted": already_granted,
-                "sql": GRANT_PRIVILEGES_TEMPLATE.format(
-                    privileges="imported privileges",
-                    resource_type="database",
-                    resource_name=SnowflakeConnector.snowflaky(database),
-                    role=SnowflakeConnector.snowflaky_user_role(role),
-                ),
-            }
+            return SnowflakeCommand(
+                GRANT_PRIVILEGES_TEMPLATE,
+                already_granted=already_granted,
+                privileges="imported privileges",
+                resource_type="database",
+                resource_name=SnowflakeConnector.snowflaky(database),
+                role=SnowflakeConnector.snowflaky_user_role(role),
+            )
         else:
-            return {
-                "already_granted": already_granted,
-                "sql": GRANT_PRIVILEGES_TEMPLATE.format(
-                    privileges=read_privileges,
-                    resource_type="database",
-                    resource_name=SnowflakeConnector.snowflaky(database),
-                    role=SnowflakeConnector.snowflaky_user_role(role),
-                ),
-            }
+            return SnowflakeCommand(
+                GRANT_PRIVILEGES_TEMPLATE,
+                already_granted=already_granted,
+                privileges=read_privileges,
+                resource_type="database",
+                resource_name=SnowflakeConnector.snowflaky(database),
+                role=SnowflakeConnector.snowflaky_user_role(role),
+            )
 
     def generate_database_grants(
         self, role: str, databases: Dict[str, List], shared_dbs: Set, spec_dbs: Set
-    ) -> List[Dict[str, Any]]:
+    ) -> List[SnowflakeCommand]:
         """
         Generate the GRANT and REVOKE statements for Databases
         to align Snowflake with the spec.
@@ -606,28 +602,26 @@ class SnowflakeGrantsGenerator:
             # "Granting individual privileges on imported databases is not allowed."
             if database in shared_dbs:
                 sql_commands.append(
-                    {
-                        "already_granted": already_granted,
-                        "sql": GRANT_PRIVILEGES_TEMPLATE.format(
-                            privileges="imported privileges",
-                            resource_type="database",
-                            resource_name=SnowflakeConnector.snowflaky(database),
-                            role=SnowflakeConnector.snowflaky_user_role(role),
-                        ),
-                    }
+                    SnowflakeCommand(
+                        GRANT_PRIVILEGES_TEMPLATE,
+                        already_granted=already_granted,
+                        privileges="imported privileges",
+                        resource_type="database",
+                        resource_name=SnowflakeConnector.snowflaky(database),
+                        role=SnowflakeConnector.snowflaky_user_role(role),
+                    )
                 )
                 continue
 
             sql_commands.append(
-                {
-                    "already_granted": already_granted,
-                    "sql": GRANT_PRIVILEGES_TEMPLATE.format(
-                        privileges=write_privileges,
-                        resource_type="database",
-                        resource_name=SnowflakeConnector.snowflaky(database),
-                        role=SnowflakeConnector.snowflaky_user_role(role),
-                    ),
-                }
+                SnowflakeCommand(
+                    GRANT_PRIVILEGES_TEMPLATE,
+                    already_granted=already_granted,
+                    privileges=write_privileges,
+                    resource_type="database",
+                    resource_name=SnowflakeConnector.snowflaky(database),
+                    role=SnowflakeConnector.snowflaky_user_role(role),
+                )
             )
 
         # REVOKES
@@ -635,9 +629,7 @@ class SnowflakeGrantsGenerator:
         # The "Usage" privilege is consistent across read and write.
         # Compare granted usage to full read/write usage set
         # and revoke missing ones
-        usage_privs_on_db = (
-            self.grants_to_role.get(role, {}).get("usage", {}).get("database", [])
-        )
+        usage_privs_on_db = self.grant_index.granted(role, "usage", "database")
 
         for granted_database in usage_privs_on_db:
             # If it's a shared database, only revoke imported
@@ -651,46 +643,34 @@ class SnowflakeGrantsGenerator:
                 granted_database not in all_databases and granted_database in shared_dbs
             ):
                 sql_commands.append(
-                    {
-                        "already_granted": False,
-                        "sql": REVOKE_PRIVILEGES_TEMPLATE.format(
-                            privileges="imported privileges",
-                            resource_type="database",
-                            resource_name=SnowflakeConnector.snowflaky(
-                                granted_database
-                            ),
-                            role=SnowflakeConnector.snowflaky_user_role(role),
-                        ),
-                    }
+                    SnowflakeCommand(
+                        REVOKE_PRIVILEGES_TEMPLATE,
+                        already_granted=False,
+                        privileges="imported privileges",
+                        resource_type="database",
+                        resource_name=SnowflakeConnector.snowflaky(granted_database),
+                        role=SnowflakeConnector.snowflaky_user_role(role),
+                    )
                 )
             # Revoke read permissions on created databases in Snowflake
             elif granted_database not in all_databases:
                 sql_commands.append(
-                    {
-                        "already_granted": False,
-                        "sql": REVOKE_PRIVILEGES_TEMPLATE.format(
-                            privileges=read_privileges,
-                            resource_type="database",
-                            resource_name=SnowflakeConnector.snowflaky(
-                                granted_database
-                            ),
-                            role=SnowflakeConnector.snowflaky_user_role(role),
-                        ),
-                    }
+                    SnowflakeCommand(
+                        REVOKE_PRIVILEGES_TEMPLATE,
+                        already_granted=False,
+                        privileges=read_privileges,
+                        resource_type="database",
+                        resource_name=SnowflakeConnector.snowflaky(granted_database),
+                        role=SnowflakeConnector.snowflaky_user_role(role),
+                    )
                 )
         # Get all other write privilege dbs in case there are dbs where
         # usage was revoked but other write permissions still exist
         # This also preserves the case where somebody switches write access
         # for read access
-        monitor_privs_on_db = (
-            self.grants_to_role.get(role, {}).get("monitor", {}).get("database", [])
-        )
+        monitor_privs_on_db = self.grant_index.granted(role, "monitor", "database")
 
-        create_privs_on_db = (
-            self.grants_to_role.get(role, {})
-            .get("create schema", {})
-            .get("database", [])
-        )
+        create_privs_on_db = self.grant_index.granted(role, "create schema", "database")
 
         full_write_privs_on_dbs = monitor_privs_on_db + create_privs_on_db
 
@@ -702,43 +682,42 @@ class SnowflakeGrantsGenerator:
                 and granted_database in shared_dbs
             ):
                 sql_commands.append(
-                    {
-                        "already_granted": False,
-                        "sql": REVOKE_PRIVILEGES_TEMPLATE.format(
-                            privileges="imported privileges",
-                            resource_type="database",
-                            resource_name=SnowflakeConnector.snowflaky(
-                                granted_database
-                            ),
-                            role=SnowflakeConnector.snowflaky_user_role(role),
-                        ),
-                    }
+                    SnowflakeCommand(
+                        REVOKE_PRIVILEGES_TEMPLATE,
+                        already_granted=False,
+                        privileges="imported privileges",
+                        resource_type="database",
+                        resource_name=SnowflakeConnector.snowflaky(granted_database),
+                        role=SnowflakeConnector.snowflaky_user_role(role),
+                    )
                 )
             elif granted_database not in databases.get("write", []):
                 sql_commands.append(
-                    {
-                        "already_granted": False,
-                        "sql": REVOKE_PRIVILEGES_TEMPLATE.format(
-                            privileges=partial_write_privileges,
-                            resource_type="database",
-                            resource_name=SnowflakeConnector.snowflaky(
-                                granted_database
-                            ),
-                            role=SnowflakeConnector.snowflaky_user_role(role),
-                        ),
-                    }
+                    SnowflakeCommand(
+                        REVOKE_PRIVILEGES_TEMPLATE,
+                        already_granted=False,
+                        privileges=partial_write_privileges,
+                        resource_type="database",
+                        resource_name=SnowflakeConnector.snowflaky(granted_database),
+                        role=SnowflakeConnector.snowflaky_user_role(role),
+                    )
                 )
 
         return sql_commands
 
     def _generate_schema_read_grants(
         self, schemas, shared_dbs, role
-    ) -> Tuple[List[Dict], List]:
+    ) -> Tuple[List[SnowflakeCommand], List]:
 
         sql_commands = []
         read_grant_schemas = []
         read_privileges = "usage"
 
+        # Resolve the schema patterns of the role in one pass
+        self.metadata.match_schemas(
+            schema for schema in schemas if schema.split(".")[0] not in shared_dbs
+        )
+
         for schema in schemas:
             # Split the schema identifier into parts {DB_NAME}.{SCHEMA_NAME}
             # so that we can check and use each one
@@ -750,8 +729,7 @@ class SnowflakeGrantsGenerator:
             if database in shared_dbs:
                 continue
 
-            conn = SnowflakeConnector()
-            fetched_schemas = conn.full_schema_list(schema)
+            fetched_schemas = self.metadata.full_schema_list(schema)
             read_grant_schemas.extend(fetched_schemas)
 
             if name_parts[1] == "*":
@@ -765,16 +743,15 @@ class SnowflakeGrantsGenerator:
 
                 # Grant on FUTURE schemas
                 sql_commands.append(
-                    {
-                        "already_granted": schema_already_granted,
-                        "sql": GRANT_FUTURE_PRIVILEGES_TEMPLATE.format(
-                            privileges=read_privileges,
-                            resource_type="schema",
-                            grouping_type="database",
-                            grouping_name=SnowflakeConnector.snowflaky(database),
-                            role=SnowflakeConnector.snowflaky_user_role(role),
-                        ),
-                    }
+                    SnowflakeCommand(
+                        GRANT_FUTURE_PRIVILEGES_TEMPLATE,
+                        already_granted=schema_already_granted,
+                        privileges=read_privileges,
+                        resource_type="schema",
+                        grouping_type="database",
+                        grouping_name=SnowflakeConnector.snowflaky(database),
+                        role=SnowflakeConnector.snowflaky_user_role(role),
+                    )
                 )
 
             for db_schema in fetched_schemas:
@@ -786,21 +763,20 @@ class SnowflakeGrantsGenerator:
                     already_granted = True
 
                 sql_commands.append(
-                    {
-                        "already_granted": already_granted,
-                        "sql": GRANT_PRIVILEGES_TEMPLATE.format(
-                            privileges=read_privileges,
-                            resource_type="schema",
-                            resource_name=SnowflakeConnector.snowflaky(db_schema),
-                            role=SnowflakeConnector.snowflaky_user_role(role),
-                        ),
-                    }
+                    SnowflakeCommand(
+                        GRANT_PRIVILEGES_TEMPLATE,
+                        already_granted=already_granted,
+                        privileges=read_privileges,
+                        resource_type="schema",
+                        resource_name=SnowflakeConnector.snowflaky(db_schema),
+                        role=SnowflakeConnector.snowflaky_user_role(role),
+                    )
                 )
         return (sql_commands, read_grant_schemas)
 
     def _generate_schema_write_grants(
         self, schemas, shared_dbs, role
-    ) -> Tuple[List[Dict], List]:
+    ) -> Tuple[List[SnowflakeCommand], List]:
         sql_commands = []
         write_grant_schemas = []
 
@@ -813,6 +789,11 @@ class SnowflakeGrantsGenerator:
         write_privileges = f"{read_privileges}, {partial_write_privileges}"
         write_privileges_array = write_privileges.split(", ")
 
+        # Resolve the schema patterns of the role in one pass
+        self.metadata.match_schemas(
+            schema for schema in schemas if schema.split(".")[0] not in shared_dbs
+        )
+
         for schema in schemas:
             # Split the schema identifier into parts {DB_NAME}.{SCHEMA_NAME}
             # so that we can check and use each one
@@ -824,8 +805,7 @@ class SnowflakeGrantsGenerator:
             if database in shared_dbs:
                 continue
 
-            conn = SnowflakeConnector()
-            fetched_schemas = conn.full_schema_list(schema)
+            fetched_schemas = self.metadata.full_schema_list(schema)
             write_grant_schemas.extend(fetched_schemas)
 
             if name_parts[1] == "*":
@@ -844,16 +824,15 @@ class SnowflakeGrantsGenerator:
 
                 # Grant on FUTURE schemas
                 sql_commands.append(
-                    {
-                        "already_granted": already_granted,
-                        "sql": GRANT_FUTURE_PRIVILEGES_TEMPLATE.format(
-                            privileges=write_privileges,
-                            resource_type="schema",
-                            grouping_type="database",
-                            grouping_name=SnowflakeConnector.snowflaky(database),
-                            role=SnowflakeConnector.snowflaky_user_role(role),
-                        ),
-                    }
+                    SnowflakeCommand(
+                        GRANT_FUTURE_PRIVILEGES_TEMPLATE,
+                        already_granted=already_granted,
+                        privileges=write_privileges,
+                        resource_type="schema",
+                        grouping_type="database",
+                        grouping_name=SnowflakeConnector.snowflaky(database),
+                        role=SnowflakeConnector.snowflaky_user_role(role),
+                    )
                 )
 
             for db_schema in fetched_schemas:
@@ -867,15 +846,14 @@ class SnowflakeGrantsGenerator:
                         already_granted = False
 
                 sql_commands.append(
-                    {
-                        "already_granted": already_granted,
-                        "sql": GRANT_PRIVILEGES_TEMPLATE.format(
-                            privileges=write_privileges,
-                            resource_type="schema",
-                            resource_name=SnowflakeConnector.snowflaky(db_schema),
-                            role=SnowflakeConnector.snowflaky_user_role(role),
-                        ),
-                    }
+                    SnowflakeCommand(
+                        GRANT_PRIVILEGES_TEMPLATE,
+                        already_granted=already_granted,
+                        privileges=write_privileges,
+                        resource_type="schema",
+                        resource_name=SnowflakeConnector.snowflaky(db_schema),
+                        role=SnowflakeConnector.snowflaky_user_role(role),
+                    )
                 )
         return (sql_commands, write_grant_schemas)
 
@@ -884,6 +862,7 @@ class SnowflakeGrantsGenerator:
     ):
         sql_commands = []
         read_privileges = "usage"
+        all_grant_schemas = set(all_grant_schemas)
 
         for granted_schema in usage_schemas:
             database_name = granted_schema.split(".")[0]
@@ -899,16 +878,15 @@ class SnowflakeGrantsGenerator:
                 and future_schema_name not in all_grant_schemas  #
             ):
                 sql_commands.append(
-                    {
-                        "already_granted": False,
-                        "sql": REVOKE_FUTURE_PRIVILEGES_TEMPLATE.format(
-                            privileges=read_privileges,
-                            resource_type="schema",
-                            grouping_type="database",
-                            grouping_name=SnowflakeConnector.snowflaky(database_name),
-                            role=SnowflakeConnector.snowflaky_user_role(role),
-                        ),
-                    }
+                    SnowflakeCommand(
+                        REVOKE_FUTURE_PRIVILEGES_TEMPLATE,
+                        already_granted=False,
+                        privileges=read_privileges,
+                        resource_type="schema",
+                        grouping_type="database",
+                        grouping_name=SnowflakeConnector.snowflaky(database_name),
+                        role=SnowflakeConnector.snowflaky_user_role(role),
+                    )
                 )
             elif (
                 granted_schema not in all_grant_schemas
@@ -917,15 +895,14 @@ class SnowflakeGrantsGenerator:
                 # Covers case where schema is granted in Snowflake
                 # But it's not in the grant list and it's not explicitly granted as a future grant
                 sql_commands.append(
-                    {
-                        "already_granted": False,
-                        "sql": REVOKE_PRIVILEGES_TEMPLATE.format(
-                            privileges=read_privileges,
-                            resource_type="schema",
-                            resource_name=SnowflakeConnector.snowflaky(granted_schema),
-                            role=SnowflakeConnector.snowflaky_user_role(role),
-                        ),
-                    }
+                    SnowflakeCommand(
+                        REVOKE_PRIVILEGES_TEMPLATE,
+                        already_granted=False,
+                        privileges=read_privileges,
+                        resource_type="schema",
+                        resource_name=SnowflakeConnector.snowflaky(granted_schema),
+                        role=SnowflakeConnector.snowflaky_user_role(role),
+                    )
                 )
 
         return sql_commands
@@ -933,7 +910,7 @@ class SnowflakeGrantsGenerator:
     # TODO: This method is too complex, consider refactoring
     def generate_schema_grants(
         self, role: str, schemas: Dict[str, List], shared_dbs: Set, spec_dbs: Set
-    ) -> List[Dict]:
+    ) -> List[SnowflakeCommand]:
         """
         Generate the GRANT and REVOKE statements for schemas
         including future grants.
@@ -980,9 +957,7 @@ class SnowflakeGrantsGenerator:
 
         # The "usage" privilege is consistent across read and write.
         # Compare granted usage to full read/write set and revoke missing ones
-        usage_schemas = set(
-            self.grants_to_role.get(role, {}).get("usage", {}).get("schema", [])
-        )
+        usage_schemas = set(self.grant_index.granted(role, "usage", "schema"))
         all_grant_schemas = read_grant_schemas + write_grant_schemas
         sql_commands.extend(
             self._generate_schema_revokes(
@@ -1004,16 +979,17 @@ class SnowflakeGrantsGenerator:
             "create pipe",
         ]
 
+        write_grant_schema_set = set(write_grant_schemas)
         other_schema_grants = list()
         for privilege in other_privileges:
             other_schema_grants.extend(
-                self.grants_to_role.get(role, {}).get(privilege, {}).get("schema", [])
+                self.grant_index.granted(role, privilege, "schema")
             )
 
         for granted_schema in other_schema_grants:
             database_name = granted_schema.split(".")[0]
             future_schema_name = f"{database_name}.<schema>"
-            if granted_schema not in write_grant_schemas and (
+            if granted_schema not in write_grant_schema_set and (
                 database_name in shared_dbs or database_name not in spec_dbs
             ):
                 # No privileges to revoke on imported db. Done at database level
@@ -1021,45 +997,70 @@ class SnowflakeGrantsGenerator:
                 continue
             elif (  # If future privilege is granted but not in grant list
                 granted_schema == future_schema_name
-                and future_schema_name not in write_grant_schemas
+                and future_schema_name not in write_grant_schema_set
             ):
                 sql_commands.append(
-                    {
-                        "already_granted": False,
-                        "sql": REVOKE_FUTURE_PRIVILEGES_TEMPLATE.format(
-                            privileges=partial_write_privileges,
-                            resource_type="schema",
-                            grouping_type="database",
-                            grouping_name=SnowflakeConnector.snowflaky(database_name),
-                            role=SnowflakeConnector.snowflaky_user_role(role),
-                        ),
-                    }
+                    SnowflakeCommand(
+                        REVOKE_FUTURE_PRIVILEGES_TEMPLATE,
+                        already_granted=False,
+                        privileges=partial_write_privileges,
+                        resource_type="schema",
+                        grouping_type="database",
+                        grouping_name=SnowflakeConnector.snowflaky(database_name),
+                        role=SnowflakeConnector.snowflaky_user_role(role),
+                    )
                 )
             elif (
-                granted_schema not in write_grant_schemas
-                and future_schema_name not in write_grant_schemas
+                granted_schema not in write_grant_schema_set
+                and future_schema_name not in write_grant_schema_set
             ):
                 # Covers case where schema is granted and it's not explicitly granted as a future grant
                 sql_commands.append(
-                    {
-                        "already_granted": False,
-                        "sql": REVOKE_PRIVILEGES_TEMPLATE.format(
-                            privileges=partial_write_privileges,
-                            resource_type="schema",
-                            resource_name=SnowflakeConnector.snowflaky(granted_schema),
-                            role=SnowflakeConnector.snowflaky_user_role(role),
-                        ),
-                    }
+                    SnowflakeCommand(
+                        REVOKE_PRIVILEGES_TEMPLATE,
+                        already_granted=False,
+                        privileges=partial_write_privileges,
+                        resource_type="schema",
+                        resource_name=SnowflakeConnector.snowflaky(granted_schema),
+                        role=SnowflakeConnector.snowflaky_user_role(role),
+                    )
                 )
 
         return sql_commands
 
-    def _generate_table_read_grants(self, conn, tables, shared_dbs, role):
+    def _match_table_patterns(
+        self, tables: List[str], shared_dbs: Set[str]
+    ) -> Tuple[Dict[str, List[str]], Dict[str, List[str]]]:
+        """
+        Resolve the schemas of the table references of a role, and the tables
+        and views matching its partial table/view names (e.g. raw.public.stg_*),
+        with a single pass over the schemas, tables and views of each database.
+
+        Returns the tables and the views matching each partial name.
+        """
+        tables = [table for table in tables if table.split(".")[0] not in shared_dbs]
+        self.metadata.match_schemas(".".join(table.split(".")[:2]) for table in tables)
+
+        patterns = []
+        for table in tables:
+            name_parts = table.split(".")
+            if (
+                len(name_parts) > 2
+                and name_parts[2] != "*"
+                and is_pattern(name_parts[2])
+            ):
+                patterns.append(table)
+
+        return self.metadata.match_tables(patterns), self.metadata.match_views(patterns)
+
+    def _generate_table_read_grants(self, tables, shared_dbs, role):
         sql_commands = []
         read_grant_tables_full = []
         read_grant_views_full = []
         read_privileges = "select"
 
+        table_matches, view_matches = self._match_table_patterns(tables, shared_dbs)
+
         for table in tables:
             # Split the table identifier into parts {DB_NAME}.{SCHEMA_NAME}.{TABLE_NAME}
             # so that we can check and use each one
@@ -1082,7 +1083,9 @@ class SnowflakeGrantsGenerator:
             read_table_list = []
             read_view_list = []
 
-            fetched_schemas = conn.full_schema_list(f"{database_name}.{schema_name}")
+            fetched_schemas = self.metadata.full_schema_list(
+                f"{database_name}.{schema_name}"
+            )
 
             # For grants at the database level for tables
             future_database_table = "{database}.<table>".format(database=database_name)
@@ -1102,56 +1105,52 @@ class SnowflakeGrantsGenerator:
 
                 # Tables
                 sql_commands.append(
-                    {
-                        "already_granted": table_already_granted,
-                        "sql": GRANT_FUTURE_PRIVILEGES_TEMPLATE.format(
-                            privileges=read_privileges,
-                            resource_type="table",
-                            grouping_type="database",
-                            grouping_name=SnowflakeConnector.snowflaky(database_name),
-                            role=SnowflakeConnector.snowflaky_user_role(role),
-                        ),
-                    }
+                    SnowflakeCommand(
+                        GRANT_FUTURE_PRIVILEGES_TEMPLATE,
+                        already_granted=table_already_granted,
+                        privileges=read_privileges,
+                        resource_type="table",
+                        grouping_type="database",
+                        grouping_name=SnowflakeConnector.snowflaky(database_name),
+                        role=SnowflakeConnector.snowflaky_user_role(role),
+                    )
                 )
 
                 sql_commands.append(
-                    {
-                        "already_granted": table_already_granted,
-                        "sql": GRANT_ALL_PRIVILEGES_TEMPLATE.format(
-                            privileges=read_privileges,
-                            resource_type="table",
-                            grouping_type="database",
-                            grouping_name=SnowflakeConnector.snowflaky(database_name),
-                            role=SnowflakeConnector.snowflaky_user_role(role),
-                        ),
-                    }
+                    SnowflakeCommand(
+                        GRANT_ALL_PRIVILEGES_TEMPLATE,
+                        already_granted=table_already_granted,
+                        privileges=read_privileges,
+                        resource_type="table",
+                        grouping_type="database",
+                        grouping_name=SnowflakeConnector.snowflaky(database_name),
+                        role=SnowflakeConnector.snowflaky_user_role(role),
+                    )
                 )
 
                 # Views
                 sql_commands.append(
-                    {
-                        "already_granted": view_already_granted,
-                        "sql": GRANT_FUTURE_PRIVILEGES_TEMPLATE.format(
-                            privileges=read_privileges,
-                            resource_type="view",
-                            grouping_type="database",
-                            grouping_name=SnowflakeConnector.snowflaky(database_name),
-                            role=SnowflakeConnector.snowflaky_user_role(role),
-                        ),
-                    }
+                    SnowflakeCommand(
+                        GRANT_FUTURE_PRIVILEGES_TEMPLATE,
+                        already_granted=view_already_granted,
+                        privileges=read_privileges,
+                        resource_type="view",
+                        grouping_type="database",
+                        grouping_name=SnowflakeConnector.snowflaky(database_name),
+                        role=SnowflakeConnector.snowflaky_user_role(role),
+                    )
                 )
 
                 sql_commands.append(
-                    {
-                        "already_granted": view_already_granted,
-                        "sql": GRANT_ALL_PRIVILEGES_TEMPLATE.format(
-                            privileges=read_privileges,
-                            resource_type="view",
-                            grouping_type="database",
-                            grouping_name=SnowflakeConnector.snowflaky(database_name),
-                            role=SnowflakeConnector.snowflaky_user_role(role),
-                        ),
-                    }
+                    SnowflakeCommand(
+                        GRANT_ALL_PRIVILEGES_TEMPLATE,
+                        already_granted=view_already_granted,
+                        privileges=read_privileges,
+                        resource_type="view",
+                        grouping_type="database",
+                        grouping_name=SnowflakeConnector.snowflaky(database_name),
+                        role=SnowflakeConnector.snowflaky_user_role(role),
+                    )
                 )
 
             for schema in fetched_schemas:
@@ -1159,8 +1158,8 @@ class SnowflakeGrantsGenerator:
                 # to the read_tables_list[] and read_views_list[] variables.
                 # This is so we can check that a table given in the config
                 # Is valid
-                read_table_list.extend(conn.show_tables(schema=schema))
-                read_view_list.extend(conn.show_views(schema=schema))
+                read_table_list.extend(self.metadata.show_tables(schema=schema))
+                read_view_list.extend(self.metadata.show_views(schema=schema))
 
             if table_view_name == "*":
                 # If <schema_name>.* then you add all tables to grant list and then grant future
@@ -1185,30 +1184,28 @@ class SnowflakeGrantsGenerator:
 
                     # Grant future on all tables
                     sql_commands.append(
-                        {
-                            "already_granted": table_already_granted,
-                            "sql": GRANT_FUTURE_PRIVILEGES_TEMPLATE.format(
-                                privileges=read_privileges,
-                                resource_type="table",
-                                grouping_type="schema",
-                                grouping_name=SnowflakeConnector.snowflaky(schema),
-                                role=SnowflakeConnector.snowflaky_user_role(role),
-                            ),
-                        }
+                        SnowflakeCommand(
+                            GRANT_FUTURE_PRIVILEGES_TEMPLATE,
+                            already_granted=table_already_granted,
+                            privileges=read_privileges,
+                            resource_type="table",
+                            grouping_type="schema",
+                            grouping_name=SnowflakeConnector.snowflaky(schema),
+                            role=SnowflakeConnector.snowflaky_user_role(role),
+                        )
                     )
 
                     # Grant select on all tables
                     sql_commands.append(
-                        {
-                            "already_granted": table_already_granted,
-                            "sql": GRANT_ALL_PRIVILEGES_TEMPLATE.format(
-                                privileges=read_privileges,
-                                resource_type="table",
-                                grouping_type="schema",
-                                grouping_name=SnowflakeConnector.snowflaky(schema),
-                                role=SnowflakeConnector.snowflaky_user_role(role),
-                            ),
-                        }
+                        SnowflakeCommand(
+                            GRANT_ALL_PRIVILEGES_TEMPLATE,
+                            already_granted=table_already_granted,
+                            privileges=read_privileges,
+                            resource_type="table",
+                            grouping_type="schema",
+                            grouping_name=SnowflakeConnector.snowflaky(schema),
+                            role=SnowflakeConnector.snowflaky_user_role(role),
+                        )
                     )
 
                     view_already_granted = self.is_granted_privilege(
@@ -1217,33 +1214,37 @@ class SnowflakeGrantsGenerator:
 
                     # Grant future on all views
                     sql_commands.append(
-                        {
-                            "already_granted": view_already_granted,
-                            "sql": GRANT_FUTURE_PRIVILEGES_TEMPLATE.format(
-                                privileges=read_privileges,
-                                resource_type="view",
-                                grouping_type="schema",
-                                grouping_name=SnowflakeConnector.snowflaky(schema),
-                                role=SnowflakeConnector.snowflaky_user_role(role),
-                            ),
-                        }
+                        SnowflakeCommand(
+                            GRANT_FUTURE_PRIVILEGES_TEMPLATE,
+                            already_granted=view_already_granted,
+                            privileges=read_privileges,
+                            resource_type="view",
+                            grouping_type="schema",
+                            grouping_name=SnowflakeConnector.snowflaky(schema),
+                            role=SnowflakeConnector.snowflaky_user_role(role),
+                        )
                     )
 
                     # Grant select on all views
                     sql_commands.append(
-                        {
-                            "already_granted": view_already_granted,
-                            "sql": GRANT_ALL_PRIVILEGES_TEMPLATE.format(
-                                privileges=read_privileges,
-                                resource_type="view",
-                                grouping_type="schema",
-                                grouping_name=SnowflakeConnector.snowflaky(schema),
-                                role=SnowflakeConnector.snowflaky_user_role(role),
-                            ),
-                        }
+                        SnowflakeCommand(
+                            GRANT_ALL_PRIVILEGES_TEMPLATE,
+                            already_granted=view_already_granted,
+                            privileges=read_privileges,
+                            resource_type="view",
+                            grouping_type="schema",
+                            grouping_name=SnowflakeConnector.snowflaky(schema),
+                            role=SnowflakeConnector.snowflaky_user_role(role),
+                        )
                     )
 
-            # TODO Future elif to have partial table name
+            elif is_pattern(table_view_name):
+                # Partial table/view names (e.g. stg_* or events_????) were
+                # matched against the tables and views of their schemas
+                read_grant_tables = table_matches[table]
+                read_grant_views = view_matches[table]
+                read_grant_tables_full.extend(read_grant_tables)
+                read_grant_views_full.extend(read_grant_views)
 
             else:
                 # Else the table passed is a single entity
@@ -1264,15 +1265,14 @@ class SnowflakeGrantsGenerator:
                 )
 
                 sql_commands.append(
-                    {
-                        "already_granted": already_granted,
-                        "sql": GRANT_PRIVILEGES_TEMPLATE.format(
-                            privileges=read_privileges,
-                            resource_type="table",
-                            resource_name=SnowflakeConnector.snowflaky(db_table),
-                            role=SnowflakeConnector.snowflaky_user_role(role),
-                        ),
-                    }
+                    SnowflakeCommand(
+                        GRANT_PRIVILEGES_TEMPLATE,
+                        already_granted=already_granted,
+                        privileges=read_privileges,
+                        resource_type="table",
+                        resource_name=SnowflakeConnector.snowflaky(db_table),
+                        role=SnowflakeConnector.snowflaky_user_role(role),
+                    )
                 )
 
             # Grant privileges to all flagged views
@@ -1282,21 +1282,20 @@ class SnowflakeGrantsGenerator:
                 )
 
                 sql_commands.append(
-                    {
-                        "already_granted": already_granted,
-                        "sql": GRANT_PRIVILEGES_TEMPLATE.format(
-                            privileges=read_privileges,
-                            resource_type="view",
-                            resource_name=SnowflakeConnector.snowflaky(db_view),
-                            role=SnowflakeConnector.snowflaky_user_role(role),
-                        ),
-                    }
+                    SnowflakeCommand(
+                        GRANT_PRIVILEGES_TEMPLATE,
+                        already_granted=already_granted,
+                        privileges=read_privileges,
+                        resource_type="view",
+                        resource_name=SnowflakeConnector.snowflaky(db_view),
+                        role=SnowflakeConnector.snowflaky_user_role(role),
+                    )
                 )
 
         return (sql_commands, read_grant_tables_full, read_grant_views_full)
 
     #  TODO: This method remains complex, could use extra refactoring
-    def _generate_table_write_grants(self, conn, tables, shared_dbs, role):  # noqa
+    def _generate_table_write_grants(self, tables, shared_dbs, role):  # noqa
         sql_commands = []
         write_grant_tables_full = []
         write_grant_views_full = []
@@ -1306,6 +1305,8 @@ class SnowflakeGrantsGenerator:
         write_privileges = f"{read_privileges}, {write_partial_privileges}"
         write_privileges_array = write_privileges.split(", ")
 
+        table_matches, view_matches = self._match_table_patterns(tables, shared_dbs)
+
         for table in tables:
             # Split the table identifier into parts {DB_NAME}.{SCHEMA_NAME}.{TABLE_NAME}
             #  so that we can check and use each one
@@ -1327,7 +1328,9 @@ class SnowflakeGrantsGenerator:
             write_table_list = []
             write_view_list = []
 
-            fetched_schemas = conn.full_schema_list(f"{database_name}.{name_parts[1]}")
+            fetched_schemas = self.metadata.full_schema_list(
+                f"{database_name}.{name_parts[1]}"
+            )
 
             # For grants at the database level
             future_database_table = "{database}.<table>".format(database=database_name)
@@ -1351,56 +1354,52 @@ class SnowflakeGrantsGenerator:
 
                 # Tables
                 sql_commands.append(
-                    {
-                        "already_granted": table_already_granted,
-                        "sql": GRANT_FUTURE_PRIVILEGES_TEMPLATE.format(
-                            privileges=write_privileges,
-                            resource_type="table",
-                            grouping_type="database",
-                            grouping_name=SnowflakeConnector.snowflaky(database_name),
-                            role=SnowflakeConnector.snowflaky_user_role(role),
-                        ),
-                    }
+                    SnowflakeCommand(
+                        GRANT_FUTURE_PRIVILEGES_TEMPLATE,
+                        already_granted=table_already_granted,
+                        privileges=write_privileges,
+                        resource_type="table",
+                        grouping_type="database",
+                        grouping_name=SnowflakeConnector.snowflaky(database_name),
+                        role=SnowflakeConnector.snowflaky_user_role(role),
+                    )
                 )
 
                 sql_commands.append(
-                    {
-                        "already_granted": table_already_granted,
-                        "sql": GRANT_ALL_PRIVILEGES_TEMPLATE.format(
-                            privileges=write_privileges,
-                            resource_type="table",
-                            grouping_type="database",
-                            grouping_name=SnowflakeConnector.snowflaky(database_name),
-                            role=SnowflakeConnector.snowflaky_user_role(role),
-                        ),
-                    }
+                    SnowflakeCommand(
+                        GRANT_ALL_PRIVILEGES_TEMPLATE,
+                        already_granted=table_already_granted,
+                        privileges=write_privileges,
+                        resource_type="table",
+                        grouping_type="database",
+                        grouping_name=SnowflakeConnector.snowflaky(database_name),
+                        role=SnowflakeConnector.snowflaky_user_role(role),
+                    )
                 )
 
                 # Views
                 sql_commands.append(
-                    {
-                        "already_granted": view_already_granted,
-                        "sql": GRANT_FUTURE_PRIVILEGES_TEMPLATE.format(
-                            privileges="select",
-                            resource_type="view",
-                            grouping_type="database",
-                            grouping_name=SnowflakeConnector.snowflaky(database_name),
-                            role=SnowflakeConnector.snowflaky_user_role(role),
-                        ),
-                    }
+                    SnowflakeCommand(
+                        GRANT_FUTURE_PRIVILEGES_TEMPLATE,
+                        already_granted=view_already_granted,
+                        privileges="select",
+                        resource_type="view",
+                        grouping_type="database",
+                        grouping_name=SnowflakeConnector.snowflaky(database_name),
+                        role=SnowflakeConnector.snowflaky_user_role(role),
+                    )
                 )
 
                 sql_commands.append(
-                    {
-                        "already_granted": view_already_granted,
-                        "sql": GRANT_ALL_PRIVILEGES_TEMPLATE.format(
-                            privileges="select",
-                            resource_type="view",
-                            grouping_type="database",
-                            grouping_name=SnowflakeConnector.snowflaky(database_name),
-                            role=SnowflakeConnector.snowflaky_user_role(role),
-                        ),
-                    }
+                    SnowflakeCommand(
+                        GRANT_ALL_PRIVILEGES_TEMPLATE,
+                        already_granted=view_already_granted,
+                        privileges="select",
+                        resource_type="view",
+                        grouping_type="database",
+                        grouping_name=SnowflakeConnector.snowflaky(database_name),
+                        role=SnowflakeConnector.snowflaky_user_role(role),
+                    )
                 )
 
             for schema in fetched_schemas:
@@ -1408,8 +1407,8 @@ class SnowflakeGrantsGenerator:
                 # to the write_tables_list[] and write_views_list[] variables.
                 # This is so we can check that a table given in the config
                 # Is valid
-                write_table_list.extend(conn.show_tables(schema=schema))
-                write_view_list.extend(conn.show_views(schema=schema))
+                write_table_list.extend(self.metadata.show_tables(schema=schema))
+                write_view_list.extend(self.metadata.show_views(schema=schema))
 
             if table_view_name == "*":
                 # If <schema_name>.* then you add all tables to grant list and then grant future
@@ -1437,30 +1436,28 @@ class SnowflakeGrantsGenerator:
                             table_already_granted = False
                     # Grant future on all tables
                     sql_commands.append(
-                        {
-                            "already_granted": table_already_granted,
-                            "sql": GRANT_FUTURE_PRIVILEGES_TEMPLATE.format(
-                                privileges=write_privileges,
-                                resource_type="table",
-                                grouping_type="schema",
-                                grouping_name=SnowflakeConnector.snowflaky(schema),
-                                role=SnowflakeConnector.snowflaky_user_role(role),
-                            ),
-                        }
+                        SnowflakeCommand(
+                            GRANT_FUTURE_PRIVILEGES_TEMPLATE,
+                            already_granted=table_already_granted,
+                            privileges=write_privileges,
+                            resource_type="table",
+                            grouping_type="schema",
+                            grouping_name=SnowflakeConnector.snowflaky(schema),
+                            role=SnowflakeConnector.snowflaky_user_role(role),
+                        )
                     )
 
                     # Grant write on all tables
                     sql_commands.append(
-                        {
-                            "already_granted": table_already_granted,
-                            "sql": GRANT_ALL_PRIVILEGES_TEMPLATE.format(
-                                privileges=write_privileges,
-                                resource_type="table",
-                                grouping_type="schema",
-                                grouping_name=SnowflakeConnector.snowflaky(schema),
-                                role=SnowflakeConnector.snowflaky_user_role(role),
-                            ),
-                        }
+                        SnowflakeCommand(
+                            GRANT_ALL_PRIVILEGES_TEMPLATE,
+                            already_granted=table_already_granted,
+                            privileges=write_privileges,
+                            resource_type="table",
+                            grouping_type="schema",
+                            grouping_name=SnowflakeConnector.snowflaky(schema),
+                            role=SnowflakeConnector.snowflaky_user_role(role),
+                        )
                     )
                     view_already_granted = self.is_granted_privilege(
                         role, "select", "view", future_view
@@ -1468,33 +1465,37 @@ class SnowflakeGrantsGenerator:
 
                     # Grant future on all views. Select is only privilege
                     sql_commands.append(
-                        {
-                            "already_granted": view_already_granted,
-                            "sql": GRANT_FUTURE_PRIVILEGES_TEMPLATE.format(
-                                privileges="select",
-                                resource_type="view",
-                                grouping_type="schema",
-                                grouping_name=SnowflakeConnector.snowflaky(schema),
-                                role=SnowflakeConnector.snowflaky_user_role(role),
-                            ),
-                        }
+                        SnowflakeCommand(
+                            GRANT_FUTURE_PRIVILEGES_TEMPLATE,
+                            already_granted=view_already_granted,
+                            privileges="select",
+                            resource_type="view",
+                            grouping_type="schema",
+                            grouping_name=SnowflakeConnector.snowflaky(schema),
+                            role=SnowflakeConnector.snowflaky_user_role(role),
+                        )
                     )
 
                     # Grant privileges on all views. Select is only privilege
                     sql_commands.append(
-                        {
-                            "already_granted": view_already_granted,
-                            "sql": GRANT_ALL_PRIVILEGES_TEMPLATE.format(
-                                privileges="select",
-                                resource_type="view",
-                                grouping_type="schema",
-                                grouping_name=SnowflakeConnector.snowflaky(schema),
-                                role=SnowflakeConnector.snowflaky_user_role(role),
-                            ),
-                        }
+                        SnowflakeCommand(
+                            GRANT_ALL_PRIVILEGES_TEMPLATE,
+                            already_granted=view_already_granted,
+                            privileges="select",
+                            resource_type="view",
+                            grouping_type="schema",
+                            grouping_name=SnowflakeConnector.snowflaky(schema),
+                            role=SnowflakeConnector.snowflaky_user_role(role),
+                        )
                     )
 
-            # TODO Future elif to have partial table name
+            elif is_pattern(table_view_name):
+                # Partial table/view names (e.g. stg_* or events_????) were
+                # matched against the tables and views of their schemas
+                write_grant_tables = table_matches[table]
+                write_grant_views = view_matches[table]
+                write_grant_tables_full.extend(write_grant_tables)
+                write_grant_views_full.extend(write_grant_views)
 
             else:
                 # Only one table/view to be granted permissions to
@@ -1519,15 +1520,14 @@ class SnowflakeGrantsGenerator:
                         table_already_granted = False
 
                 sql_commands.append(
-                    {
-                        "already_granted": table_already_granted,
-                        "sql": GRANT_PRIVILEGES_TEMPLATE.format(
-                            privileges=write_privileges,
-                            resource_type="table",
-                            resource_name=SnowflakeConnector.snowflaky(db_table),
-                            role=SnowflakeConnector.snowflaky_user_role(role),
-                        ),
-                    }
+                    SnowflakeCommand(
+                        GRANT_PRIVILEGES_TEMPLATE,
+                        already_granted=table_already_granted,
+                        privileges=write_privileges,
+                        resource_type="table",
+                        resource_name=SnowflakeConnector.snowflaky(db_table),
+                        role=SnowflakeConnector.snowflaky_user_role(role),
+                    )
                 )
 
             # Grant privileges to all views in that schema.
@@ -1539,15 +1539,14 @@ class SnowflakeGrantsGenerator:
                     already_granted = True
 
                 sql_commands.append(
-                    {
-                        "already_granted": already_granted,
-                        "sql": GRANT_PRIVILEGES_TEMPLATE.format(
-                            privileges="select",
-                            resource_type="view",
-                            resource_name=SnowflakeConnector.snowflaky(db_view),
-                            role=SnowflakeConnector.snowflaky_user_role(role),
-                        ),
-                    }
+                    SnowflakeCommand(
+                        GRANT_PRIVILEGES_TEMPLATE,
+                        already_granted=already_granted,
+                        privileges="select",
+                        resource_type="view",
+                        resource_name=SnowflakeConnector.snowflaky(db_view),
+                        role=SnowflakeConnector.snowflaky_user_role(role),
+                    )
                 )
 
         return (sql_commands, write_grant_tables_full, write_grant_views_full)
@@ -1561,7 +1560,7 @@ class SnowflakeGrantsGenerator:
         privilege_set: str,
         resource_type: str,
         granted_resources: List[str],
-    ) -> List[Dict[str, Any]]:
+    ) -> List[SnowflakeCommand]:
         """
         Generates REVOKE privileges for tables/views known as resources here
 
@@ -1576,6 +1575,8 @@ class SnowflakeGrantsGenerator:
         Returns a list of REVOKE statements
         """
         sql_commands = []
+        # Set lookups, as roles can have hundreds of thousands of grants
+        all_grant_resource_set = set(all_grant_resources)
         for granted_resource in granted_resources:
             resource_split = granted_resource.split(".")
             database_name = resource_split[0]
@@ -1593,7 +1594,7 @@ class SnowflakeGrantsGenerator:
                 grouping_type = "schema"
                 grouping_name = f"{database_name}.{schema_name}"
 
-            if granted_resource not in all_grant_resources and (
+            if granted_resource not in all_grant_resource_set and (
                 database_name in shared_dbs or database_name not in spec_dbs
             ):
                 # No privileges to revoke on imported db. Done at database level
@@ -1601,39 +1602,35 @@ class SnowflakeGrantsGenerator:
                 continue
             elif (
                 granted_resource == future_resource
-                and future_resource not in all_grant_resources
+                and future_resource not in all_grant_resource_set
             ):
                 # If future privilege is granted in Snowflake but not in grant list
                 sql_commands.append(
-                    {
-                        "already_granted": False,
-                        "sql": REVOKE_FUTURE_PRIVILEGES_TEMPLATE.format(
-                            privileges=privilege_set,
-                            resource_type=resource_type,
-                            grouping_type=grouping_type,
-                            grouping_name=SnowflakeConnector.snowflaky(grouping_name),
-                            role=SnowflakeConnector.snowflaky_user_role(role),
-                        ),
-                    }
+                    SnowflakeCommand(
+                        REVOKE_FUTURE_PRIVILEGES_TEMPLATE,
+                        already_granted=False,
+                        privileges=privilege_set,
+                        resource_type=resource_type,
+                        grouping_type=grouping_type,
+                        grouping_name=SnowflakeConnector.snowflaky(grouping_name),
+                        role=SnowflakeConnector.snowflaky_user_role(role),
+                    )
                 )
             elif (
-                granted_resource not in all_grant_resources
-                and future_resource not in all_grant_resources
+                granted_resource not in all_grant_resource_set
+                and future_resource not in all_grant_resource_set
             ):
                 # Covers case where resource is granted in Snowflake
                 # But it's not in the grant list and it's not explicitly granted as a future grant
                 sql_commands.append(
-                    {
-                        "already_granted": False,
-                        "sql": REVOKE_PRIVILEGES_TEMPLATE.format(
-                            privileges=privilege_set,
-                            resource_type=resource_type,
-                            resource_name=SnowflakeConnector.snowflaky(
-                                granted_resource
-                            ),
-                            role=SnowflakeConnector.snowflaky_user_role(role),
-                        ),
-                    }
+                    SnowflakeCommand(
+                        REVOKE_PRIVILEGES_TEMPLATE,
+                        already_granted=False,
+                        privileges=privilege_set,
+                        resource_type=resource_type,
+                        resource_name=SnowflakeConnector.snowflaky(granted_resource),
+                        role=SnowflakeConnector.snowflaky_user_role(role),
+                    )
                 )
         return sql_commands
 
@@ -1645,14 +1642,12 @@ class SnowflakeGrantsGenerator:
         all_grant_tables: List[str],
         all_grant_views: List[str],
         write_grant_tables_full: List[str],
-    ) -> List[Dict[str, Any]]:
+    ) -> List[SnowflakeCommand]:
 
         read_privileges = "select"
         write_partial_privileges = "insert, update, delete, truncate, references"
         sql_commands = []
-        granted_resources = list(
-            set(self.grants_to_role.get(role, {}).get("select", {}).get("table", []))
-        )
+        granted_resources = list(set(self.grant_index.granted(role, "select", "table")))
 
         sql_commands.extend(
             self._generate_revoke_select_privs(
@@ -1665,9 +1660,7 @@ class SnowflakeGrantsGenerator:
                 granted_resources=granted_resources,
             )
         )
-        granted_resources = list(
-            set(self.grants_to_role.get(role, {}).get("select", {}).get("view", []))
-        )
+        granted_resources = list(set(self.grant_index.granted(role, "select", "view")))
         sql_commands.extend(
             self._generate_revoke_select_privs(
                 role=role,
@@ -1682,9 +1675,7 @@ class SnowflakeGrantsGenerator:
 
         all_write_privs_granted_tables = []
         for privilege in write_partial_privileges.split(", "):
-            table_names = (
-                self.grants_to_role.get(role, {}).get(privilege, {}).get("table", [])
-            )
+            table_names = self.grant_index.granted(role, privilege, "table")
             all_write_privs_granted_tables += table_names
         all_write_privs_granted_tables = list(set(all_write_privs_granted_tables))
 
@@ -1707,7 +1698,7 @@ class SnowflakeGrantsGenerator:
 
     def generate_table_and_view_grants(
         self, role: str, tables: Dict[str, List], shared_dbs: Set, spec_dbs: Set
-    ) -> List[Dict]:
+    ) -> List[SnowflakeCommand]:
         """
         Generate the GRANT and REVOKE statements for tables and views
         including future grants.
@@ -1731,11 +1722,9 @@ class SnowflakeGrantsGenerator:
         write_grant_tables_full = []
         write_grant_views_full = []
 
-        conn = SnowflakeConnector()
-
         read_tables = tables.get("read", [])
         read_command, read_table, read_views = self._generate_table_read_grants(
-            conn, read_tables, shared_dbs, role
+            read_tables, shared_dbs, role
         )
         sql_commands.extend(read_command)
         read_grant_tables_full.extend(read_table)
@@ -1743,7 +1732,7 @@ class SnowflakeGrantsGenerator:
 
         write_tables = tables.get("write", [])
         write_command, write_table, write_views = self._generate_table_write_grants(
-            conn, write_tables, shared_dbs, role
+            write_tables, shared_dbs, role
         )
         sql_commands.extend(write_command)
         write_grant_tables_full.extend(write_table)
@@ -1764,7 +1753,9 @@ class SnowflakeGrantsGenerator:
         )
         return sql_commands
 
-    def generate_alter_user(self, user: str, config: Dict[str, Any]) -> List[Dict]:
+    def generate_alter_user(
+        self, user: str, config: Dict[str, Any]
+    ) -> List[SnowflakeCommand]:
         """
         Generate the ALTER statements for USERs.
 
@@ -1785,20 +1776,19 @@ class SnowflakeGrantsGenerator:
                 alter_privileges.append("DISABLED = TRUE")
         if alter_privileges:
             sql_commands.append(
-                {
-                    "already_granted": False,
-                    "sql": ALTER_USER_TEMPLATE.format(
-                        user_name=SnowflakeConnector.snowflaky_user_role(user),
-                        privileges=", ".join(alter_privileges),
-                    ),
-                }
+                SnowflakeCommand(
+                    ALTER_USER_TEMPLATE,
+                    already_granted=False,
+                    user_name=SnowflakeConnector.snowflaky_user_role(user),
+                    privileges=", ".join(alter_privileges),
+                )
             )
 
         return sql_commands
 
     def _generate_ownership_grant_database(
         self, role: str, database_refs: List[str]
-    ) -> List[Dict]:
+    ) -> List[SnowflakeCommand]:
         sql_commands = []
         for database in database_refs:
             already_granted = self.is_granted_privilege(
@@ -1806,57 +1796,49 @@ class SnowflakeGrantsGenerator:
             )
 
             sql_commands.append(
-                {
-                    "already_granted": already_granted,
-                    "sql": GRANT_OWNERSHIP_TEMPLATE.format(
-                        resource_type="database",
-                        resource_name=SnowflakeConnector.snowflaky(database),
-                        role_name=SnowflakeConnector.snowflaky_user_role(role),
-                    ),
-                }
+                SnowflakeCommand(
+                    GRANT_OWNERSHIP_TEMPLATE,
+                    already_granted=already_granted,
+                    resource_type="database",
+                    resource_name=SnowflakeConnector.snowflaky(database),
+                    role_name=SnowflakeConnector.snowflaky_user_role(role),
+                )
             )
         return sql_commands
 
-    def _generate_ownership_grant_schema(self, conn, role, schema_refs) -> List[Dict]:
+    def _generate_ownership_grant_schema(
+        self, role, schema_refs
+    ) -> List[SnowflakeCommand]:
         sql_commands = []
+        schema_matches = self.metadata.match_schemas(schema_refs)
         for schema in schema_refs:
-            name_parts = schema.split(".")
-            info_schema = f"{name_parts[0]}.information_schema"
-
-            schemas = []
-
-            if name_parts[1] == "*":
-                db_schemas = conn.show_schemas(name_parts[0])
-
-                for db_schema in db_schemas:
-                    if db_schema != info_schema:
-                        schemas.append(db_schema)
-            else:
-                schemas = [schema]
-
-            for db_schema in schemas:
+            for db_schema in schema_matches[schema]:
                 already_granted = self.is_granted_privilege(
                     role, "ownership", "schema", db_schema
                 )
 
                 sql_commands.append(
-                    {
-                        "already_granted": already_granted,
-                        "sql": GRANT_OWNERSHIP_TEMPLATE.format(
-                            resource_type="schema",
-                            resource_name=SnowflakeConnector.snowflaky(db_schema),
-                            role_name=SnowflakeConnector.snowflaky_user_role(role),
-                        ),
-                    }
+                    SnowflakeCommand(
+                        GRANT_OWNERSHIP_TEMPLATE,
+                        already_granted=already_granted,
+                        resource_type="schema",
+                        resource_name=SnowflakeConnector.snowflaky(db_schema),
+                        role_name=SnowflakeConnector.snowflaky_user_role(role),
+                    )
                 )
         return sql_commands
 
     def _generate_ownership_grant_table(
-        self, conn: SnowflakeConnector, role, table_refs
-    ) -> List[Dict]:
+        self, role, table_refs
+    ) -> List[SnowflakeCommand]:
         sql_commands = []
 
         tables = []
+        table_matches = self.metadata.match_tables(
+            table
+            for table in table_refs
+            if table.split(".")[2] != "*" and is_pattern(table)
+        )
 
         for table in table_refs:
             name_parts = table.split(".")
@@ -1866,7 +1848,7 @@ class SnowflakeGrantsGenerator:
                 schemas = []
 
                 if name_parts[1] == "*":
-                    db_schemas = conn.show_schemas(name_parts[0])
+                    db_schemas = self.metadata.show_schemas(name_parts[0])
 
                     for schema in db_schemas:
                         if schema != info_schema:
@@ -1875,21 +1857,21 @@ class SnowflakeGrantsGenerator:
                     schemas = [f"{name_parts[0]}.{name_parts[1]}"]
 
                 for schema in schemas:
-                    tables.extend(conn.show_tables(schema=schema))
+                    tables.extend(self.metadata.show_tables(schema=schema))
+            elif is_pattern(table):
+                tables.extend(table_matches[table])
             else:
-                schemas = [f"{name_parts[0]}.{name_parts[1]}"]
                 tables.append(table)
 
-        existing_views = []
-        for schema in schemas:
-            existing_views = conn.show_views(schema=schema)
-
         # And then grant ownership to all tables
         for db_table in tables:
             # In case `db_table` does not exist, call it a table.
             # Regardless, the SQL will be validated later and alert it doesn't exist.
             resource_type = "table"
-            if SnowflakeConnector.snowflaky(db_table) in existing_views:
+            table_schema = db_table.rsplit(".", 1)[0]
+            if SnowflakeConnector.snowflaky(db_table) in self.metadata.show_views(
+                schema=table_schema
+            ):
                 resource_type = "view"
 
             already_granted = self.is_granted_privilege(
@@ -1897,20 +1879,19 @@ class SnowflakeGrantsGenerator:
             )
 
             sql_commands.append(
-                {
-                    "already_granted": already_granted,
-                    "sql": GRANT_OWNERSHIP_TEMPLATE.format(
-                        resource_type=resource_type,
-                        resource_name=SnowflakeConnector.snowflaky(db_table),
-                        role_name=SnowflakeConnector.snowflaky_user_role(role),
-                    ),
-                }
+                SnowflakeCommand(
+                    GRANT_OWNERSHIP_TEMPLATE,
+                    already_granted=already_granted,
+                    resource_type=resource_type,
+                    resource_name=SnowflakeConnector.snowflaky(db_table),
+                    role_name=SnowflakeConnector.snowflaky_user_role(role),
+                )
             )
         return sql_commands
 
     def generate_grant_ownership(  # noqa
         self, role: str, config: Dict[str, Any]
-    ) -> List[Dict]:
+    ) -> List[SnowflakeCommand]:
         """
         Generate the GRANT ownership statements for databases, schemas and tables.
 
@@ -1929,14 +1910,14 @@ class SnowflakeGrantsGenerator:
         schema_refs = config.get("owns", {}).get("schemas")
         if schema_refs:
             schema_ownership_grants = self._generate_ownership_grant_schema(
-                self.conn, role, schema_refs
+                role, schema_refs
             )
             sql_commands.extend(schema_ownership_grants)
 
         table_refs = config.get("owns", {}).get("tables")
         if table_refs:
             table_ownership_grants = self._generate_ownership_grant_table(
-                self.conn, role, table_refs
+                role, table_refs
             )
             sql_commands.extend(table_ownership_grants)
         return sql_commands
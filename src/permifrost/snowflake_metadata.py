@@ -0,0 +1,287 @@
+from typing import Callable, Dict, FrozenSet, Iterable, List, Optional
+
+from permifrost.glob_matcher import GlobMatcher, is_pattern
+from permifrost.logger import GLOBAL_LOGGER as logger
+from permifrost.snowflake_connector import SnowflakeConnector
+
+
+class MetadataNotLoadedError(RuntimeError):
+    """
+    Raised when a snapshot that is not connected to Snowflake, e.g. in a
+    worker process, is asked for metadata that it has not loaded.
+    """
+
+
+class SnowflakeMetadataSnapshot:
+    """
+    In memory snapshot of the schemas, tables and views in the databases used
+    during a run.
+
+    Every database is listed at most once per object type with
+    SHOW TERSE {SCHEMAS|TABLES|VIEWS} IN DATABASE and the results are indexed
+    by database and by schema, so that lookups for individual schemas are
+    answered from memory instead of issuing a new SHOW query each time.
+
+    Snapshots can be pickled, e.g. to be shared with worker processes. The
+    connector is not kept, so an unpickled snapshot only answers from the
+    metadata loaded before (see preload) and raises MetadataNotLoadedError
+    otherwise.
+    """
+
+    def __init__(self, conn: Optional[SnowflakeConnector]) -> None:
+        self.conn = conn
+        self._databases: Optional[List[str]] = None
+        self._roles: Optional[Dict[str, str]] = None
+        self._existing_roles: Dict[FrozenSet[str], List[str]] = {}
+        self._schemas_by_database: Dict[str, List[str]] = {}
+        self._tables_by_database: Dict[str, List[str]] = {}
+        self._tables_by_schema: Dict[str, Dict[str, List[str]]] = {}
+        self._views_by_database: Dict[str, List[str]] = {}
+        self._views_by_schema: Dict[str, Dict[str, List[str]]] = {}
+        self._schema_matches: Dict[str, List[str]] = {}
+
+    def __getstate__(self) -> Dict:
+        state = self.__dict__.copy()
+        state["conn"] = None
+        return state
+
+    def _connector(self) -> SnowflakeConnector:
+        if self.conn is None:
+            raise MetadataNotLoadedError(
+                "The metadata snapshot is not connected to Snowflake"
+            )
+        return self.conn
+
+    def preload(
+        self,
+        databases: Iterable[str],
+        table_databases: Optional[Iterable[str]] = None,
+    ) -> None:
+        """
+        List the roles and the schemas of <databases>, along with the tables
+        and views of <table_databases> (every one of <databases> by default),
+        so that they can be looked up without a connection.
+        """
+        databases = list(databases)
+        self.show_roles()
+        for database in databases:
+            self.show_schemas(database)
+        for database in databases if table_databases is None else table_databases:
+            self._load_tables(database)
+            self._load_views(database)
+
+    @staticmethod
+    def _database_key(database: str) -> str:
+        return SnowflakeConnector.snowflaky(database)
+
+    @staticmethod
+    def _index_by_schema(identifiers: List[str]) -> Dict[str, List[str]]:
+        """
+        Group fully qualified table/view identifiers by their schema identifier.
+        """
+        index: Dict[str, List[str]] = {}
+        for identifier in identifiers:
+            schema = identifier.rsplit(".", 1)[0]
+            index.setdefault(schema, []).append(identifier)
+        return index
+
+    @staticmethod
+    def _split_scope(database: Optional[str], schema: Optional[str]) -> str:
+        if schema:
+            return schema.split(".")[0]
+        if database:
+            return database
+        raise ValueError("A database or a schema is required to look up metadata")
+
+    def show_schemas(self, database: str) -> List[str]:
+        """
+        Return all the schemas in <database>, listing them on the first call.
+        """
+        key = self._database_key(database)
+        if key not in self._schemas_by_database:
+            logger.debug(f"Loading schemas for database {database}")
+            self._schemas_by_database[key] = self._connector().show_schemas(database)
+        return self._schemas_by_database[key]
+
+    def _load_tables(self, database: str) -> str:
+        key = self._database_key(database)
+        if key not in self._tables_by_database:
+            logger.debug(f"Loading tables for database {database}")
+            tables = self._connector().show_tables(database=database)
+            self._tables_by_database[key] = tables
+            self._tables_by_schema[key] = self._index_by_schema(tables)
+        return key
+
+    def _load_views(self, database: str) -> str:
+        key = self._database_key(database)
+        if key not in self._views_by_database:
+            logger.debug(f"Loading views for database {database}")
+            views = self._connector().show_views(database=database)
+            self._views_by_database[key] = views
+            self._views_by_schema[key] = self._index_by_schema(views)
+        return key
+
+    def show_tables(
+        self, database: Optional[str] = None, schema: Optional[str] = None
+    ) -> List[str]:
+        """
+        Return the tables in <schema> if given, otherwise all the tables in
+        <database>.
+        """
+        key = self._load_tables(self._split_scope(database, schema))
+        if schema:
+            return self._tables_by_schema[key].get(
+                SnowflakeConnector.snowflaky(schema), []
+            )
+        return self._tables_by_database[key]
+
+    def show_views(
+        self, database: Optional[str] = None, schema: Optional[str] = None
+    ) -> List[str]:
+        """
+        Return the views in <schema> if given, otherwise all the views in
+        <database>.
+        """
+        key = self._load_views(self._split_scope(database, schema))
+        if schema:
+            return self._views_by_schema[key].get(
+                SnowflakeConnector.snowflaky(schema), []
+            )
+        return self._views_by_database[key]
+
+    def show_databases(self) -> List[str]:
+        """
+        Return all the databases in the account, listing them on the first call.
+        """
+        if self._databases is None:
+            logger.debug("Loading databases")
+            self._databases = self._connector().show_databases()
+        return self._databases
+
+    def show_roles(self) -> Dict[str, str]:
+        """
+        Return all the roles in the account with their owner, listing them on
+        the first call.
+        """
+        if self._roles is None:
+            logger.debug("Loading roles")
+            self._roles = self._connector().show_roles()
+        return self._roles
+
+    def existing_roles(self, names: Iterable[str]) -> List[str]:
+        """
+        Return the roles of the account among <names>, in SHOW ROLES order.
+
+        The result is computed once per set of names, so that every
+        member_of "*" of a run is expanded from the same list. Passing the
+        same frozenset each time avoids rebuilding the key.
+        """
+        key = names if isinstance(names, frozenset) else frozenset(names)
+        existing = self._existing_roles.get(key)
+        if existing is None:
+            existing = [role for role in self.show_roles() if role in key]
+            self._existing_roles[key] = existing
+        return existing
+
+    def _pattern_databases(self, patterns: Iterable[str]) -> List[str]:
+        """
+        Return the databases that the given schema/table patterns can refer to.
+        """
+        databases: Dict[str, None] = {}
+        database_patterns = []
+        for pattern in patterns:
+            database = pattern.split(".", 1)[0]
+            if is_pattern(database):
+                database_patterns.append(database)
+            else:
+                databases[database] = None
+
+        if database_patterns:
+            for database in GlobMatcher(database_patterns).filter(
+                self.show_databases()
+            ):
+                databases[database] = None
+
+        return list(databases)
+
+    def match_schemas(self, patterns: Iterable[str]) -> Dict[str, List[str]]:
+        """
+        Resolve schema patterns (e.g. "raw.*", "raw.stg_*", "raw_??.public")
+        against the schemas of the databases they refer to, which are listed
+        at most once. Patterns without wildcards resolve to themselves and
+        wildcards never match information_schema.
+
+        Patterns that were not resolved before are matched together in a
+        single pass, and every resolved pattern is kept for later calls.
+        """
+        patterns = list(dict.fromkeys(patterns))
+        globs = [
+            pattern
+            for pattern in patterns
+            if is_pattern(pattern) and pattern not in self._schema_matches
+        ]
+
+        if globs:
+            schemas = [
+                schema
+                for database in self._pattern_databases(globs)
+                for schema in self.show_schemas(database)
+                if schema.split(".", 1)[-1] != "information_schema"
+            ]
+            self._schema_matches.update(GlobMatcher(globs).match_all(schemas))
+
+        return {
+            pattern: self._schema_matches.get(pattern, [pattern])
+            for pattern in patterns
+        }
+
+    def match_tables(self, patterns: Iterable[str]) -> Dict[str, List[str]]:
+        """
+        Resolve table patterns (e.g. "raw.public.stg_*") against the tables of
+        the databases they refer to.
+        """
+        return self._match_objects(patterns, self.show_tables)
+
+    def match_views(self, patterns: Iterable[str]) -> Dict[str, List[str]]:
+        """
+        Resolve view patterns (e.g. "raw.public.stg_*") against the views of
+        the databases they refer to.
+        """
+        return self._match_objects(patterns, self.show_views)
+
+    def _match_objects(
+        self, patterns: Iterable[str], show_objects: Callable[..., List[str]]
+    ) -> Dict[str, List[str]]:
+        patterns = list(dict.fromkeys(patterns))
+        objects = [
+            identifier
+            for database in self._pattern_databases(patterns)
+            for identifier in show_objects(database=database)
+        ]
+        matched = GlobMatcher(patterns).match_all(objects)
+
+        # As with schemas, wildcards never match information_schema
+        for pattern in patterns:
+            name_parts = pattern.split(".")
+            if len(name_parts) > 1 and is_pattern(name_parts[1]):
+                matched[pattern] = [
+                    identifier
+                    for identifier in matched[pattern]
+                    if identifier.split(".")[1] != "information_schema"
+                ]
+        return matched
+
+    def full_schema_list(self, schema: str) -> List[str]:
+        """
+        For a given schema name, get all schemas it may be referencing.
+
+        For example, if <db>.* is given then all schemas in the database
+        will be returned. If <db>.<schema_partial>_* is given, then all
+        schemas that match the schema partial pattern will be returned.
+        Wildcards (* and ?) can be used anywhere in the database and schema
+        names. If a full schema name is given, it will return that single
+        schema as a list.
+
+        Returns a list of schema names.
+        """
+        return self.match_schemas([schema])[schema]
@@ -1,8 +1,8 @@
-from dataclasses import dataclass, replace
-from typing import List
+from dataclasses import dataclass, field, replace
+from typing import List, Tuple
 
 
-@dataclass
+@dataclass(frozen=True)
 class SnowflakePermission:
     """
     A data class that represents a snowflake permission. A permission is a set of
@@ -10,30 +10,29 @@ class SnowflakePermission:
     We represent an entity by its name and type.
 
     In the snowflake permission model, permissions can be granted to `users` and `roles`.
+
+    Permissions are immutable and hashable. The grant_option is left out of
+    both equality and the hash.
     """
 
     entity_name: str
     entity_type: str
-    privileges: List[str]
-    grant_option: bool
-
-    def __eq__(self, obj):
-        return (
-            isinstance(obj, SnowflakePermission)
-            and obj.entity_name == self.entity_name
-            and obj.entity_type == self.entity_type
-            and obj.privileges == self.privileges
-        )
-
-    def with_entity_name(self, entity_name: str):
+    privileges: Tuple[str, ...]
+    grant_option: bool = field(compare=False)
+
+    def __post_init__(self) -> None:
+        # Privileges are commonly given as a list
+        object.__setattr__(self, "privileges", tuple(self.privileges))
+
+    def with_entity_name(self, entity_name: str) -> "SnowflakePermission":
         """
-        Convenience function to easily change the name of the entity name.
+        Convenience function returning a copy of the permission for another
+        entity name.
         """
-        self.entity_name = entity_name
-        return self
+        return replace(self, entity_name=entity_name)
 
-    def as_owner(self):
-        return replace(self, privileges=["ownership"])
+    def as_owner(self) -> "SnowflakePermission":
+        return replace(self, privileges=("ownership",))
 
     def contains_any(self, privileges: List[str]):
         """
@@ -0,0 +1,87 @@
+import hashlib
+import json
+from dataclasses import dataclass, field, fields
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from permifrost.error import PlanLoadingError
+from permifrost.snowflake_command import SnowflakeCommand
+
+PLAN_VERSION = 1
+
+
+def hash_spec(spec_path: str) -> str:
+    """
+    Return the SHA-256 hash of the content of a spec file.
+    """
+    with open(spec_path, "rb") as spec_file:
+        return hashlib.sha256(spec_file.read()).hexdigest()
+
+
+@dataclass
+class SnowflakePlan:
+    """
+    The statements generated for a spec, saved so that they can be reviewed
+    and executed later without fetching the account metadata again.
+
+    snapshot_timestamp is the UTC time at which the metadata of the account
+    started being fetched; the already_granted flags of the statements reflect
+    the account at that time.
+    """
+
+    spec_path: str
+    spec_hash: str
+    snapshot_timestamp: str
+    queries: List[Dict] = field(default_factory=list)
+    roles: List[str] = field(default_factory=list)
+    users: List[str] = field(default_factory=list)
+    run_list: List[str] = field(default_factory=list)
+    ignore_memberships: bool = False
+    version: int = PLAN_VERSION
+
+    @staticmethod
+    def now() -> str:
+        return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+    @property
+    def snapshot_age(self):
+        return datetime.now(timezone.utc) - datetime.fromisoformat(
+            self.snapshot_timestamp
+        )
+
+    def save(self, path: str) -> None:
+        # Built by hand, as asdict would deep copy every query first
+        content: Dict[str, Any] = {
+            plan_field.name: getattr(self, plan_field.name)
+            for plan_field in fields(self)
+        }
+        content["queries"] = [
+            query.to_dict() if isinstance(query, SnowflakeCommand) else dict(query)
+            for query in self.queries
+        ]
+        with open(path, "w") as plan_file:
+            json.dump(content, plan_file, indent=2)
+
+    @classmethod
+    def load(cls, path: str) -> "SnowflakePlan":
+        try:
+            with open(path, "r") as plan_file:
+                content = json.load(plan_file)
+        except (OSError, ValueError) as exc:
+            raise PlanLoadingError(f"Plan error: unable to read {path}: {exc}")
+
+        if content.get("version") != PLAN_VERSION:
+            raise PlanLoadingError(
+                f"Plan error: unsupported plan version {content.get('version')}"
+            )
+
+        try:
+            return cls(**content)
+        except TypeError as exc:
+            raise PlanLoadingError(f"Plan error: invalid plan {path}: {exc}")
+
+    def matches_spec(self, spec_path: Optional[str] = None) -> bool:
+        """
+        Check that the spec file has not changed since the plan was generated.
+        """
+        return hash_spec(spec_path or self.spec_path) == self.spec_hash
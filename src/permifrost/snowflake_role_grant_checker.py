@@ -1,37 +1,97 @@
-from typing import Any, Dict, List, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
 
+from permifrost.logger import GLOBAL_LOGGER as logger
+from permifrost.role_permission_cache import DEFAULT_MAX_ROLES, RolePermissionCache
 from permifrost.snowflake_connector import SnowflakeConnector
 from permifrost.snowflake_permission import SnowflakePermission
 
+# (entity_type, entity_name, privilege)
+PermissionKey = Tuple[str, str, str]
+
+
+DEFAULT_PREFETCH_WORKERS = 8
+
+# The grants of a role, as returned by show_grants_to_role_with_grant_option,
+# and their index by permission key
+CachedGrants = Tuple[Dict, Dict[PermissionKey, SnowflakePermission]]
+
 
 class SnowflakeRoleGrantChecker:
     """
     Holds permissions for roles and allows you to check if a role has a permission and also if it is able to grant a permission.
+
+    The grants of at most <cache_size> roles are kept in memory, the least
+    recently used role being evicted first, for up to <cache_ttl> seconds.
+    Either limit can be disabled with None.
     """
 
-    def __init__(self, conn: Optional[SnowflakeConnector] = None):
+    def __init__(
+        self,
+        conn: Optional[SnowflakeConnector] = None,
+        cache_size: Optional[int] = DEFAULT_MAX_ROLES,
+        cache_ttl: Optional[float] = None,
+    ):
         self.conn = conn if conn is not None else SnowflakeConnector()
-        # A simple in memory map to store lookups against the database.
-        # In the future we can use something like https://pypi.org/project/cachetools/
-        # to annotate the methods we want to cache calls to.
-        self.role_permission_cache: Dict[str, Any] = {}
+        self.role_permission_cache: RolePermissionCache[
+            str, CachedGrants
+        ] = RolePermissionCache(maxsize=cache_size, ttl=cache_ttl)
+
+    def _load_grants(self, role: str) -> CachedGrants:
+        cached = self.role_permission_cache.get(role)
+        if cached is None:
+            grants = self.conn.show_grants_to_role_with_grant_option(role)
+            index: Dict[PermissionKey, SnowflakePermission] = {}
+            for permission in self._to_permissions(grants):
+                key = self.permission_key(permission)
+                if key is not None:
+                    index.setdefault(key, permission)
+            cached = (grants, index)
+            self.role_permission_cache.set(role, cached)
+        return cached
 
     def _get_permissions(self, role: str) -> Dict:
-        if role not in self.role_permission_cache:
-            self.role_permission_cache[
-                role
-            ] = self.conn.show_grants_to_role_with_grant_option(role)
+        return self._load_grants(role)[0]
 
-        return self.role_permission_cache[role]
-
-    def get_permissions(self, role: str) -> List[SnowflakePermission]:
+    def prefetch(
+        self, roles: Iterable[str], max_workers: int = DEFAULT_PREFETCH_WORKERS
+    ) -> None:
         """
-        Get a list of permissions that are granted to the given `role`.
+        Load the grants of the <roles> that are not cached yet, fetching up to
+        <max_workers> roles from Snowflake at the same time, so that the
+        checks that follow are answered from the cache.
+        """
+        missing = [
+            role
+            for role in dict.fromkeys(roles)
+            if role and role not in self.role_permission_cache
+        ]
+        maxsize = self.role_permission_cache.maxsize
+        if maxsize is not None and len(missing) > maxsize:
+            logger.warning(
+                f"Prefetching {len(missing)} roles into a cache of {maxsize} roles, "
+                "the first ones will be evicted"
+            )
 
-        This function mainly maps the output of the SnowflakeConnector.show_grants_to_role function
-        to the SnowflakePermission objects.
+        if max_workers <= 1 or len(missing) <= 1:
+            for role in missing:
+                self._load_grants(role)
+            return
+
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(missing))) as executor:
+            # Consume the results so that the first error, if any, is raised
+            for _ in executor.map(self._load_grants, missing):
+                pass
+
+    def invalidate(self, role: Optional[str] = None) -> None:
+        """
+        Forget the cached grants of <role>, or of every role if not given, so
+        that they are fetched from Snowflake again on the next check.
         """
-        role_permission_dict = self._get_permissions(role)
+        self.role_permission_cache.invalidate(role)
+
+    @staticmethod
+    def _to_permissions(role_permission_dict: Dict) -> List[SnowflakePermission]:
         role_permissions = []
         for privilege, entity_types in role_permission_dict.items():
             for entity_type, entity_names in entity_types.items():
@@ -39,11 +99,43 @@ class SnowflakeRoleGrantChecker:
                     name = entity_name if entity_type != "account" else "*"
                     role_permissions.append(
                         SnowflakePermission(
-                            name, entity_type, [privilege], options["grant_option"]
+                            name, entity_type, (privilege,), options["grant_option"]
                         )
                     )
         return role_permissions
 
+    def get_permissions(self, role: str) -> List[SnowflakePermission]:
+        """
+        Get a list of permissions that are granted to the given `role`.
+
+        This function mainly maps the output of the SnowflakeConnector.show_grants_to_role function
+        to the SnowflakePermission objects.
+        """
+        return self._to_permissions(self._get_permissions(role))
+
+    @staticmethod
+    def permission_key(permission: SnowflakePermission) -> Optional[PermissionKey]:
+        """
+        Return the key of a permission in the index of a role, or None if it
+        does not hold a single privilege, as granted permissions always do.
+        """
+        if len(permission.privileges) != 1:
+            return None
+        return (
+            permission.entity_type,
+            permission.entity_name,
+            permission.privileges[0],
+        )
+
+    def get_permission_index(
+        self, role: str
+    ) -> Dict[PermissionKey, SnowflakePermission]:
+        """
+        Get the permissions granted to the given `role` keyed by
+        (entity_type, entity_name, privilege), built once per cached role.
+        """
+        return self._load_grants(role)[1]
+
     def _has_permission(
         self, role: Optional[str], permission: SnowflakePermission
     ) -> Optional[SnowflakePermission]:
@@ -55,16 +147,29 @@ class SnowflakeRoleGrantChecker:
         if not role:
             return permission
 
-        role_permissions = self.get_permissions(role)
+        index = self.get_permission_index(role)
 
-        # Always check for ownership first because it gives the most permissions
-        if permission.as_owner() in role_permissions:
-            # Since we don't check the grant_option of a permission when checking equality, we want to make sure
-            # to return the actual permission value that was stored in the database to be most correct.
-            return role_permissions[role_permissions.index(permission.as_owner())]
-        if permission in role_permissions:
-            return role_permissions[role_permissions.index(permission)]
-        return None
+        # Always check for ownership first because it gives the most permissions.
+        # Since we don't check the grant_option of a permission when checking equality, we want to make sure
+        # to return the actual permission value that was stored in the database to be most correct.
+        owner = index.get((permission.entity_type, permission.entity_name, "ownership"))
+        if owner is not None:
+            return owner
+
+        key = self.permission_key(permission)
+        return index.get(key) if key is not None else None
+
+    def _entity_names(
+        self, permission: SnowflakePermission
+    ) -> List[SnowflakePermission]:
+        """
+        Return the permission for its entity name and, if different, for the
+        "snowflaky" version of the name.
+        """
+        snowflaky_name = SnowflakeConnector.snowflaky(permission.entity_name)
+        if snowflaky_name == permission.entity_name:
+            return [permission]
+        return [permission, permission.with_entity_name(snowflaky_name)]
 
     def has_permission(
         self, role: Optional[str], permission: SnowflakePermission
@@ -75,15 +180,9 @@ class SnowflakeRoleGrantChecker:
         If the role has ownership of the entity in question, then this function should always return true.
         Will always return true if <role> is none.
         """
-        return (
-            self._has_permission(role, permission) is not None
-            or self._has_permission(
-                role,
-                permission.with_entity_name(
-                    SnowflakeConnector.snowflaky(permission.entity_name)
-                ),
-            )
-            is not None
+        return any(
+            self._has_permission(role, candidate) is not None
+            for candidate in self._entity_names(permission)
         )
 
     def _can_grant_permission(
@@ -111,11 +210,7 @@ class SnowflakeRoleGrantChecker:
         Where the <entity_name> is the name given in the permission object, or the "snowflaky" version. Both are checked.
         Will always return true if no <role> was given.
         """
-        return self._can_grant_permission(
-            role, permission
-        ) or self._can_grant_permission(
-            role,
-            permission.with_entity_name(
-                SnowflakeConnector.snowflaky(permission.entity_name)
-            ),
+        return any(
+            self._can_grant_permission(role, candidate)
+            for candidate in self._entity_names(permission)
         )
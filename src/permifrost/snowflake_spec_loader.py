@@ -1,16 +1,49 @@
-from typing import Any, Dict, List, Optional, cast
+import copy
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    FrozenSet,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    TypeVar,
+    cast,
+)
 
 import click
 
 from permifrost.entities import EntityGenerator
 from permifrost.error import SpecLoadingError
+from permifrost.glob_matcher import is_pattern
+from permifrost.grant_index import GrantIndex
 from permifrost.logger import GLOBAL_LOGGER as logger
+from permifrost.query_pipeline import (
+    QueryPipeline,
+    duplicate_key,
+    remove_duplicate_queries,
+)
+from permifrost.snowflake_apply import statement_object
+from permifrost.snowflake_async_connector import AsyncSnowflakeConnector
+from permifrost.snowflake_command import SnowflakeCommand
 from permifrost.snowflake_connector import SnowflakeConnector
 from permifrost.snowflake_grants import SnowflakeGrantsGenerator
+from permifrost.snowflake_metadata import (
+    MetadataNotLoadedError,
+    SnowflakeMetadataSnapshot,
+)
 from permifrost.spec_file_loader import load_spec
 
 VALIDATION_ERR_MSG = 'Spec error: {} "{}", field "{}": {}'
 
+T = TypeVar("T")
+R = TypeVar("R")
+
 
 class SnowflakeSpecLoader:
     def __init__(
@@ -21,8 +54,17 @@ class SnowflakeSpecLoader:
         users: Optional[List[str]] = None,
         run_list: Optional[List[str]] = None,
         ignore_memberships: Optional[bool] = False,
+        jobs: int = 1,
+        use_account_usage: bool = False,
     ) -> None:
         run_list = run_list or ["users", "roles"]
+        # Number of metadata queries that can be sent to Snowflake concurrently
+        self.jobs = max(jobs, 1)
+        # Read the existing grants in bulk from the ACCOUNT_USAGE views instead
+        # of issuing one SHOW GRANTS query per role and per user
+        self.use_account_usage = use_account_usage
+        # Post-processing applied to the generated queries
+        self.query_pipeline = QueryPipeline()
         # Load the specification file and check for (syntactical) errors
         click.secho("Loading spec file", fg="green")
         self.spec = load_spec(spec_path)
@@ -34,10 +76,17 @@ class SnowflakeSpecLoader:
         entity_generator = EntityGenerator(spec=self.spec)
         self.entities = entity_generator.inspect_entities()
 
+        # A single connector is shared by every step of the run (entity checks,
+        # privilege fetching and query generation)
+        self.conn = conn if conn is not None else SnowflakeConnector()
+        # Schemas, tables and views are listed once per database and shared
+        # by the entity checks and the grants generator
+        self.metadata = SnowflakeMetadataSnapshot(self.conn)
+
         # Connect to Snowflake to make sure that the current user has correct
         # permissions
         click.secho("Checking permissions on current snowflake connection", fg="green")
-        self.check_permissions_on_snowflake_server(conn)
+        self.check_permissions_on_snowflake_server(self.conn)
 
         # Connect to Snowflake to make sure that all entities defined in the
         # spec file are also defined in Snowflake (no missing databases, etc)
@@ -45,7 +94,7 @@ class SnowflakeSpecLoader:
             "Checking that all entities in the spec file are defined in Snowflake",
             fg="green",
         )
-        self.check_entities_on_snowflake_server(conn)
+        self.check_entities_on_snowflake_server(self.conn)
 
         # Get the privileges granted to users and roles in the Snowflake account
         # Used in order to figure out which permissions in the spec file are
@@ -54,18 +103,53 @@ class SnowflakeSpecLoader:
         self.grants_to_role: Dict[str, Any] = {}
         self.roles_granted_to_user: Dict[str, Any] = {}
         self.get_privileges_from_snowflake_server(
-            conn,
+            self.conn,
             roles=roles,
             users=users,
             run_list=run_list,
             ignore_memberships=ignore_memberships,
         )
 
+    @classmethod
+    async def load_async(
+        cls, spec_path: str, conn: AsyncSnowflakeConnector, **kwargs
+    ) -> "SnowflakeSpecLoader":
+        """
+        Create a spec loader from an event loop without blocking it.
+
+        Loading and checking the spec and fetching the privileges granted in
+        Snowflake run in a worker thread of <conn>, with up to
+        conn.max_workers metadata queries at a time unless jobs is given.
+        The other arguments are the ones of SnowflakeSpecLoader.
+        """
+        kwargs.setdefault("jobs", conn.max_workers)
+        return await conn.run_in_thread(cls, spec_path, conn=conn.conn, **kwargs)
+
+    async def get_privileges_from_snowflake_server_async(
+        self, conn: AsyncSnowflakeConnector, **kwargs
+    ) -> None:
+        """
+        Awaitable get_privileges_from_snowflake_server, e.g. to refresh the
+        grants known to a long lived spec loader.
+        """
+        await conn.run_in_thread(
+            self.get_privileges_from_snowflake_server, conn.conn, **kwargs
+        )
+
+    async def generate_permission_queries_async(
+        self, conn: AsyncSnowflakeConnector, **kwargs
+    ) -> List[SnowflakeCommand]:
+        """
+        Awaitable generate_permission_queries, which can list the tables and
+        views of the databases referenced by the spec.
+        """
+        return await conn.run_in_thread(self.generate_permission_queries, **kwargs)
+
     def check_permissions_on_snowflake_server(
         self, conn: SnowflakeConnector = None
     ) -> None:
         if conn is None:
-            conn = SnowflakeConnector()
+            conn = self.conn
         error_messages = []
 
         click.secho(f"  Current user is: {conn.get_current_user()}.", fg="green")
@@ -132,7 +216,7 @@ class SnowflakeSpecLoader:
         if len(self.entities["schema_refs"]) > 0:
             schemas = conn.show_schemas()
             for schema in self.entities["schema_refs"]:
-                if "*" not in schema and schema not in schemas:
+                if not is_pattern(schema) and schema not in schemas:
                     error_messages.append(
                         f"Missing Entity Error: Schema {schema} was not found on"
                         " Snowflake Server. Please create it before continuing."
@@ -145,12 +229,14 @@ class SnowflakeSpecLoader:
     def check_table_ref_entities(self, conn):
         error_messages = []
         if len(self.entities["table_refs"]) > 0:
-            views = conn.show_views()
+            # Tables and views are listed through the metadata snapshot so
+            # that the grants generator can reuse them later on
             for db, tables in self.entities["tables_by_database"].items():
-                existing_tables = conn.show_tables(database=db)
+                existing_tables = self.metadata.show_tables(database=db)
+                views = self.metadata.show_views(database=db)
                 for table in tables:
                     if (
-                        "*" not in table
+                        not is_pattern(table)
                         and table not in existing_tables
                         and table not in views
                     ):
@@ -165,7 +251,8 @@ class SnowflakeSpecLoader:
     def check_role_entities(self, conn):
         error_messages = []
         if len(self.entities["roles"]) > 0:
-            roles = conn.show_roles()
+            # Listed once per run and reused to expand member_of "*"
+            roles = self.metadata.show_roles()
             for role in self.spec["roles"]:
                 for role_name, config in role.items():
                     if role_name not in roles:
@@ -212,7 +299,7 @@ class SnowflakeSpecLoader:
         error_messages = []
 
         if conn is None:
-            conn = SnowflakeConnector()
+            conn = self.conn
 
         error_messages.extend(self.check_warehouse_entities(conn))
         error_messages.extend(self.check_integration_entities(conn))
@@ -225,6 +312,43 @@ class SnowflakeSpecLoader:
         if error_messages:
             raise SpecLoadingError("\n".join(error_messages))
 
+    def _map_concurrently(
+        self, func: Callable[[T], R], items: Iterable[T]
+    ) -> Iterator[R]:
+        """
+        Apply <func> to every item, running up to self.jobs calls at the same
+        time. Results are yielded in the same order as <items> so that they
+        can be merged deterministically.
+        """
+        items = list(items)
+        if self.jobs <= 1 or len(items) <= 1:
+            yield from map(func, items)
+            return
+
+        with ThreadPoolExecutor(max_workers=self.jobs) as executor:
+            yield from executor.map(func, items)
+
+    def _merge_role_grants(
+        self, grants_to_role: Dict[str, Any], role: str, role_grants: Dict[str, Any]
+    ) -> None:
+        """
+        Merge the privileges granted to <role> into <grants_to_role>, keeping
+        only the entities that are tracked by the spec.
+        """
+        for privilege in role_grants:
+            for grant_on in role_grants[privilege]:
+                (
+                    grants_to_role.setdefault(role, {})
+                    .setdefault(privilege, {})
+                    .setdefault(grant_on, [])
+                    .extend(
+                        self.filter_to_database_refs(
+                            grant_on=grant_on,
+                            filter_set=role_grants[privilege][grant_on],
+                        )
+                    )
+                )
+
     def get_role_privileges_from_snowflake_server(
         self,
         conn: SnowflakeConnector,
@@ -232,99 +356,89 @@ class SnowflakeSpecLoader:
         ignore_memberships: Optional[bool] = False,
     ) -> None:
         future_grants: Dict[str, Any] = {}
+        databases = sorted(self.entities["database_refs"])
 
-        for database in self.entities["database_refs"]:
-            logger.info(f"Fetching future grants for database: {database}")
-            grant_results = conn.show_future_grants(database=database)
-            grant_results = (
-                {
-                    role: role_grants
-                    for role, role_grants in grant_results.items()
-                    if role in roles
-                }
-                if roles
-                else grant_results
-            )
-
+        # Get all schemas in all ref'd databases. Not all schemas will be
+        # ref'd in the spec.
+        def fetch_schemas(database: str) -> List[str]:
+            logger.info(f"Fetching all schemas for database {database}")
+            return self.metadata.show_schemas(database)
+
+        # Future grants are fetched for every database, followed by all of
+        # the schemas in that database
+        future_grant_scopes: List[Dict[str, str]] = []
+        for database, schemas in zip(
+            databases, self._map_concurrently(fetch_schemas, databases)
+        ):
+            future_grant_scopes.append({"database": database})
+            future_grant_scopes.extend({"schema": schema} for schema in schemas)
+
+        # Only the future grants to the roles of the spec are fetched
+        future_grant_roles = sorted(roles or self.entities["roles"])
+
+        def fetch_future_grants(scope: Dict[str, str]) -> Dict[str, Any]:
+            if "schema" in scope:
+                logger.info(f"Fetching all future grants for schema {scope['schema']}")
+            else:
+                logger.info(f"Fetching future grants for database: {scope['database']}")
+            return conn.show_future_grants(**scope, roles=future_grant_roles)
+
+        for grant_results in self._map_concurrently(
+            fetch_future_grants, future_grant_scopes
+        ):
             for role in grant_results:
-                for privilege in grant_results[role]:
-                    for grant_on in grant_results[role][privilege]:
-                        (
-                            future_grants.setdefault(role, {})
-                            .setdefault(privilege, {})
-                            .setdefault(grant_on, [])
-                            .extend(
-                                self.filter_to_database_refs(
-                                    grant_on=grant_on,
-                                    filter_set=grant_results[role][privilege][grant_on],
-                                )
-                            )
-                        )
+                if roles and role not in roles:
+                    continue
+                self._merge_role_grants(future_grants, role, grant_results[role])
+
+        role_list = [
+            role
+            for role in sorted(self.entities["roles"])
+            if not ((roles and role not in roles) or ignore_memberships)
+        ]
+
+        role_grants_list: Iterable[Dict[str, Any]]
+        if self.use_account_usage:
+            logger.info("Fetching all role grants from ACCOUNT_USAGE")
+            account_grants = conn.show_grants_to_roles() if role_list else {}
+            role_grants_list = [account_grants.get(role, {}) for role in role_list]
+        else:
 
-            # Get all schemas in all ref'd databases. Not all schemas will be
-            # ref'd in the spec.
-            logger.info(f"Fetching all schemas for database {database}")
-            for schema in conn.show_schemas(database=database):
-                logger.info(f"Fetching all future grants for schema {schema}")
-                grant_results = conn.show_future_grants(schema=schema)
-                grant_results = (
-                    {
-                        role: role_grants
-                        for role, role_grants in grant_results.items()
-                        if role in roles
-                    }
-                    if roles
-                    else grant_results
-                )
+            def fetch_role_grants(role: str) -> Dict[str, Any]:
+                logger.info(f"Fetching all grants for role {role}")
+                return conn.show_grants_to_role(role)
 
-                for role in grant_results:
-                    for privilege in grant_results[role]:
-                        for grant_on in grant_results[role][privilege]:
-                            (
-                                future_grants.setdefault(role, {})
-                                .setdefault(privilege, {})
-                                .setdefault(grant_on, [])
-                                .extend(
-                                    self.filter_to_database_refs(
-                                        grant_on=grant_on,
-                                        filter_set=grant_results[role][privilege][
-                                            grant_on
-                                        ],
-                                    )
-                                )
-                            )
+            role_grants_list = self._map_concurrently(fetch_role_grants, role_list)
 
-        for role in self.entities["roles"]:
-            if (roles and role not in roles) or ignore_memberships:
-                continue
-            logger.info(f"Fetching all grants for role {role}")
-            role_grants = conn.show_grants_to_role(role)
-            for privilege in role_grants:
-                for grant_on in role_grants[privilege]:
-                    (
-                        future_grants.setdefault(role, {})
-                        .setdefault(privilege, {})
-                        .setdefault(grant_on, [])
-                        .extend(
-                            self.filter_to_database_refs(
-                                grant_on=grant_on,
-                                filter_set=role_grants[privilege][grant_on],
-                            )
-                        )
-                    )
+        for role, role_grants in zip(role_list, role_grants_list):
+            self._merge_role_grants(future_grants, role, role_grants)
 
         self.grants_to_role = future_grants
 
     def get_user_privileges_from_snowflake_server(
         self, conn: SnowflakeConnector, users: Optional[List[str]] = None
     ) -> None:
-        user_entities = self.entities["users"]
-        with click.progressbar(user_entities) as users_bar:
-            for user in users_bar:
-                if users and user not in users:
-                    continue
-                logger.info(f"Fetching user privileges for user: {user}")
-                self.roles_granted_to_user[user] = conn.show_roles_granted_to_user(user)
+        user_list = [
+            user for user in self.entities["users"] if not users or user in users
+        ]
+
+        if self.use_account_usage:
+            logger.info("Fetching all user privileges from ACCOUNT_USAGE")
+            account_roles = conn.show_roles_granted_to_users() if user_list else {}
+            for user in user_list:
+                self.roles_granted_to_user[user] = account_roles.get(user, [])
+            return
+
+        def fetch_user_roles(user: str) -> List[str]:
+            logger.info(f"Fetching user privileges for user: {user}")
+            return conn.show_roles_granted_to_user(user)
+
+        with click.progressbar(
+            zip(user_list, self._map_concurrently(fetch_user_roles, user_list)),
+            length=len(user_list),
+        ) as users_bar:
+            for user, user_roles in users_bar:
+                self.roles_granted_to_user[user] = user_roles
 
     def get_privileges_from_snowflake_server(
         self,
@@ -341,7 +455,7 @@ class SnowflakeSpecLoader:
         """
         run_list = run_list or ["users", "roles"]
         if conn is None:
-            conn = SnowflakeConnector()
+            conn = self.conn
 
         if "users" in run_list and not ignore_memberships:
             logger.info("Fetching user privileges from Snowflake")
@@ -399,29 +513,177 @@ class SnowflakeSpecLoader:
         users: Optional[List[str]] = None,
         run_list: Optional[List[str]] = None,
         ignore_memberships: Optional[bool] = False,
-    ) -> List[Dict]:
+        processes: int = 1,
+    ) -> List[SnowflakeCommand]:
         """
         Starting point to generate all the permission queries.
 
         For each entity type (e.g. user or role) that is affected by the spec,
         the proper sql permission queries are generated.
 
+        The commands are passed through self.query_pipeline, which removes
+        duplicate queries by default. With more than one process, the
+        commands of the roles are generated in parallel worker processes.
+
         Returns all the SQL commands as a list.
         """
-        run_list = run_list or ["users", "roles"]
-        sql_commands: List[Dict] = []
+        sql_commands: List[SnowflakeCommand] = []
+        for entity_commands in self.generate_entity_queries(
+            roles, users, run_list, ignore_memberships, processes
+        ):
+            sql_commands.extend(entity_commands)
 
-        generator = SnowflakeGrantsGenerator(
-            self.grants_to_role,
+        return self.query_pipeline(sql_commands)
+
+    def iter_permission_queries(
+        self,
+        roles: Optional[List[str]] = None,
+        users: Optional[List[str]] = None,
+        run_list: Optional[List[str]] = None,
+        ignore_memberships: Optional[bool] = False,
+        processes: int = 1,
+    ) -> Iterator[List[SnowflakeCommand]]:
+        """
+        Streaming version of generate_permission_queries, yielding the SQL
+        commands of each role and user as soon as they are generated so that
+        they can be run while the next ones are being generated.
+
+        Duplicates are removed as by remove_duplicate_queries: as the last
+        GRANT OWNERSHIP on an object wins, the ownership grants of every role
+        are generated first to find the last one on each object, and only that
+        one is yielded. It is yielded where it was generated, or earlier,
+        right before the first command acting upon its object, so that
+        ownership is always transferred before grants on the object are made.
+        Identical REVOKE ALL commands are yielded every time they are
+        generated, which leaves the account as running only the last one.
+
+        Other processors of self.query_pipeline need every command at once and
+        are not applied.
+        """
+        generator = self._grants_generator(ignore_memberships)
+        entities, _ = self._selected_entities(roles, users, run_list)
+
+        # Number of ownership grants on each object left to be generated
+        ownership_counts: Dict[str, int] = {}
+        # Last ownership grant on each object, by statement_object
+        last_ownership: Dict[str, SnowflakeCommand] = {}
+        for entity_type, entity_name, config in entities:
+            if entity_type != "roles":
+                continue
+            for command in generator.generate_grant_ownership(entity_name, config):
+                ownership_key = cast(str, duplicate_key(command))
+                ownership_counts[ownership_key] = (
+                    ownership_counts.get(ownership_key, 0) + 1
+                )
+                last_ownership[statement_object(command["sql"])] = command
+
+        sent: Set[str] = set()
+        for entity_commands in self.generate_entity_queries(
+            roles, users, run_list, ignore_memberships, processes
+        ):
+            batch = []
+            for command in entity_commands:
+                key = duplicate_key(command)
+                if key is not None and command["sql"].startswith("GRANT OWNERSHIP ON"):
+                    ownership_counts[key] = ownership_counts.get(key, 1) - 1
+                    if ownership_counts[key] > 0 or key in sent:
+                        # Superseded by a later grant, or already yielded
+                        continue
+                    sent.add(key)
+                    batch.append(command)
+                    continue
+
+                owner_grant = last_ownership.get(statement_object(command["sql"]))
+                if owner_grant is not None:
+                    owner_key = cast(str, duplicate_key(owner_grant))
+                    if owner_key not in sent:
+                        sent.add(owner_key)
+                        batch.append(owner_grant)
+                batch.append(command)
+            if batch:
+                yield batch
+
+    def generate_entity_queries(
+        self,
+        roles: Optional[List[str]] = None,
+        users: Optional[List[str]] = None,
+        run_list: Optional[List[str]] = None,
+        ignore_memberships: Optional[bool] = False,
+        processes: int = 1,
+    ) -> Iterator[List[SnowflakeCommand]]:
+        """
+        Yield the SQL commands generated for each role and user of the spec,
+        in spec order, before duplicates are removed.
+
+        With more than one process, the commands of the roles are generated
+        in a pool of <processes> worker processes sharing a snapshot of the
+        metadata and granted privileges, and merged back in spec order.
+        """
+        generator = self._grants_generator(ignore_memberships)
+
+        click.secho("Generating permission Queries:", fg="green")
+
+        entities, all_roles = self._selected_entities(roles, users, run_list)
+
+        role_configs = [
+            (entity_name, config)
+            for entity_type, entity_name, config in entities
+            if entity_type == "roles"
+        ]
+
+        if processes > 1 and len(role_configs) > 1:
+            role_results = self._generate_roles_in_processes(
+                generator, role_configs, all_roles, processes
+            )
+        else:
+            role_results = iter([None] * len(role_configs))
+
+        for entity_type, entity_name, config in entities:
+            if entity_type == "users":
+                yield list(
+                    self.process_users(generator, entity_type, entity_name, config)
+                )
+                continue
+
+            role_commands = next(role_results)
+            if role_commands is None:
+                # Generated in this process when not done by a worker
+                role_commands = list(
+                    self.process_roles(
+                        generator, entity_type, entity_name, config, all_roles
+                    )
+                )
+            else:
+                click.secho(f"     Processing role {entity_name}", fg="green")
+            yield role_commands
+
+    def _grants_generator(
+        self, ignore_memberships: Optional[bool] = False
+    ) -> SnowflakeGrantsGenerator:
+        return SnowflakeGrantsGenerator(
+            GrantIndex(self.grants_to_role),
             self.roles_granted_to_user,
             ignore_memberships=ignore_memberships,
+            conn=self.conn,
+            metadata=self.metadata,
         )
 
-        click.secho("Generating permission Queries:", fg="green")
+    def _selected_entities(
+        self,
+        roles: Optional[List[str]] = None,
+        users: Optional[List[str]] = None,
+        run_list: Optional[List[str]] = None,
+    ) -> Tuple[List[Tuple[str, str, Dict]], FrozenSet[str]]:
+        """
+        Return the type, name and config of the roles and users of the spec
+        to generate commands for, in spec order, and the names of all roles.
+        """
+        run_list = run_list or ["users", "roles"]
 
         # For each permission in the spec, check if we have to generate an
         #  SQL command granting that permission
-
+        entities = []
+        all_roles: FrozenSet[str] = frozenset()
         for entity_type, entry in self.spec.items():
             if entity_type in [
                 "require-owner",
@@ -435,6 +697,8 @@ class SnowflakeSpecLoader:
             # Generate list of all entities (used for roles currently)
             entry = cast(List, entry)
             all_entities = [list(entity.keys())[0] for entity in entry]
+            if entity_type == "roles":
+                all_roles = frozenset(all_entities)
 
             for entity_dict in entry:
                 entity_configs = [
@@ -447,88 +711,149 @@ class SnowflakeSpecLoader:
                         entity_type == "roles"
                         and "roles" in run_list
                         and (not roles or entity_name in roles)
-                    ):
-                        sql_commands.extend(
-                            self.process_roles(
-                                generator,
-                                entity_type,
-                                entity_name,
-                                config,
-                                all_entities,
-                            )
-                        )
-                    elif (
+                    ) or (
                         entity_type == "users"
                         and "users" in run_list
                         and (not users or entity_name in users)
                     ):
-                        sql_commands.extend(
-                            self.process_users(
-                                generator, entity_type, entity_name, config
-                            )
-                        )
+                        entities.append((entity_type, entity_name, config))
 
-        return self.remove_duplicate_queries(sql_commands)
+        return entities, all_roles
 
-    # TODO: These functions are part of a refactor of the previous module,
-    # but this still requires a fair bit of attention to cleanup
-    def process_roles(self, generator, entity_type, entity_name, config, all_entities):
-        sql_commands = []
-        click.secho(f"     Processing role {entity_name}", fg="green")
-        sql_commands.extend(
-            generator.generate_grant_roles(
-                entity_type, entity_name, config, all_entities
-            )
+    def _generate_roles_in_processes(
+        self,
+        generator: SnowflakeGrantsGenerator,
+        role_configs: List[Tuple[str, Dict]],
+        all_roles: FrozenSet[str],
+        processes: int,
+    ) -> Iterator[Optional[List[SnowflakeCommand]]]:
+        """
+        Generate the commands of <role_configs> in worker processes, yielding
+        them in order. None is yielded for the roles whose generation needed
+        metadata that had not been loaded beforehand.
+        """
+        # Workers can not query Snowflake, so list what they may need: the
+        # schemas of every database, but the tables and views only of the
+        # databases with table references, already listed to check the spec.
+        # Roles needing anything else are generated in this process.
+        databases = sorted(
+            self.entities["database_refs"] - self.entities["shared_databases"]
+        )
+        self.metadata.preload(
+            databases,
+            [
+                database
+                for database in databases
+                if database in self.entities["tables_by_database"]
+            ],
         )
 
-        sql_commands.extend(generator.generate_grant_ownership(entity_name, config))
-
-        sql_commands.extend(
-            generator.generate_grant_privileges_to_role(
-                entity_name,
-                config,
+        chunksize = max(1, len(role_configs) // (processes * 4))
+        # Worker processes are spawned rather than forked, as this can run in
+        # a thread (e.g. with --stream) while other threads hold connections
+        with ProcessPoolExecutor(
+            max_workers=processes,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_generate_worker,
+            initargs=(
+                SnowflakeGrantsGenerator(
+                    generator.grant_index,
+                    generator.roles_granted_to_user,
+                    ignore_memberships=generator.ignore_memberships,
+                    metadata=copy.copy(self.metadata),
+                ),
+                all_roles,
                 self.entities["shared_databases"],
                 self.entities["databases"],
+            ),
+        ) as executor:
+            yield from executor.map(
+                _generate_role_in_worker, role_configs, chunksize=chunksize
             )
+
+    # TODO: These functions are part of a refactor of the previous module,
+    # but this still requires a fair bit of attention to cleanup
+    def process_roles(self, generator, entity_type, entity_name, config, all_entities):
+        click.secho(f"     Processing role {entity_name}", fg="green")
+        yield from generate_role_queries(
+            generator,
+            entity_type,
+            entity_name,
+            config,
+            all_entities,
+            self.entities["shared_databases"],
+            self.entities["databases"],
         )
-        return sql_commands
 
     def process_users(self, generator, entity_type, entity_name, config):
-        sql_commands = []
         click.secho(f"     Processing user {entity_name}", fg="green")
-        sql_commands.extend(generator.generate_alter_user(entity_name, config))
+        yield from generator.generate_alter_user(entity_name, config)
 
-        sql_commands.extend(
-            generator.generate_grant_roles(entity_type, entity_name, config)
-        )
-        return sql_commands
+        yield from generator.generate_grant_roles(entity_type, entity_name, config)
 
     @staticmethod
-    def remove_duplicate_queries(sql_commands: List[Dict]) -> List[Dict]:
-        grants = []
-        revokes = []
-
-        for i, command in reversed(list(enumerate(sql_commands))):
-            # Find all "GRANT OWNERSHIP commands"
-            if command["sql"].startswith("GRANT OWNERSHIP ON"):
-                grant = command["sql"].split("TO ROLE", 1)[0]
-
-                if grant in grants:
-                    # If there is already a GRANT OWNERSHIP for the same
-                    #  DB/SCHEMA/TABLE --> remove the one before it
-                    #  (only keep the last one)
-                    del sql_commands[i]
-                else:
-                    grants.append(grant)
-
-            if command["sql"].startswith("REVOKE ALL"):
-                revoke = command["sql"]
-                if revoke in revokes:
-                    # If there is already a REVOKE ALL for the same
-                    #  DB/SCHEMA/TABLE --> remove the one before it
-                    #  (only keep the last one)
-                    del sql_commands[i]
-                else:
-                    revokes.append(revoke)
-
-        return sql_commands
+    def remove_duplicate_queries(
+        sql_commands: List[SnowflakeCommand],
+    ) -> List[SnowflakeCommand]:
+        return remove_duplicate_queries(sql_commands)
+
+
+def generate_role_queries(
+    generator: SnowflakeGrantsGenerator,
+    entity_type: str,
+    entity_name: str,
+    config: Dict[str, Any],
+    all_entities: FrozenSet[str],
+    shared_databases: Set[str],
+    databases: Set[str],
+) -> Iterator[SnowflakeCommand]:
+    yield from generator.generate_grant_roles(
+        entity_type, entity_name, config, all_entities
+    )
+
+    yield from generator.generate_grant_ownership(entity_name, config)
+
+    yield from generator.generate_grant_privileges_to_role(
+        entity_name,
+        config,
+        shared_databases,
+        databases,
+    )
+
+
+# State of the worker processes started by generate_entity_queries
+_worker_state: Dict[str, Any] = {}
+
+
+def _init_generate_worker(
+    generator: SnowflakeGrantsGenerator,
+    all_roles: FrozenSet[str],
+    shared_databases: Set[str],
+    databases: Set[str],
+) -> None:
+    _worker_state.update(
+        generator=generator,
+        all_roles=all_roles,
+        shared_databases=shared_databases,
+        databases=databases,
+    )
+
+
+def _generate_role_in_worker(
+    role_config: Tuple[str, Dict[str, Any]]
+) -> Optional[List[SnowflakeCommand]]:
+    entity_name, config = role_config
+    try:
+        return list(
+            generate_role_queries(
+                _worker_state["generator"],
+                "roles",
+                entity_name,
+                config,
+                _worker_state["all_roles"],
+                _worker_state["shared_databases"],
+                _worker_state["databases"],
+            )
+        )
+    except MetadataNotLoadedError:
+        return None
@@ -0,0 +1,160 @@
+import hashlib
+import json
+import os
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from permifrost.error import StateLoadingError
+
+STATE_VERSION = 1
+
+DEFAULT_STATE_PATH = ".permifrost_state.json"
+
+
+def hash_config(config: Any) -> str:
+    """
+    Return the SHA-256 hash of a spec subtree, independent of key order.
+    """
+    content = json.dumps(config, sort_keys=True, default=str)
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def spec_entities(spec: Dict, entity_type: str) -> Dict[str, Any]:
+    """
+    Return the configuration of every role or user of a spec, by name.
+    """
+    entities: Dict[str, Any] = {}
+    for entity_dict in spec.get(entity_type) or []:
+        entities.update(entity_dict)
+    return entities
+
+
+def member_of_roles(config: Any) -> List[str]:
+    """
+    Return the roles listed in the member_of of an entity, included or not.
+    """
+    member_of = (config or {}).get("member_of", [])
+    if isinstance(member_of, dict):
+        return member_of.get("include", []) + member_of.get("exclude", [])
+    return list(member_of)
+
+
+def hash_shared_spec(spec: Dict) -> str:
+    """
+    Hash everything in the spec but the roles and users (e.g. databases),
+    as a change there can affect the statements of any entity.
+    """
+    return hash_config(
+        {key: value for key, value in spec.items() if key not in ["roles", "users"]}
+    )
+
+
+@dataclass
+class SnowflakeState:
+    """
+    The hashes of the spec subtree of every role and user as of the last
+    successful run, used to only process the entities changed since then.
+    """
+
+    roles: Dict[str, str] = field(default_factory=dict)
+    users: Dict[str, str] = field(default_factory=dict)
+    shared_hash: Optional[str] = None
+    applied_at: Optional[str] = None
+    version: int = STATE_VERSION
+
+    @classmethod
+    def load(cls, path: str) -> "SnowflakeState":
+        """
+        Load a state file, or return an empty state if it does not exist.
+        """
+        if not os.path.exists(path):
+            return cls()
+
+        try:
+            with open(path, "r") as state_file:
+                content = json.load(state_file)
+        except (OSError, ValueError) as exc:
+            raise StateLoadingError(f"State error: unable to read {path}: {exc}")
+
+        if not isinstance(content, dict) or content.get("version") != STATE_VERSION:
+            raise StateLoadingError(f"State error: unsupported state file {path}")
+
+        try:
+            return cls(**content)
+        except TypeError as exc:
+            raise StateLoadingError(f"State error: invalid state {path}: {exc}")
+
+    def save(self, path: str) -> None:
+        with open(path, "w") as state_file:
+            json.dump(asdict(self), state_file, indent=2, sort_keys=True)
+
+    def changed_entities(self, spec: Dict) -> Tuple[List[str], List[str]]:
+        """
+        Return the roles and users of <spec> whose subtree changed since the
+        state was recorded, plus the entities that are members of a changed
+        role, in spec order.
+
+        Every entity is returned when the rest of the spec changed.
+        """
+        roles = spec_entities(spec, "roles")
+        users = spec_entities(spec, "users")
+
+        if hash_shared_spec(spec) != self.shared_hash:
+            return list(roles), list(users)
+
+        changed_roles = {
+            name
+            for name, config in roles.items()
+            if self.roles.get(name) != hash_config(config)
+        }
+        changed_users = {
+            name
+            for name, config in users.items()
+            if self.users.get(name) != hash_config(config)
+        }
+
+        if changed_roles:
+            changed_roles |= self._members_of(roles, changed_roles)
+            changed_users |= self._members_of(users, changed_roles)
+
+        return (
+            [name for name in roles if name in changed_roles],
+            [name for name in users if name in changed_users],
+        )
+
+    @staticmethod
+    def _members_of(entities: Dict[str, Any], roles: Set[str]) -> Set[str]:
+        return {
+            name
+            for name, config in entities.items()
+            if any(role == "*" or role in roles for role in member_of_roles(config))
+        }
+
+    def record(
+        self,
+        spec: Dict,
+        roles: Optional[Iterable[str]] = None,
+        users: Optional[Iterable[str]] = None,
+    ) -> None:
+        """
+        Record the current hashes of the given roles and users of <spec>
+        (all of them by default) as successfully applied.
+        """
+        spec_roles = spec_entities(spec, "roles")
+        spec_users = spec_entities(spec, "users")
+        roles = list(spec_roles) if roles is None else list(roles)
+        users = list(spec_users) if users is None else list(users)
+
+        if set(roles) >= set(spec_roles) and set(users) >= set(spec_users):
+            # The whole spec has been applied
+            self.roles = {}
+            self.users = {}
+            self.shared_hash = hash_shared_spec(spec)
+
+        for name in roles:
+            self.roles[name] = hash_config(spec_roles[name])
+        for name in users:
+            self.users[name] = hash_config(spec_users[name])
+
+        self.applied_at = datetime.now(timezone.utc).isoformat(timespec="seconds")
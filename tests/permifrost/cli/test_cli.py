@@ -1,5 +1,9 @@
+import json
+
 import permifrost
 from permifrost.cli import cli
+from permifrost.snowflake_plan import SnowflakePlan, hash_spec
+from permifrost.snowflake_state import SnowflakeState
 
 
 def test_version(cli_runner):
@@ -20,3 +24,181 @@ def test_load_command(cli_runner):
 
     cli_output = cli_spec_test_command.output
     assert (len(cli_output) >= 5) and (cli_output[:5] == "Usage")
+
+
+def test_plan_command(cli_runner):
+    cli_plan_command = cli_runner.invoke(cli.commands["plan"], ["--help"])
+
+    cli_output = cli_plan_command.output
+    assert (len(cli_output) >= 5) and (cli_output[:5] == "Usage")
+
+
+def test_apply_command_runs_plan(cli_runner, mocker, tmp_path):
+    spec_path = tmp_path / "roles.yml"
+    spec_path.write_text('version: "1.0"\n')
+    SnowflakePlan(
+        spec_path=str(spec_path),
+        spec_hash=hash_spec(str(spec_path)),
+        snapshot_timestamp=SnowflakePlan.now(),
+        queries=[
+            {"already_granted": True, "sql": "GRANT ROLE role_1 TO ROLE role_2"},
+            {"already_granted": False, "sql": "GRANT ROLE role_3 TO ROLE role_2"},
+        ],
+    ).save(str(tmp_path / "plan.json"))
+    connector = mocker.patch("permifrost.cli.permissions.SnowflakeConnector")
+    conn = connector.return_value.__enter__.return_value
+    conn.cache = None
+
+    result = cli_runner.invoke(cli, ["apply", str(tmp_path / "plan.json")])
+
+    assert result.exit_code == 0
+    conn.run_query.assert_called_once_with("GRANT ROLE role_3 TO ROLE role_2")
+    assert "[SUCCESS] GRANT ROLE role_3 TO ROLE role_2;" in result.output
+
+
+def test_apply_command_rejects_changed_spec(cli_runner, mocker, tmp_path):
+    spec_path = tmp_path / "roles.yml"
+    spec_path.write_text('version: "1.0"\n')
+    SnowflakePlan(
+        spec_path=str(spec_path),
+        spec_hash=hash_spec(str(spec_path)),
+        snapshot_timestamp=SnowflakePlan.now(),
+    ).save(str(tmp_path / "plan.json"))
+    spec_path.write_text('version: "1.0"\nroles: []\n')
+    connector = mocker.patch("permifrost.cli.permissions.SnowflakeConnector")
+
+    result = cli_runner.invoke(cli, ["apply", str(tmp_path / "plan.json")])
+
+    assert result.exit_code == 1
+    connector.assert_not_called()
+
+
+def test_apply_command_rejects_missing_spec(cli_runner, mocker, tmp_path):
+    spec_path = tmp_path / "roles.yml"
+    spec_path.write_text('version: "1.0"\n')
+    SnowflakePlan(
+        spec_path=str(spec_path),
+        spec_hash=hash_spec(str(spec_path)),
+        snapshot_timestamp=SnowflakePlan.now(),
+    ).save(str(tmp_path / "plan.json"))
+    spec_path.unlink()
+    connector = mocker.patch("permifrost.cli.permissions.SnowflakeConnector")
+
+    result = cli_runner.invoke(cli, ["apply", str(tmp_path / "plan.json")])
+
+    assert result.exit_code == 1
+    assert "no longer exists" in result.output
+    connector.assert_not_called()
+
+    conn = connector.return_value.__enter__.return_value
+    conn.cache = None
+    result = cli_runner.invoke(cli, ["apply", "--force", str(tmp_path / "plan.json")])
+
+    assert result.exit_code == 0
+    connector.assert_called_once()
+
+
+def test_run_command_streams_queries(cli_runner, mocker):
+    connector = mocker.patch("permifrost.cli.permissions.SnowflakeConnector")
+    conn = connector.return_value.__enter__.return_value
+    conn.cache = None
+    spec_loader = mocker.patch(
+        "permifrost.cli.permissions.SnowflakeSpecLoader"
+    ).return_value
+    spec_loader.iter_permission_queries.return_value = iter(
+        [
+            [{"already_granted": False, "sql": "GRANT ROLE role_1 TO ROLE role_2"}],
+            [{"already_granted": False, "sql": "GRANT ROLE role_3 TO ROLE role_2"}],
+        ]
+    )
+
+    result = cli_runner.invoke(cli, ["run", "roles.yml", "--stream"])
+
+    assert result.exit_code == 0
+    spec_loader.generate_permission_queries.assert_not_called()
+    assert [call.args for call in conn.run_query.call_args_list] == [
+        ("GRANT ROLE role_1 TO ROLE role_2",),
+        ("GRANT ROLE role_3 TO ROLE role_2",),
+    ]
+
+
+def test_run_command_parallel_generate(cli_runner, mocker):
+    connector = mocker.patch("permifrost.cli.permissions.SnowflakeConnector")
+    connector.return_value.__enter__.return_value.cache = None
+    mocker.patch("permifrost.cli.permissions.os.cpu_count", return_value=16)
+    spec_loader = mocker.patch(
+        "permifrost.cli.permissions.SnowflakeSpecLoader"
+    ).return_value
+    spec_loader.generate_permission_queries.return_value = []
+
+    result = cli_runner.invoke(cli, ["run", "roles.yml", "--parallel-generate"])
+
+    assert result.exit_code == 0
+    assert spec_loader.generate_permission_queries.call_args.kwargs["processes"] == 16
+
+
+def test_run_command_changed_only(cli_runner, mocker, tmp_path):
+    connector = mocker.patch("permifrost.cli.permissions.SnowflakeConnector")
+    connector.return_value.__enter__.return_value.cache = None
+    spec = {
+        "roles": [
+            {"role_1": {"warehouses": ["loading"]}},
+            {"role_2": {"member_of": ["role_3"]}},
+            {"role_3": {}},
+        ],
+        "users": [{"user_1": {"member_of": ["role_1"]}}],
+    }
+    state = SnowflakeState()
+    state.record(spec)
+    state_path = str(tmp_path / "state.json")
+    state.save(state_path)
+    spec["roles"][0]["role_1"]["warehouses"].append("transforming")
+    mocker.patch("permifrost.cli.permissions.load_spec", return_value=spec)
+    spec_loader_class = mocker.patch("permifrost.cli.permissions.SnowflakeSpecLoader")
+    spec_loader = spec_loader_class.return_value
+    spec_loader.generate_permission_queries.return_value = []
+
+    result = cli_runner.invoke(
+        cli, ["run", "roles.yml", "--changed-only", "--state-file", state_path]
+    )
+
+    assert result.exit_code == 0
+    assert spec_loader_class.call_args.kwargs["roles"] == ["role_1"]
+    assert spec_loader_class.call_args.kwargs["users"] == ["user_1"]
+    assert SnowflakeState.load(state_path).changed_entities(spec) == ([], [])
+
+    result = cli_runner.invoke(
+        cli, ["run", "roles.yml", "--changed-only", "--state-file", state_path]
+    )
+
+    assert result.exit_code == 0
+    assert "No roles or users changed" in result.output
+    assert spec_loader_class.call_count == 1
+
+
+def test_graph_command(cli_runner, tmp_path):
+    spec_path = tmp_path / "roles.yml"
+    spec_path.write_text(
+        'version: "1.0"\n'
+        "roles:\n"
+        "  - loader: {}\n"
+        "  - transformer:\n"
+        "      member_of: [loader]\n"
+        "users:\n"
+        "  - airflow:\n"
+        "      can_login: yes\n"
+        "      member_of: [transformer]\n"
+    )
+
+    result = cli_runner.invoke(
+        cli, ["graph", str(spec_path), "--format", "json", "--role", "airflow"]
+    )
+
+    assert result.exit_code == 0
+    assert json.loads(result.output) == {
+        "airflow": {
+            "member_of": ["transformer"],
+            "inherits": ["loader", "transformer"],
+            "members": [],
+        }
+    }
@@ -144,3 +144,20 @@ def test_filter_by_type(entities):
         EntityGenerator.filter_grouped_entities_by_type(grouped_entities, "roles")
         == expected
     )
+
+
+def test_cyclic_memberships():
+    spec = {
+        "roles": [
+            {"loader": {"member_of": ["transformer"]}},
+            {"transformer": {"member_of": ["reporter"]}},
+            {"reporter": {"member_of": ["loader"]}},
+            {"admin": {"member_of": ["*"]}},
+        ]
+    }
+    assert EntityGenerator(spec).ensure_acyclic_memberships() == [
+        "Reference error: Roles loader, reporter, transformer are members of each other"
+    ]
+
+    spec["roles"][2]["reporter"]["member_of"] = ["*"]
+    assert EntityGenerator(spec).ensure_acyclic_memberships() == []
@@ -0,0 +1,75 @@
+import pytest
+
+from permifrost.glob_matcher import GlobMatcher, is_pattern
+
+
+@pytest.mark.parametrize(
+    "identifier,expected",
+    [
+        ("database_1.schema_1", False),
+        ("database_1.*", True),
+        ("database_?.schema_1", True),
+        ("database_1.schema_1.stg_*", True),
+        ('database_1."SCHEMA*"', False),
+    ],
+)
+def test_is_pattern(identifier, expected):
+    assert is_pattern(identifier) == expected
+
+
+class TestGlobMatcher:
+    @pytest.mark.parametrize(
+        "pattern,identifier,expected",
+        [
+            ("database_1.*", "database_1.schema_1", True),
+            ("database_1.*", "database_2.schema_1", False),
+            ("*.schema_1", "database_2.schema_1", True),
+            ("database_1.schema_?", "database_1.schema_1", True),
+            ("database_1.schema_?", "database_1.schema_10", False),
+            ("database_1.*_stg_*", "database_1.dbt_stg_orders", True),
+            ("database_1.*.table_1", "database_1.schema_1.table_1", True),
+            ("database_1.*", "database_1.schema_1.table_1", False),
+            ("DATABASE_1.SCHEMA_1.T*", "database_1.schema_1.table_1", True),
+            ("database_1.schema_1.t*", 'database_1.schema_1."TableThree"', True),
+            ("database_1.schema_1", "database_1.schema_1", True),
+            ('database_1."Schema*"', 'database_1."Schema*"', True),
+            ('database_1."Schema*"', 'database_1."Schema_1"', False),
+        ],
+    )
+    def test_matches(self, pattern, identifier, expected):
+        assert GlobMatcher([pattern]).matches(identifier) == expected
+
+    def test_filter(self):
+        matcher = GlobMatcher(["database_1.stg_*", "database_2.*"])
+
+        assert matcher.filter(
+            ["database_1.stg_a", "database_1.other", "database_2.schema_1"]
+        ) == ["database_1.stg_a", "database_2.schema_1"]
+
+    def test_filter_without_patterns(self):
+        assert GlobMatcher([]).filter(["database_1.schema_1"]) == []
+
+    def test_match_all(self):
+        matcher = GlobMatcher(
+            ["database_1.*", "database_1.stg_*", "*.stg_?", "database_2.schema_1"]
+        )
+
+        assert matcher.match_all(
+            ["database_1.stg_a", "database_1.other", "database_2.stg_b"]
+        ) == {
+            "database_1.*": ["database_1.stg_a", "database_1.other"],
+            "database_1.stg_*": ["database_1.stg_a"],
+            "*.stg_?": ["database_1.stg_a", "database_2.stg_b"],
+            "database_2.schema_1": [],
+        }
+
+    def test_match_all_many_patterns(self):
+        patterns = [f"database_1.schema_{i}.table_*" for i in range(1000)]
+        tables = [f"database_1.schema_{i % 1000}.table_{i}" for i in range(10_000)]
+
+        matched = GlobMatcher(patterns).match_all(tables)
+
+        assert all(len(names) == 10 for names in matched.values())
+        assert (
+            matched["database_1.schema_7.table_*"][0] == "database_1.schema_7.table_7"
+        )
@@ -0,0 +1,60 @@
+from permifrost.grant_index import GrantIndex
+from permifrost.snowflake_grants import SnowflakeGrantsGenerator
+
+
+class TestGrantIndex:
+    def test_is_granted(self):
+        index = GrantIndex(
+            {
+                "functional_role": {
+                    "select": {
+                        "table": [
+                            "database_1.schema_1.table_1",
+                            'database_1.schema_1."Table_2"',
+                        ]
+                    }
+                }
+            }
+        )
+
+        assert index.is_granted(
+            "functional_role", "select", "table", "database_1.schema_1.table_1"
+        )
+        assert index.is_granted(
+            "functional_role", "select", "table", "DATABASE_1.SCHEMA_1.TABLE_1"
+        )
+        assert index.is_granted(
+            "functional_role", "select", "table", "database_1.schema_1.Table_2"
+        )
+        assert not index.is_granted(
+            "functional_role", "select", "table", "database_1.schema_1.table_3"
+        )
+        assert not index.is_granted(
+            "functional_role", "insert", "table", "database_1.schema_1.table_1"
+        )
+        assert not index.is_granted(
+            "other_role", "select", "table", "database_1.schema_1.table_1"
+        )
+
+    def test_granted_keeps_fetched_order(self):
+        index = GrantIndex(
+            {"functional_role": {"usage": {"role": ["role_2", "role_1"]}}}
+        )
+
+        assert index.granted("functional_role", "usage", "role") == [
+            "role_2",
+            "role_1",
+        ]
+        assert index.granted("functional_role", "usage", "database") == []
+
+    def test_generator_accepts_index(self, mocker):
+        grants_to_role = {"functional_role": {"usage": {"database": ["database_1"]}}}
+        index = GrantIndex(grants_to_role)
+
+        generator = SnowflakeGrantsGenerator(index, {}, conn=mocker.MagicMock())
+
+        assert generator.grant_index is index
+        assert generator.grants_to_role is grants_to_role
+        assert generator.is_granted_privilege(
+            "functional_role", "usage", "database", "database_1"
+        )
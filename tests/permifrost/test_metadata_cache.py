@@ -0,0 +1,116 @@
+import pytest
+
+from permifrost.metadata_cache import SnowflakeMetadataCache, default_cache_path
+from permifrost.snowflake_connector import SnowflakeConnector
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = SnowflakeMetadataCache(path=tmp_path / "metadata.sqlite", ttl=60)
+    yield cache
+    cache.close()
+
+
+class TestSnowflakeMetadataCache:
+    def test_default_cache_path(self, monkeypatch, tmp_path):
+        monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+
+        assert default_cache_path() == tmp_path / "permifrost" / "metadata.sqlite"
+
+    def test_get_returns_stored_value(self, cache):
+        cache.set("account/role", "key", ["database_1", "database_2"])
+
+        assert cache.get("account/role", "key") == ["database_1", "database_2"]
+        assert cache.get("account/other_role", "key") is None
+        assert cache.get("account/role", "missing_key") is None
+
+    def test_get_ignores_stale_values(self, mocker, cache):
+        mocker.patch("permifrost.metadata_cache.time.time", return_value=1000)
+        cache.set("account/role", "key", ["database_1"])
+
+        mocker.patch("permifrost.metadata_cache.time.time", return_value=1061)
+
+        assert cache.get("account/role", "key") is None
+
+    def test_values_persist_across_instances(self, tmp_path, cache):
+        cache.set("account/role", "key", {"role_1": "owner_1"})
+
+        other_cache = SnowflakeMetadataCache(path=cache.path, ttl=60)
+
+        assert other_cache.get("account/role", "key") == {"role_1": "owner_1"}
+        other_cache.close()
+
+    def test_clear_scope(self, cache):
+        cache.set("account/role", "key", ["database_1"])
+        cache.set("account/other_role", "key", ["database_2"])
+
+        cache.clear("account/role")
+
+        assert cache.get("account/role", "key") is None
+        assert cache.get("account/other_role", "key") == ["database_2"]
+
+        cache.clear()
+
+        assert cache.get("account/other_role", "key") is None
+
+
+class TestCachedMetadata:
+    @pytest.fixture
+    def conn(self, mocker, cache):
+        mocker.patch("sqlalchemy.create_engine")
+        conn = SnowflakeConnector(
+            config={
+                "user": "user",
+                "password": "password",
+                "account": "Account",
+                "database": "database",
+                "role": "Role",
+                "warehouse": "warehouse",
+                "oauth_token": None,
+                "key_path": None,
+                "key_passphrase": None,
+                "authenticator": None,
+            },
+            cache=cache,
+        )
+        conn.run_query = mocker.MagicMock()
+        mocker.patch.object(
+            conn.run_query(),
+            "fetchall",
+            return_value=[
+                {"database_name": "DATABASE_1", "name": "SCHEMA_1"},
+            ],
+        )
+        conn.run_query.reset_mock()
+        yield conn
+
+    def test_results_are_served_from_cache(self, conn):
+        assert conn.show_schemas(database="database_1") == ["database_1.schema_1"]
+        assert conn.show_schemas(database="database_1") == ["database_1.schema_1"]
+
+        conn.run_query.assert_called_once_with(
+            "SHOW TERSE SCHEMAS IN DATABASE database_1"
+        )
+        assert conn.cache_scope == "account/role"
+
+    def test_results_are_keyed_by_arguments(self, conn):
+        conn.show_schemas(database="database_1")
+        conn.show_schemas(database="database_2")
+
+        assert conn.run_query.call_count == 2
+
+    def test_positional_and_keyword_arguments_share_results(self, conn):
+        conn.show_schemas("database_1")
+        conn.show_schemas(database="database_1")
+        conn.show_schemas()
+        conn.show_schemas(database=None)
+
+        assert conn.run_query.call_count == 2
+
+    def test_cache_is_optional(self, conn):
+        conn.cache = None
+
+        conn.show_schemas(database="database_1")
+        conn.show_schemas(database="database_1")
+
+        assert conn.run_query.call_count == 2
@@ -0,0 +1,59 @@
+from permifrost.query_pipeline import (
+    QueryPipeline,
+    duplicate_key,
+    remove_duplicate_queries,
+)
+
+
+def command(sql):
+    return {"already_granted": False, "sql": sql}
+
+
+OWNERSHIP_1 = command("GRANT OWNERSHIP ON schema db.schema TO ROLE role_1")
+OWNERSHIP_2 = command("GRANT OWNERSHIP ON schema db.schema TO ROLE role_2")
+REVOKE_ALL = command("REVOKE ALL PRIVILEGES ON schema db.schema FROM ROLE role_1")
+GRANT_1 = command("GRANT ROLE role_1 TO role role_3")
+GRANT_2 = command("GRANT ROLE role_2 TO role role_3")
+
+
+class TestRemoveDuplicateQueries:
+    def test_duplicate_key(self):
+        assert duplicate_key(OWNERSHIP_1) == duplicate_key(OWNERSHIP_2)
+        assert duplicate_key(REVOKE_ALL) == REVOKE_ALL["sql"]
+        assert duplicate_key(GRANT_1) is None
+
+    def test_last_ownership_grant_wins(self):
+        assert remove_duplicate_queries(
+            [OWNERSHIP_1, GRANT_1, OWNERSHIP_2, GRANT_2]
+        ) == [GRANT_1, OWNERSHIP_2, GRANT_2]
+
+    def test_keeps_last_revoke_all(self):
+        revoke_all = REVOKE_ALL.copy()
+
+        result = remove_duplicate_queries([REVOKE_ALL, GRANT_1, revoke_all])
+
+        assert result == [GRANT_1, revoke_all]
+        assert result[1] is revoke_all
+
+    def test_keeps_other_duplicates(self):
+        assert remove_duplicate_queries([GRANT_1, GRANT_1]) == [GRANT_1, GRANT_1]
+
+    def test_large_number_of_ownership_grants(self):
+        commands = [
+            command(f"GRANT OWNERSHIP ON table db.schema.table_{i % 1000} TO ROLE r")
+            for i in range(100_000)
+        ]
+
+        assert remove_duplicate_queries(commands) == commands[-1000:]
+
+
+class TestQueryPipeline:
+    def test_removes_duplicates_by_default(self):
+        assert QueryPipeline()([OWNERSHIP_1, OWNERSHIP_2]) == [OWNERSHIP_2]
+
+    def test_runs_processors_in_order(self):
+        pipeline = QueryPipeline([])
+        pipeline.append(lambda commands: commands + [GRANT_2])
+        pipeline.append(lambda commands: commands[1:])
+
+        assert pipeline([GRANT_1]) == [GRANT_2]
@@ -0,0 +1,145 @@
+import pytest
+
+from permifrost.role_graph import RoleGraph
+
+
+@pytest.fixture
+def spec():
+    yield {
+        "roles": [
+            {"loader": {"warehouses": ["loading"]}},
+            {"transformer": {"member_of": ["loader"]}},
+            {"reporter": {"member_of": ["transformer"]}},
+            {"analyst": {"member_of": {"include": ["*"], "exclude": ["loader"]}}},
+            {"sysadmin": {"member_of": ["securityadmin", "reporter"]}},
+            {"securityadmin": {"member_of": ["sysadmin"]}},
+        ],
+        "users": [{"looker": {"member_of": ["reporter"]}}],
+    }
+
+
+class TestRoleGraph:
+    def test_from_spec(self, spec):
+        graph = RoleGraph.from_spec(spec)
+
+        assert graph.roles == [
+            "analyst",
+            "loader",
+            "reporter",
+            "securityadmin",
+            "sysadmin",
+            "transformer",
+        ]
+        assert graph.users == {"looker"}
+        assert graph.roles_of("reporter") == {"transformer"}
+        assert graph.members_of("transformer") == {"reporter", "analyst"}
+        # Memberships between default roles are never granted
+        assert graph.roles_of("sysadmin") == {"reporter"}
+        assert graph.roles_of("analyst") == {
+            "transformer",
+            "reporter",
+            "sysadmin",
+            "securityadmin",
+        }
+
+    def test_from_spec_without_star(self, spec):
+        graph = RoleGraph.from_spec(spec, expand_star=False)
+
+        assert graph.roles_of("analyst") == set()
+
+    def test_from_grants(self):
+        graph = RoleGraph.from_grants(
+            {
+                "reporter": {"usage": {"role": ["transformer"]}},
+                "transformer": {
+                    "usage": {"role": ["loader"], "warehouse": ["loading"]}
+                },
+            },
+            {"looker": ["reporter"]},
+        )
+
+        assert graph.inherited_roles("looker") == {"reporter", "transformer", "loader"}
+        assert graph.users == {"looker"}
+
+    def test_transitive_closure(self, spec):
+        graph = RoleGraph.from_spec(spec)
+
+        assert graph.inherited_roles("looker") == {"reporter", "transformer", "loader"}
+        assert graph.inherited_roles("loader") == set()
+        assert graph.inheritors("loader") == {
+            "transformer",
+            "reporter",
+            "analyst",
+            "sysadmin",
+            "looker",
+        }
+        assert graph.dependents(["reporter", "transformer"]) == {
+            "reporter",
+            "analyst",
+            "sysadmin",
+            "looker",
+        }
+
+    def test_closure_is_updated(self, spec):
+        graph = RoleGraph.from_spec(spec)
+        assert graph.inherited_roles("loader") == set()
+
+        graph.add_membership("loader", "public")
+
+        assert graph.inherited_roles("looker") == {
+            "reporter",
+            "transformer",
+            "loader",
+            "public",
+        }
+
+    def test_cycles(self):
+        graph = RoleGraph()
+        graph.add_membership("a", "b")
+        graph.add_membership("b", "c")
+        graph.add_membership("c", "a")
+        graph.add_membership("c", "d")
+        graph.add_membership("e", "e")
+        graph.add_membership("f", "a")
+
+        assert graph.cycles() == [["a", "b", "c"], ["e"]]
+        assert graph.inherited_roles("a") == {"a", "b", "c", "d"}
+        assert graph.inherited_roles("f") == {"a", "b", "c", "d"}
+        assert graph.inheritors("d") == {"a", "b", "c", "f"}
+        assert graph.inherited_roles("e") == {"e"}
+
+    def test_acyclic(self, spec):
+        assert RoleGraph.from_spec(spec).cycles() == []
+
+    def test_deep_hierarchy(self):
+        graph = RoleGraph()
+        for level in range(5000):
+            graph.add_membership(f"role_{level}", f"role_{level + 1}")
+
+        assert len(graph.inherited_roles("role_0")) == 5000
+        assert graph.cycles() == []
+
+    def test_merge(self):
+        graph = RoleGraph()
+        graph.add_membership("a", "b")
+        other = RoleGraph()
+        other.add_membership("b", "c")
+        other.add_entity("user", is_user=True)
+
+        graph.merge(other)
+
+        assert graph.inherited_roles("a") == {"b", "c"}
+        assert "user" in graph.users
+
+    def test_to_dot(self):
+        graph = RoleGraph()
+        graph.add_entity("looker", is_user=True)
+        graph.add_membership("looker", '"Reporter"')
+
+        assert graph.to_dot().splitlines() == [
+            "digraph roles {",
+            '  "\\"Reporter\\"" [shape=box];',
+            '  "looker" [shape=ellipse];',
+            '  "looker" -> "\\"Reporter\\"";',
+            "}",
+        ]
@@ -0,0 +1,84 @@
+import pytest
+
+from permifrost.role_permission_cache import RolePermissionCache
+
+
+class FakeTimer:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestRolePermissionCache:
+    def test_get_and_set(self):
+        cache = RolePermissionCache()
+
+        assert cache.get("role_1") is None
+        cache.set("role_1", {"usage": {}})
+
+        assert cache.get("role_1") == {"usage": {}}
+        assert "role_1" in cache
+        assert cache.stats() == {"hits": 1, "misses": 1, "evictions": 0, "size": 1}
+
+    def test_evicts_least_recently_used(self):
+        cache = RolePermissionCache(maxsize=2)
+        cache.set("role_1", 1)
+        cache.set("role_2", 2)
+        cache.get("role_1")
+        cache.set("role_3", 3)
+
+        assert "role_1" in cache
+        assert "role_2" not in cache
+        assert "role_3" in cache
+        assert len(cache) == 2
+        assert cache.evictions == 1
+
+    def test_ttl(self):
+        timer = FakeTimer()
+        cache = RolePermissionCache(ttl=60, timer=timer)
+        cache.set("role_1", 1)
+
+        timer.now = 60
+        assert cache.get("role_1") == 1
+
+        timer.now = 61
+        assert "role_1" not in cache
+        assert cache.get("role_1") is None
+        assert len(cache) == 0
+        assert (cache.hits, cache.misses) == (1, 1)
+
+    def test_set_refreshes_ttl(self):
+        timer = FakeTimer()
+        cache = RolePermissionCache(ttl=60, timer=timer)
+        cache.set("role_1", 1)
+        timer.now = 50
+        cache.set("role_1", 2)
+        timer.now = 100
+
+        assert cache.get("role_1") == 2
+
+    def test_unbounded(self):
+        cache = RolePermissionCache(maxsize=None)
+        for i in range(5000):
+            cache.set(f"role_{i}", i)
+
+        assert len(cache) == 5000
+
+    def test_invalidate(self):
+        cache = RolePermissionCache()
+        cache.set("role_1", 1)
+        cache.set("role_2", 2)
+
+        cache.invalidate("role_1")
+        cache.invalidate("missing_role")
+        assert "role_1" not in cache
+        assert "role_2" in cache
+
+        cache.invalidate()
+        assert len(cache) == 0
+
+    def test_invalid_maxsize(self):
+        with pytest.raises(ValueError):
+            RolePermissionCache(maxsize=0)
@@ -0,0 +1,166 @@
+import threading
+import time
+
+import pytest
+
+from permifrost.snowflake_apply import (
+    apply_statements,
+    generate_ahead,
+    statement_object,
+)
+
+
+class RecordingConnector:
+    """Connector stub keeping track of the statements it runs."""
+
+    def __init__(self, failing=None, delay=0):
+        self.failing = failing or []
+        self.delay = delay
+        self.statements = []
+        self._lock = threading.Lock()
+
+    def run_query(self, query):
+        time.sleep(self.delay)
+        with self._lock:
+            self.statements.append(query)
+        if query in self.failing:
+            raise Exception(f"Failed to run {query}")
+
+
+def statement(sql, already_granted=False):
+    return {"already_granted": already_granted, "sql": sql}
+
+
+@pytest.mark.parametrize(
+    "sql,expected",
+    [
+        ("GRANT ROLE role_1 TO ROLE role_2", "role_1"),
+        ('REVOKE ROLE "Role 1" FROM USER user_1', '"role 1"'),
+        ("ALTER USER user_1 SET DISABLED = FALSE", "user_1"),
+        ("GRANT usage ON database database_1 TO ROLE role_1", "database_1"),
+        (
+            "GRANT select, insert ON table database_1.schema_1.table_1 TO ROLE role_1",
+            "database_1.schema_1.table_1",
+        ),
+        (
+            'REVOKE select ON view database_1."Schema 1".view_1 FROM ROLE role_1',
+            'database_1."schema 1".view_1',
+        ),
+        (
+            "GRANT select ON FUTURE tables IN schema database_1.schema_1 TO ROLE role_1",
+            "database_1.schema_1",
+        ),
+        (
+            "GRANT select ON ALL views IN database database_1 TO ROLE role_1",
+            "database_1",
+        ),
+        (
+            "GRANT OWNERSHIP ON schema database_1.schema_1 TO ROLE role_1 COPY CURRENT GRANTS",
+            "database_1.schema_1",
+        ),
+        ("USE ROLE securityadmin", ""),
+    ],
+)
+def test_statement_object(sql, expected):
+    assert statement_object(sql) == expected
+
+
+class TestApplyStatements:
+    def test_serial_run_keeps_generated_order(self):
+        conn = RecordingConnector(failing=["GRANT ROLE role_3 TO ROLE role_1"])
+        statements = [
+            statement("GRANT ROLE role_2 TO ROLE role_1"),
+            statement("GRANT ROLE role_4 TO ROLE role_1", already_granted=True),
+            statement("GRANT ROLE role_3 TO ROLE role_1"),
+        ]
+        reported = []
+
+        apply_statements(conn, statements, report=reported.append)
+
+        assert conn.statements == [
+            "GRANT ROLE role_2 TO ROLE role_1",
+            "GRANT ROLE role_3 TO ROLE role_1",
+        ]
+        assert reported == statements
+        assert [stmt.get("run_status") for stmt in statements] == [True, None, False]
+
+    def test_concurrent_run_orders_dependent_statements(self):
+        conn = RecordingConnector(delay=0.01)
+        grant = "GRANT usage ON schema database_1.schema_{} TO ROLE role_1"
+        revoke = "REVOKE usage ON schema database_1.schema_{} FROM ROLE role_1"
+        ownership = (
+            "GRANT OWNERSHIP ON schema database_1.schema_{} TO ROLE role_1 "
+            "COPY CURRENT GRANTS"
+        )
+        statements = []
+        for schema in range(8):
+            statements.extend(
+                [
+                    statement(grant.format(schema)),
+                    statement(revoke.format(schema)),
+                    statement(ownership.format(schema)),
+                ]
+            )
+        reported = []
+
+        apply_statements(conn, statements, jobs=4, report=reported.append)
+
+        assert sorted(conn.statements) == sorted(stmt["sql"] for stmt in statements)
+        assert len(reported) == len(statements)
+        assert all(stmt["run_status"] for stmt in statements)
+        # Every ownership transfer runs before any other statement
+        assert all("OWNERSHIP" in sql for sql in conn.statements[:8])
+        for schema in range(8):
+            assert conn.statements.index(grant.format(schema)) < conn.statements.index(
+                revoke.format(schema)
+            )
+
+    def test_concurrent_run_skips_already_granted(self):
+        conn = RecordingConnector()
+        statements = [
+            statement("GRANT ROLE role_2 TO ROLE role_1", already_granted=True),
+            statement("GRANT ROLE role_3 TO ROLE role_1"),
+        ]
+        reported = []
+
+        apply_statements(conn, statements, jobs=4, report=reported.append)
+
+        assert conn.statements == ["GRANT ROLE role_3 TO ROLE role_1"]
+        assert reported == statements
+        assert statements[0].get("run_status") is None
+
+
+class TestGenerateAhead:
+    def test_yields_items_in_order(self):
+        assert list(generate_ahead(iter(range(10)), size=3)) == list(range(10))
+
+    def test_generates_while_consuming(self):
+        generated = threading.Event()
+
+        def items():
+            yield 1
+            generated.set()
+            yield 2
+
+        ahead = generate_ahead(items())
+
+        assert next(ahead) == 1
+        assert generated.wait(timeout=5)
+        assert list(ahead) == [2]
+
+    def test_raises_generation_errors(self):
+        def items():
+            yield 1
+            raise ValueError("invalid spec")
+
+        with pytest.raises(ValueError, match="invalid spec"):
+            list(generate_ahead(items()))
+
+    def test_stops_generating_when_closed(self):
+        def items():
+            yield from range(1000)
+
+        ahead = generate_ahead(items())
+        assert next(ahead) == 0
+
+        ahead.close()
@@ -0,0 +1,89 @@
+import asyncio
+import threading
+
+import pytest
+
+from permifrost.snowflake_async_connector import AsyncSnowflakeConnector
+from permifrost.snowflake_connector import SnowflakeConnector
+from permifrost_test_utils.snowflake_connector import MockSnowflakeConnector
+
+
+@pytest.fixture
+def mock_connector(mocker):
+    mocker.patch.object(SnowflakeConnector, "__init__", lambda x: None)
+    mock_connector = MockSnowflakeConnector()
+    mocker.patch.object(mock_connector, "close")
+    yield mock_connector
+
+
+class TestAsyncSnowflakeConnector:
+    def test_show_methods_run_in_worker_threads(self, mock_connector, mocker):
+        threads = []
+
+        def show_schemas(database=None):
+            threads.append(threading.current_thread().name)
+            return [f"{database}.schema_1"]
+
+        mocker.patch.object(mock_connector, "show_schemas", side_effect=show_schemas)
+
+        async def main():
+            async with AsyncSnowflakeConnector(mock_connector) as conn:
+                return await conn.show_schemas(database="database_1")
+
+        assert asyncio.run(main()) == ["database_1.schema_1"]
+        assert threads[0].startswith("permifrost")
+
+    def test_queries_run_concurrently(self, mock_connector, mocker):
+        # Both roles can only be fetched if they are fetched at the same time
+        barrier = threading.Barrier(2, timeout=5)
+
+        def show_grants_to_role(role):
+            barrier.wait()
+            return {"usage": {"role": [f"{role}_parent"]}}
+
+        mocker.patch.object(
+            mock_connector, "show_grants_to_role", side_effect=show_grants_to_role
+        )
+
+        async def main():
+            async with AsyncSnowflakeConnector(mock_connector, max_workers=2) as conn:
+                return await conn.map(conn.conn.show_grants_to_role, ["a", "b"])
+
+        assert asyncio.run(main()) == [
+            {"usage": {"role": ["a_parent"]}},
+            {"usage": {"role": ["b_parent"]}},
+        ]
+
+    def test_run_query_fetches_rows(self, mock_connector, mocker):
+        run_query = mocker.patch.object(mock_connector, "run_query")
+        run_query.return_value.fetchall.return_value = [{"name": "role_1"}]
+
+        async def main():
+            async with AsyncSnowflakeConnector(mock_connector) as conn:
+                return await conn.run_query("SHOW ROLES")
+
+        assert asyncio.run(main()) == [{"name": "role_1"}]
+        run_query.assert_called_once_with("SHOW ROLES")
+
+    def test_close_given_connector(self, mock_connector):
+        async def main():
+            async with AsyncSnowflakeConnector(mock_connector):
+                pass
+
+        asyncio.run(main())
+
+        mock_connector.close.assert_not_called()
+
+    def test_close_own_connector(self, mocker):
+        connector = mocker.patch(
+            "permifrost.snowflake_async_connector.SnowflakeConnector"
+        )
+
+        async def main():
+            async with AsyncSnowflakeConnector(config={"user": "user"}):
+                pass
+
+        asyncio.run(main())
+
+        connector.assert_called_once_with(config={"user": "user"})
+        connector.return_value.close.assert_called_once()
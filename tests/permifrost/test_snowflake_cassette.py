@@ -0,0 +1,106 @@
+import json
+
+import pytest
+
+from permifrost.error import CassetteError
+from permifrost.snowflake_cassette import (
+    CassetteResult,
+    RecordingSnowflakeConnector,
+    ReplaySnowflakeConnector,
+    SnowflakeCassette,
+)
+
+
+@pytest.fixture
+def cassette_path(tmp_path):
+    path = tmp_path / "cassette.json"
+    cassette = SnowflakeCassette(str(path))
+    cassette.record(
+        "SHOW ROLES",
+        [
+            {"name": "TEST_ROLE", "owner": "SUPERADMIN"},
+            {"name": "SUPERADMIN", "owner": "SUPERADMIN"},
+        ],
+    )
+    cassette.record("SELECT CURRENT_ROLE() AS ROLE", [{"role": "SECURITYADMIN"}])
+    cassette.record("SELECT CURRENT_ROLE() AS ROLE", [{"role": "SYSADMIN"}])
+    cassette.save()
+    yield str(path)
+
+
+class TestCassetteResult:
+    def test_fetch_rows(self):
+        result = CassetteResult([{"name": "a"}, {"name": "b"}, {"name": "c"}])
+
+        assert result.fetchone() == {"name": "a"}
+        assert result.fetchall() == [{"name": "b"}, {"name": "c"}]
+        assert result.fetchone() is None
+
+    def test_iterate_rows(self):
+        result = CassetteResult([{"name": "a"}, {"name": "b"}])
+
+        assert [row["name"] for row in result] == ["a", "b"]
+
+
+class TestReplaySnowflakeConnector:
+    def test_replays_recorded_results(self, cassette_path):
+        with ReplaySnowflakeConnector(cassette_path) as conn:
+            assert conn.show_roles() == {
+                "test_role": "superadmin",
+                "superadmin": "superadmin",
+            }
+            assert conn.stats["queries"] == 1
+
+    def test_replays_repeated_queries_in_order(self, cassette_path):
+        conn = ReplaySnowflakeConnector(cassette_path)
+
+        assert conn.get_current_role() == "securityadmin"
+        assert conn.get_current_role() == "sysadmin"
+        assert conn.get_current_role() == "sysadmin"
+
+    def test_unknown_query(self, cassette_path):
+        conn = ReplaySnowflakeConnector(cassette_path)
+
+        with pytest.raises(CassetteError):
+            conn.run_query("SHOW USERS")
+
+    def test_unsupported_version(self, tmp_path):
+        path = tmp_path / "cassette.json"
+        path.write_text(json.dumps({"version": 0, "queries": []}))
+
+        with pytest.raises(CassetteError):
+            ReplaySnowflakeConnector(str(path))
+
+
+class TestRecordingSnowflakeConnector:
+    @pytest.fixture
+    def conn(self, mocker, monkeypatch, tmp_path):
+        for variable in ["USER", "ACCOUNT", "DATABASE", "ROLE", "WAREHOUSE"]:
+            monkeypatch.setenv(f"PERMISSION_BOT_{variable}", "TEST")
+        mocker.patch("sqlalchemy.create_engine")
+        yield RecordingSnowflakeConnector(str(tmp_path / "cassette.json"))
+
+    def test_records_queries(self, conn):
+        path = conn.cassette.path
+        result = conn.engine.connect.return_value.execute.return_value
+        result.returns_rows = True
+        result.fetchall.return_value = [{"name": "TEST_ROLE", "owner": "SUPERADMIN"}]
+
+        with conn:
+            assert conn.show_roles() == {"test_role": "superadmin"}
+
+        replay = ReplaySnowflakeConnector(path)
+        assert replay.show_roles() == {"test_role": "superadmin"}
+
+    def test_records_statements_without_rows(self, conn):
+        path = conn.cassette.path
+        result = conn.engine.connect.return_value.execute.return_value
+        result.returns_rows = False
+
+        with conn:
+            conn.run_query("GRANT ROLE test_role TO ROLE superadmin")
+
+        replay = ReplaySnowflakeConnector(path)
+        assert (
+            replay.run_query("GRANT ROLE test_role TO ROLE superadmin").fetchall() == []
+        )
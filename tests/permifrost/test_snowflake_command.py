@@ -0,0 +1,109 @@
+import pytest
+
+from permifrost.snowflake_command import SnowflakeCommand, template_fields
+from permifrost.snowflake_grants import (
+    GRANT_OWNERSHIP_TEMPLATE,
+    GRANT_PRIVILEGES_TEMPLATE,
+    REVOKE_ROLE_TEMPLATE,
+)
+
+
+@pytest.fixture
+def grant_command():
+    yield SnowflakeCommand(
+        GRANT_PRIVILEGES_TEMPLATE,
+        already_granted=False,
+        privileges="usage",
+        resource_type="database",
+        resource_name="database_1",
+        role="role_1",
+    )
+
+
+class TestSnowflakeCommand:
+    def test_template_fields(self):
+        assert template_fields(REVOKE_ROLE_TEMPLATE) == (
+            "role_name",
+            "type",
+            "entity_name",
+        )
+
+    def test_sql_is_rendered_from_template(self, grant_command):
+        assert grant_command["sql"] == grant_command.sql
+        assert grant_command.sql == "GRANT usage ON database database_1 TO ROLE role_1"
+
+    def test_sql_is_rendered_once(self, grant_command):
+        assert grant_command._sql is None
+
+        sql = grant_command["sql"]
+
+        assert grant_command._sql is sql
+        assert grant_command["sql"] is sql
+        assert grant_command.sql is sql
+
+    def test_equals_dictionary(self, grant_command):
+        assert grant_command == {
+            "already_granted": False,
+            "sql": "GRANT usage ON database database_1 TO ROLE role_1",
+        }
+        assert dict(grant_command) == {
+            "already_granted": False,
+            "sql": "GRANT usage ON database database_1 TO ROLE role_1",
+        }
+
+    def test_run_status(self, grant_command):
+        assert grant_command.get("run_status") is None
+        assert "run_status" not in grant_command
+
+        grant_command["run_status"] = True
+
+        assert grant_command["run_status"] is True
+        assert len(grant_command) == 3
+
+    def test_only_status_keys_can_be_set(self, grant_command):
+        with pytest.raises(KeyError):
+            grant_command["sql"] = "USE ROLE securityadmin"
+
+    def test_missing_key(self, grant_command):
+        with pytest.raises(KeyError):
+            grant_command["role"]
+
+    def test_has_no_instance_dict(self, grant_command):
+        assert not hasattr(grant_command, "__dict__")
+
+    def test_to_dict(self, grant_command):
+        assert grant_command.to_dict() == {
+            "already_granted": False,
+            "sql": "GRANT usage ON database database_1 TO ROLE role_1",
+            "action": "grant",
+            "privileges": "usage",
+            "object_type": "database",
+            "object_name": "database_1",
+            "grantee": "role_1",
+        }
+
+    def test_ownership_fields(self):
+        command = SnowflakeCommand(
+            GRANT_OWNERSHIP_TEMPLATE,
+            resource_type="schema",
+            resource_name="database_1.schema_1",
+            role_name="role_1",
+        )
+
+        assert command.is_ownership
+        assert command.privileges == "ownership"
+        assert command.object_name == "database_1.schema_1"
+        assert command.grantee == "role_1"
+
+    def test_revoke_role_fields(self):
+        command = SnowflakeCommand(
+            REVOKE_ROLE_TEMPLATE,
+            role_name="role_1",
+            type="user",
+            entity_name="user_1",
+        )
+
+        assert command.action == "revoke"
+        assert command.object_type == "role"
+        assert command.object_name == "role_1"
+        assert command.grantee == "user_1"
@@ -77,6 +77,27 @@ class TestSnowflakeConnector:
             SnowflakeConnector.snowflaky(db16)
             SnowflakeConnector.snowflaky(db17)
 
+    def test_snowflaky_warns_for_memoized_names(self):
+        name = "DATABASE_1.SCHEMA_1.TABLE_1.AMBIGUOUS_IDENTIFIER"
+
+        for _ in range(2):
+            with pytest.warns(SyntaxWarning):
+                SnowflakeConnector.snowflaky(name)
+
+    def test_snowflaky_all(self):
+        assert SnowflakeConnector.snowflaky_all(
+            ["DATABASE_1.SCHEMA_1.TABLE_1", "1234raw.schema.table", "db.<TABLE>"]
+        ) == ["database_1.schema_1.table_1", '"1234raw".schema.table', "db.<table>"]
+
+    def test_snowflaky_user_role(self):
+        assert SnowflakeConnector.snowflaky_user_role("role_1") == "role_1"
+        assert SnowflakeConnector.snowflaky_user_role("Role_1") == "Role_1"
+        assert (
+            SnowflakeConnector.snowflaky_user_role("blake.enyart@gmail.com")
+            == '"blake.enyart@gmail.com"'
+        )
+        assert SnowflakeConnector.snowflaky_user_role('"gitlab-ci"') == '"gitlab-ci"'
+
     def test_uses_oauth_if_available(self, mocker, snowflake_connector_env):
         mocker.patch("sqlalchemy.create_engine")
         os.environ["PERMISSION_BOT_OAUTH_TOKEN"] = "TEST"
@@ -130,20 +151,58 @@ class TestSnowflakeConnector:
 
         conn.run_query(query)
 
-        conn.engine.assert_has_calls([mocker.call.connect().__enter__().execute(query)])
+        conn.engine.assert_has_calls([mocker.call.connect().execute(query)])
 
     def test_run_query_returns_results(self, mocker):
         mocker.patch("sqlalchemy.create_engine")
         conn = SnowflakeConnector()
         expectedResult = "MY DATABASE RESULT"
         mocker.patch.object(
-            conn.engine.connect().__enter__(), "execute", return_value=expectedResult
+            conn.engine.connect(), "execute", return_value=expectedResult
         )
 
         result = conn.run_query("query")
 
         assert result is expectedResult
 
+    def test_run_query_reuses_connection(self, mocker):
+        mocker.patch("sqlalchemy.create_engine")
+        conn = SnowflakeConnector()
+        conn.engine.connect.return_value.closed = False
+        conn.engine.connect.return_value.invalidated = False
+
+        conn.run_query("FIRST QUERY")
+        conn.run_query("SECOND QUERY")
+
+        conn.engine.connect.assert_called_once()
+        assert conn.stats == {
+            "queries": 2,
+            "connections_opened": 1,
+            "connections_reused": 1,
+        }
+
+    def test_run_query_reopens_invalidated_connection(self, mocker):
+        mocker.patch("sqlalchemy.create_engine")
+        conn = SnowflakeConnector()
+        conn.engine.connect.return_value.closed = False
+        conn.engine.connect.return_value.invalidated = True
+
+        conn.run_query("FIRST QUERY")
+        conn.run_query("SECOND QUERY")
+
+        assert conn.engine.connect.call_count == 2
+        assert conn.stats["connections_reused"] == 0
+
+    def test_close_releases_connections(self, mocker):
+        mocker.patch("sqlalchemy.create_engine")
+        with SnowflakeConnector() as conn:
+            conn.engine.connect.return_value.closed = False
+            conn.engine.connect.return_value.invalidated = False
+            conn.run_query("QUERY")
+
+        conn.engine.connect.return_value.close.assert_called_once()
+        conn.engine.dispose.assert_called_once()
+
     def test_get_current_user(self, mocker):
         mocker.patch("sqlalchemy.create_engine")
         conn = SnowflakeConnector()
@@ -392,6 +451,166 @@ class TestSnowflakeConnector:
             }
         }
 
+    def test_show_future_grants_of_roles(self, mocker):
+        mocker.patch("sqlalchemy.create_engine")
+        conn = SnowflakeConnector()
+        conn.run_query = mocker.MagicMock()
+        mocker.patch.object(
+            conn.run_query(),
+            "fetchall",
+            return_value=[
+                {
+                    "grant_to": "ROLE",
+                    "grantee_name": "ROLE_1",
+                    "privilege": "SELECT",
+                    "grant_on": "TABLE",
+                    "name": "DATABASE_1.<TABLE>",
+                },
+                {
+                    "grant_to": "ROLE",
+                    "grantee_name": "ROLE_2",
+                    "privilege": "SELECT",
+                    "grant_on": "TABLE",
+                    "name": "DATABASE_1.<TABLE>",
+                },
+                {
+                    "grant_to": "DATABASE_ROLE",
+                    "grantee_name": "ROLE_1",
+                    "privilege": "SELECT",
+                    "grant_on": "VIEW",
+                    "name": "DATABASE_1.<VIEW>",
+                },
+            ],
+        )
+
+        future_grants = conn.show_future_grants("database_1", roles=["role_1"])
+
+        assert future_grants == {
+            "role_1": {"select": {"table": ["database_1.<table>"]}}
+        }
+
+    def test_show_future_grants_result_scan(self, mocker):
+        mocker.patch("sqlalchemy.create_engine")
+        conn = SnowflakeConnector(result_scan=True)
+        conn.run_query = mocker.MagicMock()
+        mocker.patch.object(
+            conn.run_query(),
+            "fetchall",
+            return_value=[
+                {
+                    "grant_to": "ROLE",
+                    "grantee_name": "ROLE_1",
+                    "privilege": "SELECT",
+                    "grant_on": "TABLE",
+                    "name": "DATABASE_1.<TABLE>",
+                },
+            ],
+        )
+        conn.run_query.reset_mock()
+
+        future_grants = conn.show_future_grants(
+            "database_1", roles=["role_1", '"Role\'s"']
+        )
+
+        assert conn.run_query.call_args_list == [
+            mocker.call("SHOW FUTURE GRANTS IN DATABASE database_1"),
+            mocker.call(
+                'SELECT "privilege", "grant_on", "name", "grant_to", "grantee_name" '
+                "FROM TABLE(RESULT_SCAN(LAST_QUERY_ID())) "
+                "WHERE LOWER(\"grant_to\") IN ('role') "
+                "AND LOWER(\"grantee_name\") IN ('role\\'s', 'role_1')"
+            ),
+        ]
+        assert future_grants == {
+            "role_1": {"select": {"table": ["database_1.<table>"]}}
+        }
+
+    def test_show_tables_in_databases(self, mocker):
+        mocker.patch("sqlalchemy.create_engine")
+        conn = SnowflakeConnector()
+        conn.run_query = mocker.MagicMock()
+        mocker.patch.object(
+            conn.run_query(),
+            "fetchall",
+            return_value=[
+                {
+                    "database_name": "DATABASE_1",
+                    "schema_name": "SCHEMA_1",
+                    "name": "TABLE_1",
+                },
+                {
+                    "database_name": "DATABASE_2",
+                    "schema_name": "SCHEMA_1",
+                    "name": "TABLE_1",
+                },
+                {
+                    "database_name": "DataBase_3",
+                    "schema_name": "SCHEMA_1",
+                    "name": "TABLE_1",
+                },
+            ],
+        )
+
+        tables = conn.show_tables(in_databases=["database_1", '"DataBase_3"'])
+
+        conn.run_query.assert_has_calls([mocker.call("SHOW TERSE TABLES IN ACCOUNT")])
+        assert tables == [
+            "database_1.schema_1.table_1",
+            '"DataBase_3".schema_1.table_1',
+        ]
+
+    def test_show_views_result_scan(self, mocker):
+        mocker.patch("sqlalchemy.create_engine")
+        conn = SnowflakeConnector(result_scan=True)
+        conn.run_query = mocker.MagicMock()
+        mocker.patch.object(
+            conn.run_query(),
+            "fetchall",
+            return_value=[
+                {
+                    "database_name": "DATABASE_1",
+                    "schema_name": "SCHEMA_1",
+                    "name": "VIEW_1",
+                },
+            ],
+        )
+        conn.run_query.reset_mock()
+
+        views = conn.show_views(in_databases=["database_1"])
+
+        assert conn.run_query.call_args_list == [
+            mocker.call("SHOW TERSE VIEWS IN ACCOUNT"),
+            mocker.call(
+                'SELECT "database_name", "schema_name", "name" '
+                "FROM TABLE(RESULT_SCAN(LAST_QUERY_ID())) "
+                "WHERE LOWER(\"database_name\") IN ('database_1')"
+            ),
+        ]
+        assert views == ["database_1.schema_1.view_1"]
+
+    def test_show_tables_result_scan_without_filter(self, mocker):
+        mocker.patch("sqlalchemy.create_engine")
+        conn = SnowflakeConnector(result_scan=True)
+        conn.run_query = mocker.MagicMock()
+
+        conn.show_tables(schema="database_1.schema_1")
+
+        assert conn.run_query.call_args_list == [
+            mocker.call("SHOW TERSE TABLES IN SCHEMA database_1.schema_1"),
+            mocker.call(
+                'SELECT "database_name", "schema_name", "name" '
+                "FROM TABLE(RESULT_SCAN(LAST_QUERY_ID()))"
+            ),
+        ]
+
+    def test_show_with_empty_filter(self, mocker):
+        mocker.patch("sqlalchemy.create_engine")
+        conn = SnowflakeConnector(result_scan=True)
+        conn.run_query = mocker.MagicMock()
+
+        assert conn.show_future_grants("database_1", roles=[]) == {}
+        conn.run_query.assert_not_called()
+
     def test_show_roles(self, mocker):
         mocker.patch("sqlalchemy.create_engine")
         conn = SnowflakeConnector()
@@ -441,6 +660,94 @@ class TestSnowflakeConnector:
             }
         }
 
+    def test_show_grants_to_roles(self, mocker):
+        mocker.patch("sqlalchemy.create_engine")
+        conn = SnowflakeConnector()
+        conn.run_query = mocker.MagicMock(
+            return_value=[
+                {
+                    "grantee_name": "TEST_ROLE",
+                    "privilege": "USAGE",
+                    "granted_on": "DATABASE",
+                    "table_catalog": "DATABASE_1",
+                    "table_schema": None,
+                    "name": "DATABASE_1",
+                },
+                {
+                    "grantee_name": "TEST_ROLE",
+                    "privilege": "USAGE",
+                    "granted_on": "SCHEMA",
+                    "table_catalog": "DATABASE_1",
+                    "table_schema": None,
+                    "name": "SCHEMA_1",
+                },
+                {
+                    "grantee_name": "TEST_ROLE",
+                    "privilege": "SELECT",
+                    "granted_on": "TABLE",
+                    "table_catalog": "DATABASE_1",
+                    "table_schema": "SCHEMA_1",
+                    "name": "Capitalized_Name",
+                },
+                {
+                    "grantee_name": "TEST_ROLE",
+                    "privilege": "SELECT",
+                    "granted_on": "MATERIALIZED VIEW",
+                    "table_catalog": "DATABASE_1",
+                    "table_schema": "SCHEMA_1",
+                    "name": "VIEW_1",
+                },
+                {
+                    "grantee_name": "OTHER_ROLE",
+                    "privilege": "USAGE",
+                    "granted_on": "ROLE",
+                    "table_catalog": None,
+                    "table_schema": None,
+                    "name": "TEST_ROLE",
+                },
+            ]
+        )
+
+        grants = conn.show_grants_to_roles()
+
+        assert (
+            "SNOWFLAKE.ACCOUNT_USAGE.GRANTS_TO_ROLES" in conn.run_query.call_args[0][0]
+        )
+        assert grants == {
+            "test_role": {
+                "usage": {
+                    "database": ["database_1"],
+                    "schema": ["database_1.schema_1"],
+                },
+                "select": {
+                    "table": ['database_1.schema_1."Capitalized_Name"'],
+                    "materialized_view": ["database_1.schema_1.view_1"],
+                },
+            },
+            "other_role": {"usage": {"role": ["test_role"]}},
+        }
+
+    def test_show_roles_granted_to_users(self, mocker):
+        mocker.patch("sqlalchemy.create_engine")
+        conn = SnowflakeConnector()
+        conn.run_query = mocker.MagicMock(
+            return_value=[
+                {"grantee_name": "TEST_USER", "role": "TEST_ROLE"},
+                {"grantee_name": "TEST_USER", "role": "OTHER_ROLE"},
+                {"grantee_name": "OTHER_USER", "role": "TEST_ROLE"},
+            ]
+        )
+
+        roles = conn.show_roles_granted_to_users()
+
+        assert (
+            "SNOWFLAKE.ACCOUNT_USAGE.GRANTS_TO_USERS" in conn.run_query.call_args[0][0]
+        )
+        assert roles == {
+            "test_user": ["test_role", "other_role"],
+            "other_user": ["test_role"],
+        }
+
     def test_show_grants_to_role_quoted_name(self, mocker):
         mocker.patch("sqlalchemy.create_engine")
         conn = SnowflakeConnector()
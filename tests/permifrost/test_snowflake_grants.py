@@ -427,6 +427,27 @@ class TestGenerateRoleGrants:
 
         assert results == expected
 
+    def test_generate_member_star_lists_uses_injected_connector(self, mocker):
+        """
+        member_of: "*" expansion reuses the connector given to the generator
+        """
+        mock_connector = MockSnowflakeConnector()
+        mocker.patch.object(
+            mock_connector,
+            "show_roles",
+            return_value={"role_1": "securityadmin", "role_2": "securityadmin"},
+        )
+        init_spy = mocker.spy(SnowflakeConnector, "__init__")
+
+        generator = SnowflakeGrantsGenerator({}, {}, conn=mock_connector)
+        member_include_list = generator._generate_member_star_lists(
+            ["role_1", "role_2", "role_3"], "role_1"
+        )
+
+        assert member_include_list == ["role_2"]
+        mock_connector.show_roles.assert_called_once()
+        init_spy.assert_not_called()
+
 
 class TestGenerateRoleGrantRevokes:
     def generate_single_role_revoke():
@@ -679,6 +700,42 @@ class TestGenerateTableAndViewGrants:
 
         return [mock_connector, config, role, expected]
 
+    def partial_table_names_r_config(mocker):
+        """
+        Provides read access on the tables and views of schema_1 in
+        database_1 matching a partial name.
+        """
+        mocker.patch.object(
+            MockSnowflakeConnector,
+            "show_tables",
+            return_value=[
+                "database_1.schema_1.stg_orders",
+                "database_1.schema_1.stg_users",
+                "database_1.schema_1.orders",
+                "database_1.schema_2.stg_events",
+            ],
+        )
+        mocker.patch.object(
+            MockSnowflakeConnector,
+            "show_views",
+            return_value=["database_1.schema_1.stg_v1", "database_1.schema_1.v10"],
+        )
+
+        config = {
+            "read": ["database_1.schema_1.stg_*", "database_1.schema_1.v?"],
+            "write": [],
+        }
+
+        role = "functional_role"
+
+        expected = [
+            "GRANT select ON table database_1.schema_1.stg_orders TO ROLE functional_role",
+            "GRANT select ON table database_1.schema_1.stg_users TO ROLE functional_role",
+            "GRANT select ON view database_1.schema_1.stg_v1 TO ROLE functional_role",
+        ]
+
+        return [MockSnowflakeConnector(), config, role, expected]
+
     def single_table_rw_config(mocker):
         """
         Provides read/write access on table_1 in
@@ -1127,6 +1184,7 @@ class TestGenerateTableAndViewGrants:
             single_table_r_config,
             single_table_w_config,
             single_table_rw_config,
+            partial_table_names_r_config,
             single_table_rw_shared_db_config,
             future_tables_r_single_schema_config,
             future_tables_w_single_schema_config,
@@ -1415,17 +1473,12 @@ class TestGenerateSchemaGrants:
         mocker.patch.object(
             MockSnowflakeConnector,
             "show_schemas",
-            # show_schemas called by read before write function call
+            # show_schemas is called once per database and shared by read/write
             side_effect=[
                 [
                     "database_1.schema_1",
                     "database_1.schema_2",
                 ],
-                [
-                    "database_1.schema_1",
-                    "database_1.schema_2",
-                ],
-                ["database_2.schema_3"],
                 ["database_2.schema_3"],
             ],
         )
@@ -1438,12 +1491,12 @@ class TestGenerateSchemaGrants:
             "GRANT usage ON FUTURE schemas IN database database_1 TO ROLE functional_role",
             "GRANT usage ON FUTURE schemas IN database database_2 TO ROLE functional_role",
             "GRANT usage ON schema database_1.schema_1 TO ROLE functional_role",
-            "GRANT usage ON schema database_1.schema_1 TO ROLE functional_role",
-            "GRANT usage ON schema database_1.schema_2 TO ROLE functional_role",
             "GRANT usage ON schema database_1.schema_2 TO ROLE functional_role",
+            "GRANT usage ON schema database_2.schema_3 TO ROLE functional_role",
             "GRANT usage, monitor, create table, create view, create stage, create file format, create sequence, create function, create pipe ON FUTURE schemas IN database database_1 TO ROLE functional_role",
             "GRANT usage, monitor, create table, create view, create stage, create file format, create sequence, create function, create pipe ON FUTURE schemas IN database database_2 TO ROLE functional_role",
-            "GRANT usage, monitor, create table, create view, create stage, create file format, create sequence, create function, create pipe ON schema database_2.schema_3 TO ROLE functional_role",
+            "GRANT usage, monitor, create table, create view, create stage, create file format, create sequence, create function, create pipe ON schema database_1.schema_1 TO ROLE functional_role",
+            "GRANT usage, monitor, create table, create view, create stage, create file format, create sequence, create function, create pipe ON schema database_1.schema_2 TO ROLE functional_role",
             "GRANT usage, monitor, create table, create view, create stage, create file format, create sequence, create function, create pipe ON schema database_2.schema_3 TO ROLE functional_role",
         ]
         return [MockSnowflakeConnector, config, expected]
@@ -2713,8 +2766,9 @@ class TestSnowflakeOwnershipGrants:
             roles_granted_to_user,
             expectation,
         ) = self.generate_ownership_on_warehouse(entity[0], entity[1], entity[2])
-        generator = SnowflakeGrantsGenerator(grants_to_role, roles_granted_to_user)
-        generator.conn = mock_connector
+        generator = SnowflakeGrantsGenerator(
+            grants_to_role, roles_granted_to_user, conn=mock_connector
+        )
         sql_commands = generator.generate_grant_ownership(role, spec)
 
         assert sql_commands[0]["sql"] == expectation
@@ -2726,10 +2780,12 @@ class TestSnowflakeOwnershipGrants:
         mock_connector = MockSnowflakeConnector()
 
         generator = SnowflakeGrantsGenerator(
-            test_grants_to_role, test_roles_granted_to_user, test_role_config
+            test_grants_to_role,
+            test_roles_granted_to_user,
+            test_role_config,
+            conn=mock_connector,
         )
 
-        generator.conn = mock_connector
         sql_commands = generator.generate_grant_ownership(
             "test_role", test_role_config["functional_role"]
         )
@@ -0,0 +1,183 @@
+import pytest
+
+from permifrost.glob_matcher import GlobMatcher
+from permifrost.snowflake_connector import SnowflakeConnector
+from permifrost.snowflake_metadata import SnowflakeMetadataSnapshot
+from permifrost_test_utils.snowflake_connector import MockSnowflakeConnector
+
+
+@pytest.fixture
+def mock_connector(mocker):
+    mocker.patch.object(SnowflakeConnector, "__init__", lambda x: None)
+    mock_connector = MockSnowflakeConnector()
+    mocker.patch.object(
+        mock_connector,
+        "show_schemas",
+        return_value=[
+            "database_1.information_schema",
+            "database_1.schema_1",
+            "database_1.schema_2",
+            "database_1.other_schema",
+        ],
+    )
+    mocker.patch.object(
+        mock_connector,
+        "show_tables",
+        return_value=[
+            "database_1.schema_1.table_1",
+            "database_1.schema_1.table_2",
+            'database_1.schema_2."TableThree"',
+        ],
+    )
+    mocker.patch.object(
+        mock_connector,
+        "show_views",
+        return_value=["database_1.schema_2.view_1"],
+    )
+    yield mock_connector
+
+
+class TestSnowflakeMetadataSnapshot:
+    def test_show_tables_lists_database_once(self, mock_connector):
+        metadata = SnowflakeMetadataSnapshot(mock_connector)
+
+        assert metadata.show_tables(schema="database_1.schema_1") == [
+            "database_1.schema_1.table_1",
+            "database_1.schema_1.table_2",
+        ]
+        assert metadata.show_tables(schema="database_1.schema_2") == [
+            'database_1.schema_2."TableThree"'
+        ]
+        assert metadata.show_tables(schema="database_1.missing_schema") == []
+        assert len(metadata.show_tables(database="database_1")) == 3
+
+        mock_connector.show_tables.assert_called_once_with(database="database_1")
+
+    def test_show_views_lists_database_once(self, mock_connector):
+        metadata = SnowflakeMetadataSnapshot(mock_connector)
+
+        assert metadata.show_views(schema="database_1.schema_1") == []
+        assert metadata.show_views(schema="DATABASE_1.SCHEMA_2") == [
+            "database_1.schema_2.view_1"
+        ]
+
+        mock_connector.show_views.assert_called_once_with(database="database_1")
+
+    def test_show_tables_requires_scope(self, mock_connector):
+        metadata = SnowflakeMetadataSnapshot(mock_connector)
+
+        with pytest.raises(ValueError):
+            metadata.show_tables()
+
+    @pytest.mark.parametrize(
+        "schema,expected",
+        [
+            (
+                "database_1.*",
+                [
+                    "database_1.schema_1",
+                    "database_1.schema_2",
+                    "database_1.other_schema",
+                ],
+            ),
+            ("database_1.schema_*", ["database_1.schema_1", "database_1.schema_2"]),
+            ("database_1.*_schema", ["database_1.other_schema"]),
+            ("database_1.s*a_?", ["database_1.schema_1", "database_1.schema_2"]),
+            ("database_1.schema_3", ["database_1.schema_3"]),
+        ],
+    )
+    def test_full_schema_list(self, mock_connector, schema, expected):
+        metadata = SnowflakeMetadataSnapshot(mock_connector)
+
+        assert metadata.full_schema_list(schema) == expected
+
+    def test_full_schema_list_lists_schemas_once(self, mock_connector):
+        metadata = SnowflakeMetadataSnapshot(mock_connector)
+
+        metadata.full_schema_list("database_1.*")
+        metadata.full_schema_list("database_1.schema_*")
+
+        mock_connector.show_schemas.assert_called_once_with("database_1")
+
+    def test_full_schema_list_database_pattern(self, mock_connector, mocker):
+        mocker.patch.object(
+            mock_connector,
+            "show_databases",
+            return_value=["database_1", "other_database"],
+        )
+        metadata = SnowflakeMetadataSnapshot(mock_connector)
+
+        assert metadata.full_schema_list("data*_?.other_*") == [
+            "database_1.other_schema"
+        ]
+        mock_connector.show_schemas.assert_called_once_with("database_1")
+
+    def test_match_schemas(self, mock_connector):
+        metadata = SnowflakeMetadataSnapshot(mock_connector)
+
+        assert metadata.match_schemas(
+            ["database_1.schema_*", "database_1.*_schema", "database_1.schema_3"]
+        ) == {
+            "database_1.schema_*": ["database_1.schema_1", "database_1.schema_2"],
+            "database_1.*_schema": ["database_1.other_schema"],
+            "database_1.schema_3": ["database_1.schema_3"],
+        }
+        mock_connector.show_schemas.assert_called_once_with("database_1")
+
+    def test_match_tables_and_views(self, mock_connector):
+        metadata = SnowflakeMetadataSnapshot(mock_connector)
+
+        assert metadata.match_tables(["database_1.*.t*"]) == {
+            "database_1.*.t*": [
+                "database_1.schema_1.table_1",
+                "database_1.schema_1.table_2",
+                'database_1.schema_2."TableThree"',
+            ]
+        }
+        assert metadata.match_views(["database_1.schema_?.view_*"]) == {
+            "database_1.schema_?.view_*": ["database_1.schema_2.view_1"]
+        }
+
+    def test_match_schemas_resolves_patterns_once(self, mock_connector, mocker):
+        glob_matcher = mocker.patch(
+            "permifrost.snowflake_metadata.GlobMatcher", wraps=GlobMatcher
+        )
+        metadata = SnowflakeMetadataSnapshot(mock_connector)
+
+        metadata.match_schemas(["database_1.schema_*", "database_1.*_schema"])
+        metadata.full_schema_list("database_1.schema_*")
+        metadata.full_schema_list("database_1.*_schema")
+
+        glob_matcher.assert_called_once_with(
+            ["database_1.schema_*", "database_1.*_schema"]
+        )
+
+    def test_match_views_skips_information_schema(self, mock_connector, mocker):
+        mocker.patch.object(
+            mock_connector,
+            "show_views",
+            return_value=[
+                "database_1.information_schema.views",
+                "database_1.schema_2.views",
+            ],
+        )
+        metadata = SnowflakeMetadataSnapshot(mock_connector)
+
+        assert metadata.match_views(["database_1.*.vie*"]) == {
+            "database_1.*.vie*": ["database_1.schema_2.views"]
+        }
+
+    def test_existing_roles(self, mock_connector, mocker):
+        mocker.patch.object(
+            mock_connector,
+            "show_roles",
+            return_value={"role_1": "sysadmin", "role_2": "sysadmin", "role_3": "x"},
+        )
+        metadata = SnowflakeMetadataSnapshot(mock_connector)
+        spec_roles = frozenset(["role_3", "role_1", "missing_role"])
+
+        assert metadata.existing_roles(spec_roles) == ["role_1", "role_3"]
+        assert metadata.existing_roles(spec_roles) is metadata.existing_roles(
+            ["role_1", "role_3", "missing_role"]
+        )
+        mock_connector.show_roles.assert_called_once()
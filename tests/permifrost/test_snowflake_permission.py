@@ -1,3 +1,7 @@
+from dataclasses import FrozenInstanceError
+
+import pytest
+
 from permifrost.snowflake_permission import SnowflakePermission
 
 
@@ -9,10 +13,25 @@ class TestSnowflakePermission:
 
         updated_permission = permission.with_entity_name("new_name")
 
-        assert updated_permission == permission  # We update the entity in place
-        assert (
-            updated_permission.entity_name == "new_name"
-        )  # name should be what we set above
+        assert updated_permission.entity_name == "new_name"
+        assert permission.entity_name == "test_name"  # permissions are immutable
+        assert updated_permission == SnowflakePermission(
+            "new_name", "test_type", ["priv 1", "priv 2"], False
+        )
+
+    def test_immutable(self):
+        permission = SnowflakePermission("test_name", "test_type", ["priv 1"], False)
+
+        with pytest.raises(FrozenInstanceError):
+            permission.entity_name = "new_name"  # type: ignore
+
+    def test_hash_ignores_grant_option(self):
+        permission = SnowflakePermission("test_name", "test_type", ["priv 1"], False)
+        grantable = SnowflakePermission("test_name", "test_type", ("priv 1",), True)
+
+        assert permission == grantable
+        assert {permission: "value"}[grantable] == "value"
+        assert permission != permission.as_owner()
 
     def test_contains_any_contains_one(self):
         permission = SnowflakePermission(
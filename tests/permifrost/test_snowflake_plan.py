@@ -0,0 +1,85 @@
+import json
+
+import pytest
+
+from permifrost.error import PlanLoadingError
+from permifrost.snowflake_command import SnowflakeCommand
+from permifrost.snowflake_grants import GRANT_ROLE_TEMPLATE
+from permifrost.snowflake_plan import SnowflakePlan, hash_spec
+
+
+@pytest.fixture
+def spec_path(tmp_path):
+    path = tmp_path / "roles.yml"
+    path.write_text('version: "1.0"\n')
+    yield str(path)
+
+
+@pytest.fixture
+def saved_plan(spec_path):
+    yield SnowflakePlan(
+        spec_path=spec_path,
+        spec_hash=hash_spec(spec_path),
+        snapshot_timestamp="2021-01-01T00:00:00+00:00",
+        queries=[
+            {"already_granted": True, "sql": "GRANT ROLE role_1 TO ROLE role_2"},
+            {"already_granted": False, "sql": "GRANT ROLE role_3 TO ROLE role_2"},
+        ],
+        roles=["role_2"],
+        run_list=["roles"],
+    )
+
+
+class TestSnowflakePlan:
+    def test_save_and_load(self, tmp_path, saved_plan):
+        path = str(tmp_path / "plan.json")
+        saved_plan.save(path)
+
+        assert SnowflakePlan.load(path) == saved_plan
+
+    def test_save_commands(self, tmp_path, saved_plan):
+        saved_plan.queries = [
+            SnowflakeCommand(
+                GRANT_ROLE_TEMPLATE,
+                already_granted=True,
+                role_name="role_1",
+                type="role",
+                entity_name="role_2",
+            )
+        ]
+        path = str(tmp_path / "plan.json")
+        saved_plan.save(path)
+
+        assert SnowflakePlan.load(path).queries == [
+            {
+                "already_granted": True,
+                "sql": "GRANT ROLE role_1 TO role role_2",
+                "action": "grant",
+                "privileges": "usage",
+                "object_type": "role",
+                "object_name": "role_1",
+                "grantee": "role_2",
+            }
+        ]
+
+    def test_load_unsupported_version(self, tmp_path, saved_plan):
+        path = tmp_path / "plan.json"
+        path.write_text(json.dumps({"version": 0}))
+
+        with pytest.raises(PlanLoadingError):
+            SnowflakePlan.load(str(path))
+
+    def test_load_invalid_file(self, tmp_path):
+        path = tmp_path / "plan.json"
+        path.write_text("not a plan")
+
+        with pytest.raises(PlanLoadingError):
+            SnowflakePlan.load(str(path))
+
+    def test_matches_spec(self, spec_path, saved_plan):
+        assert saved_plan.matches_spec()
+
+        with open(spec_path, "a") as spec_file:
+            spec_file.write("roles: []\n")
+
+        assert not saved_plan.matches_spec()
@@ -1,3 +1,5 @@
+import threading
+
 import pytest
 
 from permifrost.snowflake_permission import SnowflakePermission
@@ -100,3 +102,104 @@ class TestSnowflakeRoleGrantChecker:
     def test_can_grant_permission_no_role(self, grant_checker):
         permission = SnowflakePermission("*", "account", ["ownership"], True)
         assert grant_checker.can_grant_permission(None, permission) is True
+
+    def test_permission_index(self, grant_checker, mock_connector):
+        index = grant_checker.get_permission_index("my_role")
+
+        assert index[("table", "table 1", "ownership")].grant_option is True
+        assert index[("warehouse", "wh 1", "monitor")].grant_option is False
+        assert index[("account", "*", "manage grants")] == SnowflakePermission(
+            "*", "account", ["manage grants"], False
+        )
+        assert grant_checker.get_permission_index("my_role") is index
+
+    def test_checks_use_cached_index(self, grant_checker, mock_connector):
+        permission = SnowflakePermission("wh 2", "warehouse", ["monitor"], False)
+
+        for _ in range(3):
+            assert grant_checker.has_permission("my_role", permission)
+            assert grant_checker.can_grant_permission("my_role", permission)
+
+        mock_connector.show_grants_to_role_with_grant_option.assert_called_once()
+        assert grant_checker.role_permission_cache.misses == 1
+        assert grant_checker.role_permission_cache.hits == 5
+
+    def test_cache_eviction_and_invalidation(self, mock_connector):
+        grant_checker = SnowflakeRoleGrantChecker(mock_connector, cache_size=2)
+        permission = SnowflakePermission("db 1", "database", ["use"], False)
+
+        for role in ["role_1", "role_2", "role_1", "role_3"]:
+            assert grant_checker.has_permission(role, permission)
+
+        assert "role_1" in grant_checker.role_permission_cache
+        assert "role_2" not in grant_checker.role_permission_cache
+        assert grant_checker.role_permission_cache.evictions == 1
+
+        grant_checker.invalidate("role_1")
+        assert grant_checker.has_permission("role_1", permission)
+
+        assert [
+            call.args[0]
+            for call in mock_connector.show_grants_to_role_with_grant_option.call_args_list
+        ] == ["role_1", "role_2", "role_3", "role_1"]
+
+    def test_has_permission_snowflaky_name(self, grant_checker, mocker):
+        mocker.patch.object(
+            grant_checker.conn,
+            "show_grants_to_role_with_grant_option",
+            return_value={"select": {"table": {"table_1": {"grant_option": True}}}},
+        )
+        permission = SnowflakePermission("TABLE_1", "table", ["select"], False)
+
+        assert grant_checker.has_permission("my_role", permission)
+        assert grant_checker.can_grant_permission("my_role", permission)
+        assert permission.entity_name == "TABLE_1"
+
+    def test_has_permission_with_several_privileges(self, grant_checker):
+        permission = SnowflakePermission("wh 2", "warehouse", ["monitor", "use"], False)
+
+        assert grant_checker.has_permission("my_role", permission) is False
+
+    def test_prefetch(self, grant_checker, mock_connector):
+        grant_checker.prefetch(["role_1", "role_2", "role_1"])
+        grant_checker.prefetch(["role_2", "role_3"], max_workers=1)
+
+        assert sorted(
+            call.args[0]
+            for call in mock_connector.show_grants_to_role_with_grant_option.call_args_list
+        ) == ["role_1", "role_2", "role_3"]
+
+        permission = SnowflakePermission("db 1", "database", ["use"], False)
+        assert grant_checker.has_permission("role_1", permission)
+        mock_connector.show_grants_to_role_with_grant_option.assert_called_with(
+            "role_3"
+        )
+
+    def test_prefetch_is_concurrent(self, grant_checker, mock_connector, mocker):
+        # Both roles can only be fetched if they are fetched at the same time
+        barrier = threading.Barrier(2, timeout=5)
+
+        def show_grants(role):
+            barrier.wait()
+            return {}
+
+        mocker.patch.object(
+            mock_connector,
+            "show_grants_to_role_with_grant_option",
+            side_effect=show_grants,
+        )
+
+        grant_checker.prefetch(["role_1", "role_2"], max_workers=2)
+
+        assert "role_1" in grant_checker.role_permission_cache
+        assert "role_2" in grant_checker.role_permission_cache
+
+    def test_prefetch_raises_errors(self, grant_checker, mock_connector, mocker):
+        mocker.patch.object(
+            mock_connector,
+            "show_grants_to_role_with_grant_option",
+            side_effect=RuntimeError("role does not exist"),
+        )
+
+        with pytest.raises(RuntimeError):
+            grant_checker.prefetch(["role_1", "role_2"])
@@ -1,8 +1,13 @@
+import asyncio
 import pytest
 import os
 
 from permifrost import SpecLoadingError
 from permifrost.snowflake_spec_loader import SnowflakeSpecLoader
+from permifrost.snowflake_async_connector import (
+    DEFAULT_MAX_WORKERS,
+    AsyncSnowflakeConnector,
+)
 from permifrost.snowflake_connector import SnowflakeConnector
 from permifrost.snowflake_grants import SnowflakeGrantsGenerator
 from permifrost_test_utils.snowflake_schema_builder import SnowflakeSchemaBuilder
@@ -951,6 +956,187 @@ class TestSnowflakeSpecLoaderWithOwner:
 
         assert [] == queries
 
+    def test_generate_permission_queries_shares_connector(
+        self, mocker, test_roles_mock_connector, test_roles_spec_file
+    ):
+        """The grants generator reuses the connector of the spec loader"""
+        mocker.patch("builtins.open", mocker.mock_open(read_data=test_roles_spec_file))
+        spec_loader = SnowflakeSpecLoader(spec_path="", conn=test_roles_mock_connector)
+        generator_init = mocker.spy(SnowflakeGrantsGenerator, "__init__")
+
+        spec_loader.generate_permission_queries()
+
+        assert spec_loader.conn is test_roles_mock_connector
+        assert generator_init.call_args.kwargs["conn"] is test_roles_mock_connector
+
+    def test_member_of_star_lists_roles_once(self, mocker, mock_connector):
+        """
+        SHOW ROLES runs once per run, for the entity checks and every
+        member_of "*" expansion
+        """
+        spec_file_data = (
+            SnowflakeSchemaBuilder()
+            .set_version("1.0")
+            .add_role(name="role_1", member_of_include=['"*"'])
+            .add_role(name="role_2", member_of_include=['"*"'])
+            .add_role(name="role_3", member_of=["role_1"])
+            .build()
+        )
+        mocker.patch("builtins.open", mocker.mock_open(read_data=spec_file_data))
+        mocker.patch.object(
+            mock_connector,
+            "show_roles",
+            return_value={
+                "role_1": "securityadmin",
+                "role_2": "securityadmin",
+                "role_3": "securityadmin",
+                "other_role": "securityadmin",
+            },
+        )
+        spec_loader = SnowflakeSpecLoader("", mock_connector)
+
+        queries = [query["sql"] for query in spec_loader.generate_permission_queries()]
+
+        mock_connector.show_roles.assert_called_once()
+        assert "GRANT ROLE role_2 TO role role_1" in queries
+        assert "GRANT ROLE role_3 TO role role_1" in queries
+        assert "GRANT ROLE role_1 TO role role_2" in queries
+        assert not any("other_role" in query for query in queries)
+
+    @pytest.mark.parametrize("jobs", [1, 4])
+    def test_get_role_privileges_from_snowflake_server_with_jobs(
+        self, mocker, test_roles_mock_connector, jobs
+    ):
+        """Concurrent metadata fetching merges grants in a deterministic order"""
+        spec_file_data = """
+            version: "1.0"
+            databases:
+              - primarydb:
+                  shared: no
+              - secondarydb:
+                  shared: no
+            roles:
+              - primary:
+                  privileges:
+                    databases:
+                      read:
+                        - primarydb
+                        - secondarydb
+              - secondary:
+                  member_of:
+                    - primary
+        """
+        mocker.patch("builtins.open", mocker.mock_open(read_data=spec_file_data))
+        mocker.patch.object(
+            test_roles_mock_connector,
+            "show_schemas",
+            side_effect=lambda database: [
+                f"{database}.schema_1",
+                f"{database}.schema_2",
+            ],
+        )
+
+        def show_future_grants(database=None, schema=None, roles=None):
+            scope = schema or database
+            return {"primary": {"select": {"table": [f"{scope}.<table>"]}}}
+
+        mocker.patch.object(
+            test_roles_mock_connector,
+            "show_future_grants",
+            side_effect=show_future_grants,
+        )
+        mocker.patch.object(
+            test_roles_mock_connector,
+            "show_grants_to_role",
+            side_effect=lambda role: {"usage": {"role": [f"{role}_child"]}},
+        )
+
+        spec_loader = SnowflakeSpecLoader(
+            spec_path="", conn=test_roles_mock_connector, jobs=jobs
+        )
+
+        assert spec_loader.grants_to_role["primary"]["select"]["table"] == [
+            "primarydb.<table>",
+            "primarydb.schema_1.<table>",
+            "primarydb.schema_2.<table>",
+            "secondarydb.<table>",
+            "secondarydb.schema_1.<table>",
+            "secondarydb.schema_2.<table>",
+        ]
+        assert spec_loader.grants_to_role["primary"]["usage"]["role"] == [
+            "primary_child"
+        ]
+        assert test_roles_mock_connector.show_grants_to_role.call_count == 2
+
+    def test_get_role_privileges_from_account_usage(
+        self, mocker, test_roles_mock_connector, test_roles_spec_file
+    ):
+        """Role grants are read with a single ACCOUNT_USAGE query when opted in"""
+        mocker.patch("builtins.open", mocker.mock_open(read_data=test_roles_spec_file))
+        mocker.patch.object(
+            test_roles_mock_connector,
+            "show_grants_to_roles",
+            return_value={
+                "primary": {"usage": {"role": ["testrole"]}},
+                "untracked": {"usage": {"role": ["primary"]}},
+            },
+        )
+        mocker.spy(test_roles_mock_connector, "show_grants_to_role")
+
+        spec_loader = SnowflakeSpecLoader(
+            spec_path="", conn=test_roles_mock_connector, use_account_usage=True
+        )
+
+        assert spec_loader.grants_to_role == {
+            "primary": {"usage": {"role": ["testrole"]}}
+        }
+        test_roles_mock_connector.show_grants_to_roles.assert_called_once()
+        test_roles_mock_connector.show_grants_to_role.assert_not_called()
+
+    @pytest.mark.parametrize("jobs", [1, 4])
+    def test_get_user_privileges_from_snowflake_server_with_jobs(
+        self, mocker, test_roles_mock_connector, test_roles_spec_file, jobs
+    ):
+        """Users are fetched concurrently and stored under the right user"""
+        mocker.patch("builtins.open", mocker.mock_open(read_data=test_roles_spec_file))
+        mocker.patch.object(
+            test_roles_mock_connector,
+            "show_roles_granted_to_user",
+            side_effect=lambda user: [f"{user}_role"],
+        )
+
+        spec_loader = SnowflakeSpecLoader(
+            spec_path="", conn=test_roles_mock_connector, jobs=jobs
+        )
+
+        assert spec_loader.roles_granted_to_user == {
+            "testusername": ["testusername_role"],
+            "testuser": ["testuser_role"],
+        }
+
+    def test_get_user_privileges_from_account_usage(
+        self, mocker, test_roles_mock_connector, test_roles_spec_file
+    ):
+        """User memberships are read with a single ACCOUNT_USAGE query when opted in"""
+        mocker.patch("builtins.open", mocker.mock_open(read_data=test_roles_spec_file))
+        mocker.patch.object(
+            test_roles_mock_connector,
+            "show_roles_granted_to_users",
+            return_value={"testuser": ["primary"], "untracked": ["secondary"]},
+        )
+        mocker.spy(test_roles_mock_connector, "show_roles_granted_to_user")
+
+        spec_loader = SnowflakeSpecLoader(
+            spec_path="", conn=test_roles_mock_connector, use_account_usage=True
+        )
+
+        assert spec_loader.roles_granted_to_user == {
+            "testusername": [],
+            "testuser": ["primary"],
+        }
+        test_roles_mock_connector.show_roles_granted_to_users.assert_called_once()
+        test_roles_mock_connector.show_roles_granted_to_user.assert_not_called()
+
 
 class TestSnowflakeSpecLoaderUserRoleFilters:
     def test_role_filter(self, mocker, test_roles_mock_connector, test_roles_spec_file):
@@ -1103,6 +1289,117 @@ class TestSnowflakeSpecLoaderUserRoleFilters:
         ]
         assert results == expected_results
 
+    def test_iter_permission_queries(
+        self, mocker, test_roles_mock_connector, test_roles_spec_file
+    ):
+        """Streamed queries are yielded per entity, in the same order"""
+        mocker.patch("builtins.open", mocker.mock_open(read_data=test_roles_spec_file))
+        spec_loader = SnowflakeSpecLoader(spec_path="", conn=test_roles_mock_connector)
+
+        batches = list(spec_loader.iter_permission_queries())
+
+        assert len(batches) > 1
+        assert [
+            query for batch in batches for query in batch
+        ] == spec_loader.generate_permission_queries()
+
+    def test_generate_permission_queries_in_processes(
+        self, mocker, test_roles_mock_connector, test_roles_spec_file
+    ):
+        """Roles generated in worker processes are merged in spec order"""
+        mocker.patch("builtins.open", mocker.mock_open(read_data=test_roles_spec_file))
+        spec_loader = SnowflakeSpecLoader(spec_path="", conn=test_roles_mock_connector)
+
+        assert spec_loader.generate_permission_queries(
+            processes=2
+        ) == spec_loader.generate_permission_queries(processes=1)
+
+    def test_generate_role_queries_without_metadata(
+        self, mocker, test_roles_mock_connector, test_roles_spec_file
+    ):
+        """Roles needing metadata that was not preloaded are generated locally"""
+        mocker.patch("builtins.open", mocker.mock_open(read_data=test_roles_spec_file))
+        spec_loader = SnowflakeSpecLoader(spec_path="", conn=test_roles_mock_connector)
+        expected = spec_loader.generate_permission_queries()
+        mocker.patch(
+            "permifrost.snowflake_spec_loader._generate_role_in_worker",
+            return_value=None,
+        )
+        executor = mocker.patch(
+            "permifrost.snowflake_spec_loader.ProcessPoolExecutor"
+        ).return_value.__enter__.return_value
+        executor.map.side_effect = lambda func, items, chunksize: map(func, items)
+
+        assert spec_loader.generate_permission_queries(processes=2) == expected
+
+    def test_load_async(self, mocker, test_roles_mock_connector, test_roles_spec_file):
+        """The async path loads the same grants in a worker thread"""
+        mocker.patch("builtins.open", mocker.mock_open(read_data=test_roles_spec_file))
+        expected = SnowflakeSpecLoader(
+            spec_path="", conn=test_roles_mock_connector
+        ).generate_permission_queries()
+
+        async def main():
+            async with AsyncSnowflakeConnector(test_roles_mock_connector) as conn:
+                spec_loader = await SnowflakeSpecLoader.load_async("", conn)
+                await spec_loader.get_privileges_from_snowflake_server_async(conn)
+                return (
+                    spec_loader,
+                    await spec_loader.generate_permission_queries_async(conn),
+                )
+
+        spec_loader, queries = asyncio.run(main())
+
+        assert spec_loader.jobs == DEFAULT_MAX_WORKERS
+        assert queries == expected
+
+    def test_iter_permission_queries_with_ownership(
+        self, mocker, test_roles_mock_connector
+    ):
+        """Streamed ownership grants are run before grants on their object"""
+        spec_file_data = """
+            version: "1.0"
+            databases:
+              - primarydb:
+                  shared: no
+            roles:
+              - primary:
+                  owns:
+                    databases:
+                      - primarydb
+                  privileges:
+                    databases:
+                      read:
+                        - primarydb
+              - secondary:
+                  privileges:
+                    databases:
+                      write:
+                        - primarydb
+              - testrole:
+                  owns:
+                    databases:
+                      - primarydb
+        """
+        mocker.patch("builtins.open", mocker.mock_open(read_data=spec_file_data))
+        spec_loader = SnowflakeSpecLoader(spec_path="", conn=test_roles_mock_connector)
+        ownership = {
+            "already_granted": False,
+            "sql": "GRANT OWNERSHIP ON database primarydb TO ROLE testrole "
+            "COPY CURRENT GRANTS",
+        }
+
+        batches = list(spec_loader.iter_permission_queries())
+        queries = spec_loader.generate_permission_queries()
+
+        # Only the last ownership grant is kept, as without streaming, but it
+        # is moved before the first grant on the database
+        assert queries[-1] == ownership
+        assert [query for batch in batches for query in batch] == [ownership] + queries[
+            :-1
+        ]
+        assert batches[0][0] == ownership
+
 
 class TestGetPrivilegesFromSnowflakeServer:
     def users_with_users_roles_run_list():
@@ -0,0 +1,110 @@
+import pytest
+
+from permifrost.error import StateLoadingError
+from permifrost.snowflake_state import SnowflakeState, hash_config
+
+
+@pytest.fixture
+def spec():
+    yield {
+        "version": "1.0",
+        "databases": [{"analytics": {"shared": False}}],
+        "roles": [
+            {"loader": {"warehouses": ["loading"]}},
+            {"transformer": {"member_of": ["loader"]}},
+            {"reporter": {"member_of": {"include": ["*"], "exclude": ["loader"]}}},
+            {"analyst": {"warehouses": ["reporting"]}},
+        ],
+        "users": [
+            {"airflow": {"member_of": ["loader"]}},
+            {"looker": {"member_of": ["analyst"]}},
+        ],
+    }
+
+
+@pytest.fixture
+def state(spec):
+    state = SnowflakeState()
+    state.record(spec)
+    yield state
+
+
+class TestSnowflakeState:
+    def test_hash_config_ignores_key_order(self):
+        assert hash_config({"a": 1, "b": [1, 2]}) == hash_config({"b": [1, 2], "a": 1})
+        assert hash_config({"b": [1, 2]}) != hash_config({"b": [2, 1]})
+
+    def test_unchanged_spec(self, spec, state):
+        assert state.changed_entities(spec) == ([], [])
+        assert state.applied_at is not None
+
+    def test_changed_role_and_members(self, spec, state):
+        spec["roles"][0]["loader"]["warehouses"].append("transforming")
+
+        assert state.changed_entities(spec) == (
+            ["loader", "transformer", "reporter"],
+            ["airflow"],
+        )
+
+    def test_changed_user(self, spec, state):
+        spec["users"][1]["looker"]["member_of"].append("reporter")
+
+        assert state.changed_entities(spec) == ([], ["looker"])
+
+    def test_new_role(self, spec, state):
+        spec["roles"].append({"engineer": {"member_of": ["analyst"]}})
+
+        assert state.changed_entities(spec) == (["reporter", "engineer"], [])
+
+    def test_changed_shared_spec(self, spec, state):
+        spec["databases"].append({"raw": {"shared": False}})
+
+        assert state.changed_entities(spec) == (
+            ["loader", "transformer", "reporter", "analyst"],
+            ["airflow", "looker"],
+        )
+
+    def test_empty_state(self, spec):
+        assert SnowflakeState().changed_entities(spec) == (
+            ["loader", "transformer", "reporter", "analyst"],
+            ["airflow", "looker"],
+        )
+
+    def test_record_partial_run(self, spec):
+        state = SnowflakeState()
+        state.record(spec, roles=["analyst"], users=[])
+
+        # The rest of the spec is only recorded by a run of every entity
+        assert state.changed_entities(spec) == (
+            ["loader", "transformer", "reporter", "analyst"],
+            ["airflow", "looker"],
+        )
+
+    def test_record_after_change(self, spec, state):
+        spec["roles"][3]["analyst"]["warehouses"] = []
+        state.record(spec, roles=["analyst", "reporter"], users=["looker"])
+
+        assert state.changed_entities(spec) == ([], [])
+
+    def test_save_and_load(self, tmp_path, state):
+        path = str(tmp_path / "state.json")
+        state.save(path)
+
+        assert SnowflakeState.load(path) == state
+
+    def test_load_missing_file(self, tmp_path):
+        assert SnowflakeState.load(str(tmp_path / "state.json")) == SnowflakeState()
+
+    def test_load_invalid_file(self, tmp_path):
+        path = tmp_path / "state.json"
+        path.write_text("not a state")
+
+        with pytest.raises(StateLoadingError):
+            SnowflakeState.load(str(path))
+
+    def test_load_unsupported_version(self, tmp_path):
+        path = tmp_path / "state.json"
+        path.write_text('{"version": 0}')
+
+        with pytest.raises(StateLoadingError):
+            SnowflakeState.load(str(path))
@@ -21,29 +21,38 @@ class MockSnowflakeConnector(SnowflakeConnector):
     def show_schemas(self, database: str = None) -> List[str]:
         return []
 
-    def show_tables(self, database: str = None, schema: str = None) -> List[str]:
+    def show_tables(
+        self, database: str = None, schema: str = None, in_databases: List[str] = None
+    ) -> List[str]:
         return []
 
-    def show_views(self, database: str = None, schema: str = None) -> List[str]:
+    def show_views(
+        self, database: str = None, schema: str = None, in_databases: List[str] = None
+    ) -> List[str]:
         return []
 
-    def show_future_grants(self, database: str = None, schema: str = None) -> List[str]:
+    def show_future_grants(
+        self, database: str = None, schema: str = None, roles: List[str] = None
+    ) -> List[str]:
         return []
 
     def show_grants_to_role(self, role) -> Dict[str, Any]:
         return {}
 
+    def show_grants_to_roles(self) -> Dict[str, Any]:
+        return {}
+
     def show_grants_to_role_with_grant_option(self, role) -> Dict[str, Any]:
         return {}
 
     def show_roles_granted_to_user(self, user) -> List[str]:
         return []
 
+    def show_roles_granted_to_users(self) -> Dict[str, List[str]]:
+        return {}
+
     def get_current_user(self) -> str:
         return ""
 
     def get_current_role(self) -> str:
         return "securityadmin"
-
-    def full_schema_list(self, schema: str) -> List[str]:
-        return []